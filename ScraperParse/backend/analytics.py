@@ -0,0 +1,218 @@
+"""
+Spaltenbasierte Auswertungen über den Link-Bestand (/stats)
+Die Links werden einmal pro Stand von links.json in NumPy-Arrays umgewandelt (Zeitstempel
+als Epoch-Sekunden - direkt aus den Integer-Zeitstempeln der LinkRecords -, Makler und
+Such-URLs als Integer-IDs). Gruppierte Zählungen, Zeit-Histogramme und Top-Such-URLs laufen
+danach vektorisiert.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from link_record import LinkRecord, makler_table
+
+logger = logging.getLogger(__name__)
+
+# Gruppe für Links ohne Makler-Zuordnung (wie bei /links/grouped)
+NO_MAKLER = 'Sonstige'
+INTERVALS = ('day', 'week', 'month')
+
+_NAT = np.iinfo(np.int64).min
+_DAY = 86400
+_MICROS = 1000000
+
+
+def _parse_timestamps(values: List[str]) -> np.ndarray:
+    """ISO-Zeitstempel -> Epoch-Sekunden (int64, ungültige/fehlende = NaT-Wert)"""
+    try:
+        return np.array(values, dtype='datetime64[us]').astype('datetime64[s]').astype(np.int64)
+    except ValueError:
+        # Einzelne Einträge in abweichendem Format - elementweise parsen
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(np.datetime64(datetime.fromisoformat(value).replace(tzinfo=None), 's').astype(np.int64))
+            except (TypeError, ValueError):
+                parsed.append(_NAT)
+        return np.array(parsed, dtype=np.int64)
+
+
+class LinkColumns:
+    """
+    Spaltenform des Link-Bestands
+
+    Pro Link: timestamps (Epoch-Sekunden), search_ids (Index in search_urls, -1 = unbekannt).
+    Pro Makler-Zuordnung (ein Link kann mehreren Maklern gehören): assignment_links
+    (Index des Links) und assignment_makler (Index in makler_names).
+    """
+
+    def __init__(self, timestamps: np.ndarray, search_ids: np.ndarray, search_urls: List[str],
+                 assignment_links: np.ndarray, assignment_makler: np.ndarray, makler_names: List[str]):
+        self.timestamps = timestamps
+        self.search_ids = search_ids
+        self.search_urls = search_urls
+        self.assignment_links = assignment_links
+        self.assignment_makler = assignment_makler
+        self.makler_names = makler_names
+        # Periodennummern je Link und Intervall, beim ersten Zugriff berechnet
+        self._periods: Dict[str, np.ndarray] = {}
+
+    def periods(self, interval: str) -> np.ndarray:
+        """Periodennummer je Link für das Intervall (gecacht)"""
+        if interval not in self._periods:
+            self._periods[interval] = _period_index(self.timestamps, interval)
+        return self._periods[interval]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def from_links(cls, links: List[LinkRecord]) -> "LinkColumns":
+        names_table = makler_table()
+        makler_ids: Dict[str, int] = {}
+        search_ids: Dict[str, int] = {}
+        timestamps = []
+        # Zeitstempel in anderem Format (Zeichenketten) werden gesammelt einzeln geparst
+        unparsed = []
+        link_search = []
+        assignment_links = []
+        assignment_makler = []
+        for index, link in enumerate(links):
+            timestamp = link.timestamp
+            if timestamp.__class__ is int:
+                timestamps.append(timestamp // _MICROS)
+            else:
+                timestamps.append(_NAT)
+                unparsed.append((index, timestamp or ''))
+            search_url = link.search_url
+            link_search.append(search_ids.setdefault(search_url, len(search_ids)) if search_url else -1)
+            names = [names_table[makler] for makler in link.makler] or [NO_MAKLER]
+            for name in names:
+                assignment_links.append(index)
+                assignment_makler.append(makler_ids.setdefault(name, len(makler_ids)))
+        timestamps = np.array(timestamps, dtype=np.int64)
+        if unparsed:
+            timestamps[[index for index, _ in unparsed]] = _parse_timestamps([value for _, value in unparsed])
+        return cls(
+            timestamps,
+            np.array(link_search, dtype=np.int32),
+            list(search_ids),
+            np.array(assignment_links, dtype=np.int32),
+            np.array(assignment_makler, dtype=np.int32),
+            list(makler_ids)
+        )
+
+
+def _period_index(timestamps: np.ndarray, interval: str) -> np.ndarray:
+    """Epoch-Sekunden -> Periodennummer (Tage/Wochen ab Montag/Monate seit 1970)"""
+    days = timestamps // _DAY
+    if interval == 'day':
+        return days
+    if interval == 'week':
+        # 01.01.1970 war ein Donnerstag; +3 verschiebt den Wochenbeginn auf Montag
+        return (days + 3) // 7
+    return timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+
+def _period_label(period: int, interval: str) -> str:
+    """Periodennummer -> Datum des ersten Tags der Periode (YYYY-MM-DD)"""
+    if interval == 'day':
+        return str(np.datetime64(int(period), 'D'))
+    if interval == 'week':
+        return str(np.datetime64(int(period) * 7 - 3, 'D'))
+    return str(np.datetime64(int(period), 'M').astype('datetime64[D]'))
+
+
+def _to_epoch(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return int(np.datetime64(datetime.fromisoformat(value).replace(tzinfo=None), 's').astype(np.int64))
+
+
+def compute_stats(columns: LinkColumns, interval: str = 'day', makler_names: Optional[List[str]] = None,
+                  since: Optional[str] = None, until: Optional[str] = None, top: int = 10) -> Dict:
+    """
+    Berechnet Kennzahlen über den Bestand
+
+    Args:
+        columns: Spaltenform des Bestands
+        interval: Periode für Histogramme ('day', 'week' oder 'month')
+        makler_names: Nur Links dieser Makler berücksichtigen (optional)
+        since: Nur Links ab diesem Zeitpunkt (ISO-Datum, inklusive, optional)
+        until: Nur Links vor diesem Zeitpunkt (ISO-Datum, exklusive, optional)
+        top: Anzahl der Such-URLs mit den meisten Links
+
+    Returns:
+        Dict mit 'total_links', 'by_makler', 'histogram', 'by_makler_and_period' und 'top_search_urls'
+
+    Raises:
+        ValueError: Bei unbekanntem Intervall oder ungültigem Datum
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unbekanntes Intervall '{interval}' (erlaubt: {', '.join(INTERVALS)})")
+
+    timestamps = columns.timestamps
+    link_mask = timestamps != _NAT
+    since_epoch, until_epoch = _to_epoch(since), _to_epoch(until)
+    if since_epoch is not None:
+        link_mask &= timestamps >= since_epoch
+    if until_epoch is not None:
+        link_mask &= timestamps < until_epoch
+
+    # Zuordnungen (Link, Makler) der ausgewählten Links und Makler
+    assignment_mask = link_mask[columns.assignment_links]
+    if makler_names:
+        wanted = [i for i, name in enumerate(columns.makler_names) if name in set(makler_names)]
+        assignment_mask &= np.isin(columns.assignment_makler, np.array(wanted, dtype=np.int32))
+        # Ein Link zählt, wenn er mindestens einem der Makler gehört
+        selected = np.zeros(len(columns), dtype=bool)
+        selected[columns.assignment_links[assignment_mask]] = True
+        link_mask &= selected
+    assignment_links = columns.assignment_links[assignment_mask]
+    assignment_makler = columns.assignment_makler[assignment_mask]
+
+    # Links je Makler
+    makler_counts = np.bincount(assignment_makler, minlength=len(columns.makler_names))
+    order = np.argsort(-makler_counts, kind='stable')
+    by_makler = [{'makler': columns.makler_names[i], 'count': int(makler_counts[i])} for i in order if makler_counts[i]]
+
+    # Histogramm über alle ausgewählten Links
+    all_periods = columns.periods(interval)
+    periods = all_periods[link_mask]
+    histogram = []
+    if len(periods):
+        first = periods.min()
+        counts = np.bincount(periods - first)
+        histogram = [{'period': _period_label(first + i, interval), 'count': int(c)} for i, c in enumerate(counts) if c]
+
+    # Links je Makler und Periode: kombinierter Schlüssel Makler * Perioden + Periode
+    by_makler_and_period: Dict[str, List[Dict]] = {}
+    if len(assignment_links):
+        assignment_periods = all_periods[assignment_links]
+        first = assignment_periods.min()
+        span = int(assignment_periods.max() - first) + 1
+        counts = np.bincount(assignment_makler.astype(np.int64) * span + (assignment_periods - first))
+        for key in np.flatnonzero(counts).tolist():
+            makler_id, offset = divmod(key, span)
+            by_makler_and_period.setdefault(columns.makler_names[makler_id], []).append(
+                {'period': _period_label(first + offset, interval), 'count': int(counts[key])})
+
+    # Top-N Such-URLs (nur Links mit bekannter Such-URL)
+    search_ids = columns.search_ids[link_mask]
+    search_ids = search_ids[search_ids >= 0]
+    top_search_urls = []
+    if len(search_ids) and top > 0:
+        search_counts = np.bincount(search_ids, minlength=len(columns.search_urls))
+        top_ids = np.argsort(-search_counts, kind='stable')[:top]
+        top_search_urls = [{'search_url': columns.search_urls[i], 'count': int(search_counts[i])} for i in top_ids if search_counts[i]]
+
+    return {
+        'total_links': int(link_mask.sum()),
+        'interval': interval,
+        'by_makler': by_makler,
+        'histogram': histogram,
+        'by_makler_and_period': by_makler_and_period,
+        'top_search_urls': top_search_urls
+    }
@@ -0,0 +1,155 @@
+"""
+Prüfstand für den Egress-Pool gegen lokale Proxy-Stubs
+Startet pro Route einen HTTP-Proxy-Stub auf 127.0.0.1 (beantwortet Anfragen selbst, ohne sie
+weiterzuleiten) und lädt darüber Seiten wie der Scraper (acquire, throttle, report). Geprüft wird:
+- Budgets: höchstens max_concurrency gleichzeitige Anfragen und höchstens rate_per_second je Route
+- 404 einer gelöschten Anzeige zählt nicht gegen die Route
+- Eine Route mit Proxy-Fehlern (502) wird entfernt und nach readmit_after über eine Probe wieder
+  aufgenommen, sobald der Proxy wieder antwortet
+
+Aufruf: python bench_egress.py [--requests 60]
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from egress import EgressPool, EgressRoute, route_failure
+
+
+class ProxyStub:
+    """Lokaler Proxy-Stub; status legt die Antwort fest (200, 404, 502, ...)"""
+
+    def __init__(self, status: int = 200, delay: float = 0.02):
+        self.status = status
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.started = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.peak = max(stub.peak, stub.in_flight)
+                    stub.started.append(time.monotonic())
+                try:
+                    time.sleep(stub.delay)
+                    body = b'<html>ok</html>'
+                    self.send_response(stub.status)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def rate(self) -> float:
+        """Beobachtete Anfragen pro Sekunde (Abstand erste bis letzte Anfrage)"""
+        if len(self.started) < 2:
+            return 0.0
+        return (len(self.started) - 1) / (self.started[-1] - self.started[0])
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fetch(pool: EgressPool, url: str) -> int:
+    """Lädt url wie der Scraper über eine freie Route; gibt den HTTP-Status zurück (0 = Fehler)"""
+    with pool.acquire() as route:
+        route.throttle()
+        with route.create_session() as session:
+            try:
+                response = session.get(url, timeout=5)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                pool.report(route, not route_failure(e))
+                return e.response.status_code if e.response is not None else 0
+        pool.report(route, True)
+        return response.status_code
+
+
+def run_all(pool: EgressPool, count: int, workers: int = 10):
+    urls = [f"http://kleinanzeigen.test/s-anzeige/x/{i}-196-1" for i in range(count)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda url: fetch(pool, url), urls))
+
+
+def check_budgets(count: int):
+    # Langsame Antworten: das Ratenbudget allein würde mehr gleichzeitige Anfragen zulassen
+    stubs = [ProxyStub(delay=0.3), ProxyStub(delay=0.3)]
+    routes = [EgressRoute('a', stubs[0].url, max_concurrency=2, rate_per_second=20),
+              EgressRoute('b', stubs[1].url, max_concurrency=3, rate_per_second=10)]
+    started = time.perf_counter()
+    statuses = run_all(EgressPool(routes), count)
+    elapsed = time.perf_counter() - started
+    print(f"Budgets: {count} Anfragen in {elapsed:.2f}s")
+    for route, stub in zip(routes, stubs):
+        print(f"  {route.name}: {len(stub.started)} Anfragen, max. gleichzeitig {stub.peak}/{route.max_concurrency}, "
+              f"{stub.rate():.1f}/{route.rate_per_second} pro s")
+        assert stub.peak <= route.max_concurrency, route.name
+        assert stub.rate() <= route.rate_per_second * 1.1, route.name
+        stub.close()
+    assert statuses == [200] * count
+
+
+def check_not_found(count: int):
+    stubs = [ProxyStub(status=404), ProxyStub(status=404)]
+    pool = EgressPool([EgressRoute('a', stubs[0].url), EgressRoute('b', stubs[1].url)])
+    statuses = run_all(pool, count)
+    print(f"404: {[(r['name'], r['active'], r['health'], r['failures']) for r in pool.status()]}")
+    assert statuses == [404] * count
+    assert all(route['active'] and route['failures'] == 0 for route in pool.status())
+    for stub in stubs:
+        stub.close()
+
+
+def check_removal(count: int):
+    good, bad = ProxyStub(), ProxyStub(status=502)
+    # Ein Slot je Route: ist 'gut' belegt, geht die nächste Anfrage an 'defekt'
+    pool = EgressPool([EgressRoute('gut', good.url, max_concurrency=1), EgressRoute('defekt', bad.url, max_concurrency=1)],
+                      readmit_after=0.5)
+    run_all(pool, count, workers=2)
+    removed = {route['name']: route['active'] for route in pool.status()}
+    print(f"Entfernen: {removed}, Anfragen an 'defekt': {len(bad.started)}")
+    assert removed == {'gut': True, 'defekt': False}
+
+    # Proxy antwortet wieder: nach readmit_after nimmt die Probe die Route wieder auf
+    bad.status = 200
+    before = len(bad.started)
+    run_all(pool, 5, workers=2)
+    assert len(bad.started) == before, "Probe vor Ablauf von readmit_after"
+    time.sleep(0.6)
+    run_all(pool, 5, workers=2)
+    readmitted = {route['name']: route['active'] for route in pool.status()}
+    print(f"Wiederaufnahme: {readmitted}")
+    assert readmitted == {'gut': True, 'defekt': True}
+    good.close()
+    bad.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=60)
+    args = parser.parse_args()
+    check_budgets(args.requests)
+    check_not_found(args.requests // 2)
+    check_removal(args.requests // 2)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark für den Speicherbedarf des Link-Bestands
+Erzeugt synthetische Links wie der Crawl sie speichert (ein Zeitstempel pro Lauf, 0-2 Makler,
+Such-URL), lädt sie wie links.json per JSON und misst mit tracemalloc die Bytes pro Link:
+als Dicts (Stand vor link_record.py) und als LinkRecords. Die URL-Zeichenketten selbst sind
+in beiden Formen gleich groß und werden zusätzlich herausgerechnet.
+
+Aufruf: python bench_link_memory.py [--sizes 10000 100000]
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from link_record import records_from_dicts, records_to_dicts
+
+MAKLER = [f"Makler {i}" for i in range(50)]
+
+
+def generate_links(count: int):
+    """Erzeugt count Link-Dicts im Format von links.json (zwei Crawl-Läufe pro Tag über ein Jahr)"""
+    rng = random.Random(count)
+    start = datetime(2024, 1, 1)
+    runs = [(start + timedelta(hours=12 * run, seconds=rng.randint(0, 3600), microseconds=rng.randint(0, 999999))).isoformat()
+            for run in range(2 * 365)]
+    search_urls = [f"https://www.kleinanzeigen.de/s-wohnung-mieten/{10000 + i}/c203l{rng.randint(1000, 9999)}r10"
+                   for i in range(500)]
+    links = []
+    for i in range(count):
+        ad_id = 2000000000 + i
+        links.append({
+            'url': f"https://www.kleinanzeigen.de/s-anzeige/wohnung-{ad_id}/{ad_id}-196-{rng.randint(1000, 9999)}",
+            'scraped_at': rng.choice(runs),
+            'search_url': rng.choice(search_urls),
+            'makler_names': rng.sample(MAKLER, rng.randint(0, 2))
+        })
+    return links
+
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def run(size: int):
+    raw = json.dumps({'links': generate_links(size)})
+    url_bytes = sum(sys.getsizeof(link['url']) for link in json.loads(raw)['links'])
+
+    tracemalloc.start()
+    baseline = traced_bytes()
+    links = json.loads(raw)['links']
+    dict_bytes = traced_bytes() - baseline
+
+    started = time.perf_counter()
+    records = records_from_dicts(links)
+    convert_ms = (time.perf_counter() - started) * 1000
+    del links
+    record_bytes = traced_bytes() - baseline
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    records_to_dicts(records)
+    back_ms = (time.perf_counter() - started) * 1000
+    return dict_bytes / size, record_bytes / size, url_bytes / size, convert_ms, back_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    header = f"{'Links':>9} {'Dict B/Link':>12} {'Record B/Link':>14} {'ohne URL: Dict':>15} {'Record':>8} {'laden ms':>9} {'zurück ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for size in args.sizes:
+        dict_bytes, record_bytes, url_bytes, convert_ms, back_ms = run(size)
+        print(f"{size:>9} {dict_bytes:>12.0f} {record_bytes:>14.0f} {dict_bytes - url_bytes:>15.0f} "
+              f"{record_bytes - url_bytes:>8.0f} {convert_ms:>9.0f} {back_ms:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark für die Filter-Abfragen (Export, gruppierte Links, Löschen)
+Vergleicht die bisherigen Einzelschleifen über Link-Dicts (Makler-Namen pro Zeile
+normalisiert, jedes Datum geparst) mit der kompilierten LinkQuery aus query.py über
+LinkRecords und gibt die Kosten pro Link in Nanosekunden aus. Beide Varianten müssen
+dieselben Treffer liefern. "grupp. Cache" misst die gruppierte Abfrage so, wie /links/grouped
+sie ausführt: mit der Dict-Form des Bestands, die der Scraper einmal pro Stand aufbaut
+(get_link_dicts), und ohne Filter mit der dort gemerkten Gruppierung. Beides entsteht bei der
+ersten Anfrage nach einer Änderung; diese einmaligen Kosten werden separat ausgegeben.
+
+Aufruf: python bench_query.py [--size 200000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from link_record import records_from_dicts, records_to_dicts
+from query import LinkQuery, LinkDicts, run_query, FlatProjection, MetadataProjection, GroupedProjection, PartitionProjection
+
+MAKLER = [f"Makler {i}" for i in range(50)]
+
+
+def generate_links(count: int):
+    """
+    Erzeugt count Links mit 0-2 Maklern über ein Jahr verteilt; wie beim Crawl teilen sich
+    alle Links eines Laufs einen Zeitstempel (hier zwei Läufe pro Tag)
+    """
+    rng = random.Random(count)
+    start = datetime(2024, 1, 1)
+    runs = [(start + timedelta(hours=12 * run, seconds=rng.randint(0, 3600), microseconds=rng.randint(0, 999999))).isoformat()
+            for run in range(2 * 365)]
+    links = []
+    for i in range(count):
+        ad_id = 2000000000 + i
+        links.append({
+            'url': f"https://www.kleinanzeigen.de/s-anzeige/wohnung-{ad_id}/{ad_id}-196-{rng.randint(1000, 9999)}",
+            'scraped_at': rng.choice(runs),
+            'makler_names': rng.sample(MAKLER, rng.randint(0, 2))
+        })
+    return links
+
+
+def legacy_filter(links, makler_names=None, year=None, month=None, day=None, last_search_urls=None, grouped=False):
+    """Schleife im Stil der bisherigen get_filtered_links_* (als Vergleichsbasis)"""
+    result = {} if grouped else []
+    for link in links:
+        if isinstance(link, dict):
+            url = link.get('url', '')
+            if last_search_urls is not None and url not in last_search_urls:
+                continue
+            if year is not None or month is not None or day is not None:
+                try:
+                    dt = datetime.fromisoformat(link.get('scraped_at', ''))
+                    if year is not None and dt.year != year:
+                        continue
+                    if month is not None and dt.month != month:
+                        continue
+                    if day is not None and dt.day != day:
+                        continue
+                except (ValueError, TypeError):
+                    continue
+            link_makler_names = link.get('makler_names', [])
+            if makler_names:
+                link_makler_normalized = [str(m).strip() for m in link_makler_names]
+                makler_names_normalized = [str(m).strip() for m in makler_names]
+                if not any(makler in link_makler_normalized for makler in makler_names_normalized):
+                    continue
+            if grouped:
+                for makler_name in link_makler_names or ['Sonstige']:
+                    if makler_names and makler_name not in makler_names:
+                        continue
+                    result.setdefault(makler_name, []).append(link)
+            else:
+                result.append(url)
+    return result
+
+
+def best_of(repeat, fn, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    links = generate_links(args.size)
+    records = records_from_dicts(links)
+    last_search = {link['url'] for link in links[-args.size // 10:]}
+    cases = [
+        ('Ohne Filter', {}),
+        ('Makler (3)', {'makler_names': MAKLER[:3]}),
+        ('Jahr+Monat', {'year': 2024, 'month': 6}),
+        ('Jahr+Monat+Tag', {'year': 2024, 'month': 6, 'day': 15}),
+        ('Nur Monat', {'month': 6}),
+        ('Makler+Monat+Suche', {'makler_names': MAKLER[:10], 'year': 2024, 'month': 6, 'last_search_urls': last_search}),
+    ]
+
+    def build_rows():
+        rows = LinkDicts(tuple(records))
+        rows.update(zip(map(id, records), records_to_dicts(records)))
+        return rows
+
+    rows, rows_s = best_of(1, build_rows)
+    _, first_grouped_s = best_of(1, lambda: run_query(records, LinkQuery(), GroupedProjection(rows, complete=True)))
+
+    print(f"{args.size} Links, bestes von {args.repeat} Läufen, ns pro Link")
+    print(f"Einmal pro Stand: Dict-Form des Bestands {rows_s * 1e9 / args.size:.0f}, "
+          f"Gruppierung ohne Filter {first_grouped_s * 1e9 / args.size:.0f}")
+    header = (f"{'Filter':<20} {'Treffer':>8} {'alt flach':>10} {'neu flach':>10} {'alt grupp.':>11} {'neu grupp.':>11} "
+              f"{'grupp. Cache':>13} {'Metadaten':>10} {'Löschen':>9}")
+    print(header)
+    print('-' * len(header))
+    per_row = 1e9 / args.size
+    for label, filters in cases:
+        old_flat, old_flat_s = best_of(args.repeat, legacy_filter, links, **filters)
+        old_grouped, old_grouped_s = best_of(args.repeat, legacy_filter, links, grouped=True, **filters)
+        # Kompilieren gehört zur Abfrage und wird mitgemessen
+        new_flat, new_flat_s = best_of(args.repeat, lambda: run_query(records, LinkQuery(**filters), FlatProjection()))
+        new_grouped, new_grouped_s = best_of(args.repeat, lambda: run_query(records, LinkQuery(**filters), GroupedProjection()))
+        cached_grouped, cached_grouped_s = best_of(args.repeat, lambda: run_query(records, LinkQuery(**filters), GroupedProjection(rows, complete=True)))
+        _, metadata_s = best_of(args.repeat, lambda: run_query(records, LinkQuery(**filters), MetadataProjection()))
+        (matched, _), partition_s = best_of(args.repeat, lambda: run_query(records, LinkQuery(**filters), PartitionProjection()))
+        assert new_flat == old_flat, label
+        assert {k: len(v) for k, v in new_grouped.items()} == {k: len(v) for k, v in old_grouped.items()}, label
+        assert cached_grouped == new_grouped, label
+        assert len(matched) == len(new_flat), label
+        print(f"{label:<20} {len(new_flat):>8} {old_flat_s * per_row:>10.0f} {new_flat_s * per_row:>10.0f} "
+              f"{old_grouped_s * per_row:>11.0f} {new_grouped_s * per_row:>11.0f} {cached_grouped_s * per_row:>13.0f} {metadata_s * per_row:>10.0f} {partition_s * per_row:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark für den Start mit großen Beständen
+Erzeugt synthetische links.json/blacklist.json (10k, 100k, 1M Links) in einem temporären
+Verzeichnis und misst: JSON parsen (Stand vor den Snapshots), Snapshot schreiben/laden und
+den Start des Scrapers - eager (Konstruktor lädt alles) vs. lazy (Konstruktor sofort fertig,
+"Bereit" = nach dem Vorladen aus dem Snapshot).
+
+Aufruf: python bench_startup.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from store import atomic_write_json, file_signature, read_json
+from snapshot import load_snapshot, write_snapshot, snapshot_path, _default_codec
+from scraper import KleinanzeigenScraper
+
+MAKLER = [f"Makler {i}" for i in range(50)]
+
+
+def generate_links(count: int):
+    """Erzeugt count Link-Dicts im Format von links.json"""
+    rng = random.Random(count)
+    start = datetime(2024, 1, 1)
+    links = []
+    for i in range(count):
+        ad_id = 2000000000 + i
+        links.append({
+            'url': f"https://www.kleinanzeigen.de/s-anzeige/wohnung-{ad_id}/{ad_id}-196-{rng.randint(1000, 9999)}",
+            'scraped_at': (start + timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat(),
+            'makler': rng.choice(MAKLER)
+        })
+    return links
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(size: int, directory: str):
+    links_file = os.path.join(directory, f"links_{size}.json")
+    blacklist_file = os.path.join(directory, f"blacklist_{size}.json")
+    links = generate_links(size)
+    atomic_write_json(links_file, {'links': links})
+    atomic_write_json(blacklist_file, {'blacklist': [link['url'] for link in links[:size // 10]]})
+    del links
+
+    _, json_ms = timed(read_json, links_file, {})
+    data = read_json(links_file, {})
+    signature = file_signature(links_file)
+    _, write_ms = timed(write_snapshot, links_file, data, signature)
+    del data
+    _, snap_ms = timed(load_snapshot, links_file, signature)
+
+    def cold_start(lazy: bool):
+        kwargs = dict(blacklist_file=blacklist_file, links_file=links_file,
+                      last_search_file=os.path.join(directory, 'last_search.json'),
+                      details_cache_file=os.path.join(directory, 'details_cache.json'),
+                      reports_dir=os.path.join(directory, 'crawl_reports'),
+                      changes_file=os.path.join(directory, f"link_changes_{size}.json"),
+                      runs_dir=os.path.join(directory, 'crawl_runs'),
+                      fingerprints_file=os.path.join(directory, 'search_fingerprints.json'))
+        scraper, construct_ms = timed(KleinanzeigenScraper, lazy=lazy, **kwargs)
+        _, load_ms = timed(scraper.refresh_state)
+        return construct_ms, construct_ms + load_ms
+
+    # Erster Start legt den Blacklist-Snapshot an; gemessen werden die folgenden Starts
+    cold_start(lazy=False)
+    eager_ms, _ = cold_start(lazy=False)
+    lazy_ms, lazy_ready_ms = cold_start(lazy=True)
+
+    return {
+        'size': size,
+        'json_mb': os.path.getsize(links_file) / 1e6,
+        'snap_mb': os.path.getsize(snapshot_path(links_file)) / 1e6,
+        'json_ms': json_ms,
+        'snap_write_ms': write_ms,
+        'snap_ms': snap_ms,
+        'eager_start_ms': eager_ms,
+        'lazy_start_ms': lazy_ms,
+        'lazy_ready_ms': lazy_ready_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"Snapshot-Codec: {_default_codec()}")
+    header = f"{'Links':>9} {'JSON MB':>8} {'Snap MB':>8} {'JSON ms':>9} {'Snap ms':>9} {'Schreiben':>10} {'Eager ms':>9} {'Lazy ms':>8} {'Bereit ms':>10}"
+    print(header)
+    print('-' * len(header))
+    directory = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        for size in args.sizes:
+            r = run(size, directory)
+            print(f"{r['size']:>9} {r['json_mb']:>8.1f} {r['snap_mb']:>8.1f} {r['json_ms']:>9.0f} {r['snap_ms']:>9.0f} "
+                  f"{r['snap_write_ms']:>10.0f} {r['eager_start_ms']:>9.0f} {r['lazy_start_ms']:>8.1f} {r['lazy_ready_ms']:>10.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Versionierung des Link-Bestands für Delta-Synchronisation (/links/changes)
+Jede Änderung an einem Link (neu, Makler-Zuordnung/Details geändert, gelöscht) erhält eine
+fortlaufende Version. Die letzten Änderungen stehen in einem begrenzten Änderungsprotokoll
+(link_changes.json); ältere Stände lassen sich nur noch per Komplett-Snapshot abgleichen.
+
+Die Datei ist NDJSON: eine Kopfzeile mit 'version' und 'floor', danach eine Zeile je Änderung.
+Gespeichert werden nur die seit dem letzten Speichern hinzugekommenen Änderungen (Anhängen statt
+das ganze Protokoll bei jedem save_links neu zu schreiben). Neu geschrieben (kompaktiert) wird
+erst, wenn die Datei doppelt so viele Änderungen wie max_entries enthält, nach reset/align oder
+wenn ein anderer Prozess die Datei inzwischen geschrieben hat. Eine halb angehängte letzte Zeile
+(Abbruch beim Schreiben) wird beim Laden ignoriert; Dateien im alten JSON-Format werden gelesen
+und beim nächsten Speichern umgeschrieben.
+
+Während eines Crawls kann das Protokoll links.json voraus sein (Schübe werden nur hier
+gespeichert, siehe KleinanzeigenScraper.save_links); align liefert dann die fehlenden Änderungen.
+"""
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+from store import atomic_write_text, file_signature
+
+logger = logging.getLogger(__name__)
+
+OP_ADD = 'add'
+OP_UPDATE = 'update'
+OP_REMOVE = 'remove'
+
+
+class ChangeLog:
+    """
+    Begrenztes Änderungsprotokoll mit Versionszähler
+
+    version: Version des aktuellen Bestands (wird auch in links.json gespeichert)
+    floor: Kleinste Version, ab der Änderungen lückenlos vorliegen; ältere Clients
+    brauchen einen Snapshot.
+    """
+
+    def __init__(self, path: str = "link_changes.json", max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = 0
+        self.floor = 0
+        self.entries: List[Dict] = []
+        self._signature = None
+        # Noch nicht gespeicherte Änderungen, Änderungszeilen in der Datei, Datei neu schreiben?
+        self._pending: List[Dict] = []
+        self._file_entries = 0
+        self._rewrite = True
+
+    def load(self):
+        self._signature = file_signature(self.path)
+        header: Dict = {}
+        entries: List[Dict] = []
+        complete = True
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+                for number, line in enumerate(lines):
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        if number == len(lines) - 1:
+                            # Unvollständig angehängte letzte Zeile
+                            complete = False
+                            break
+                        raise
+                    if number == 0:
+                        header = data
+                        # Altes Format: ein JSON-Objekt mit allen Änderungen
+                        entries.extend(data.get('changes', ()))
+                    else:
+                        entries.append(data)
+        except Exception as e:
+            logger.error(f"Fehler beim Laden des Änderungsprotokolls: {e}")
+            header, entries, complete = {}, [], False
+        self._file_entries = len(entries)
+        self._rewrite = not complete or 'changes' in header
+        self._pending = []
+        self.version = max(header.get('version', 0), entries[-1]['version'] if entries else 0)
+        self.floor = header.get('floor', self.version)
+        self.entries = entries
+        self._trim()
+
+    def save(self):
+        try:
+            if (self._rewrite or file_signature(self.path) != self._signature
+                    or self._file_entries + len(self._pending) > 2 * self.max_entries):
+                self._compact()
+            elif self._pending:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(self._line(entry) for entry in self._pending))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._file_entries += len(self._pending)
+            self._pending = []
+            self._signature = file_signature(self.path)
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern des Änderungsprotokolls: {e}")
+
+    @staticmethod
+    def _line(data: Dict) -> str:
+        return json.dumps(data, ensure_ascii=False) + '\n'
+
+    def _compact(self):
+        """Schreibt Kopfzeile und die behaltenen Änderungen atomar neu"""
+        lines = [self._line({'version': self.version, 'floor': self.floor})]
+        lines.extend(self._line(entry) for entry in self.entries)
+        atomic_write_text(self.path, ''.join(lines))
+        self._file_entries = len(self.entries)
+        self._rewrite = False
+
+    def _trim(self):
+        if len(self.entries) > self.max_entries:
+            del self.entries[:len(self.entries) - self.max_entries]
+            self.floor = max(self.floor, self.entries[0]['version'] - 1)
+
+    def refresh(self):
+        """Lädt das Protokoll neu, falls ein anderer Prozess es geändert hat"""
+        if file_signature(self.path) != self._signature:
+            self.load()
+
+    def align(self, version: int) -> List[Dict]:
+        """
+        Gleicht das Protokoll mit der Version des geladenen Bestands ab
+
+        Ist der Bestand älter, liegen die fehlenden Änderungen aber noch im Protokoll (Schübe
+        eines laufenden oder abgebrochenen Crawls, die nur hier gespeichert sind), werden sie
+        zum Nachtragen zurückgegeben. Passen beide sonst nicht zusammen (z.B. Abbruch zwischen
+        links.json und Protokoll oder von Hand bearbeitete links.json), wird das Protokoll
+        verworfen: Clients erhalten dann einen Snapshot.
+
+        Returns:
+            Nachzutragende Änderungen nach Version sortiert (leer, wenn nichts fehlt)
+        """
+        if version == self.version:
+            return []
+        if self.floor <= version < self.version:
+            return self.entries[self._start(version):]
+        logger.warning(f"Änderungsprotokoll (Version {self.version}) passt nicht zu links.json (Version {version}) - wird zurückgesetzt")
+        self.version = version
+        self.floor = version
+        self.entries = []
+        self._pending = []
+        self._rewrite = True
+        return []
+
+    def _start(self, since: int) -> int:
+        """Position des ersten Eintrags nach Version since (Einträge sind nach Version sortiert)"""
+        start = len(self.entries)
+        while start > 0 and self.entries[start - 1]['version'] > since:
+            start -= 1
+        return start
+
+    def record(self, op: str, url: str, link: Optional[Dict] = None):
+        """
+        Vermerkt eine Änderung an einem Link (link = neuer Stand bei add/update)
+
+        link wird nicht kopiert: Aufrufer übergeben frische Dicts (LinkRecord.to_dict), die
+        danach nicht mehr verändert werden.
+        """
+        self.version += 1
+        entry = {'version': self.version, 'op': op, 'url': url, 'link': link}
+        self.entries.append(entry)
+        self._pending.append(entry)
+        self._trim()
+
+    def reset(self):
+        """Bestand wurde komplett ersetzt (z.B. alle Links gelöscht) - nur noch Snapshots"""
+        self.version += 1
+        self.floor = self.version
+        self.entries = []
+        self._pending = []
+        self._rewrite = True
+
+    def changes_since(self, since: int) -> Optional[Dict]:
+        """
+        Fasst alle Änderungen nach Version since pro Link zusammen
+
+        Returns:
+            Dict mit 'version', 'added', 'updated' (Link-Dicts) und 'removed' (URLs) oder
+            None, wenn since nicht mehr (oder nie) durch das Protokoll abgedeckt ist
+        """
+        if since < self.floor or since > self.version:
+            return None
+        first_op: Dict[str, str] = {}
+        last_entry: Dict[str, Dict] = {}
+        for entry in self.entries[self._start(since):]:
+            first_op.setdefault(entry['url'], entry['op'])
+            last_entry[entry['url']] = entry
+
+        added, updated, removed = [], [], []
+        for url, entry in last_entry.items():
+            existed_before = first_op[url] != OP_ADD
+            if entry['op'] == OP_REMOVE:
+                if existed_before:
+                    removed.append(url)
+            elif existed_before:
+                updated.append(entry['link'])
+            else:
+                added.append(entry['link'])
+        return {'version': self.version, 'added': added, 'updated': updated, 'removed': removed}
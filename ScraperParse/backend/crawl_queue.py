@@ -0,0 +1,117 @@
+"""
+Serialisierung von Schreibzugriffen und Zusammenlegen gleichzeitiger Suchen
+- WriteQueue: ein einzelner Schreib-Thread, über den alle Änderungen am Link-Bestand laufen
+- CrawlCoalescer: hängt neue Suchen an bereits laufende Crawls an, statt doppelt zu crawlen
+"""
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """
+    Führt alle übergebenen Änderungen nacheinander auf einem einzigen Thread aus
+
+    Aufrufe aus dem Schreib-Thread selbst werden direkt ausgeführt (kein Deadlock bei
+    verschachtelten Änderungen).
+    """
+
+    def __init__(self, name: str = "link-writer"):
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Reiht eine Änderung ein und gibt ein Future mit dem Ergebnis zurück"""
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+        self._ensure_started()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Reiht eine Änderung ein und wartet auf das Ergebnis"""
+        return self.submit(fn, *args, **kwargs).result()
+
+
+class CrawlCoalescer:
+    """
+    Legt gleichzeitige Crawls mit gleichen oder überlappenden Schlüsseln zusammen
+
+    Ein Schlüssel ist z.B. (Such-URL, Makler). Schlüssel, die bereits von einem laufenden
+    Crawl abgedeckt werden, werden nicht erneut gecrawlt - der Aufrufer wartet stattdessen
+    auf dessen Ergebnis. Nur die übrigen Schlüssel lösen einen eigenen Crawl aus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running: List[tuple] = []  # (frozenset(Schlüssel), Future)
+
+    def run(self, keys: Iterable[Hashable], start: Callable[[List[Hashable]], Any]) -> List[Any]:
+        """
+        Führt einen Crawl für die Schlüssel aus oder hängt sich an laufende Crawls an
+
+        Args:
+            keys: Angefragte Schlüssel
+            start: Startet einen Crawl für eine Liste nicht abgedeckter Schlüssel
+
+        Returns:
+            Ergebnisse aller Crawls, die Schlüssel dieser Anfrage bearbeitet haben
+        """
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            attached = []
+            covered = set()
+            for running_keys, future in self._running:
+                overlap = running_keys.intersection(keys)
+                if overlap:
+                    attached.append(future)
+                    covered |= overlap
+            remaining = [key for key in keys if key not in covered]
+            own = None
+            if remaining:
+                own = Future()
+                own.set_running_or_notify_cancel()
+                entry = (frozenset(remaining), own)
+                self._running.append(entry)
+
+        if attached:
+            logger.info(f"{len(covered)} von {len(keys)} Such-URLs werden bereits gecrawlt - hänge an {len(attached)} laufende(n) Crawl(s) an")
+
+        if own is not None:
+            try:
+                own.set_result(start(remaining))
+            except BaseException as e:
+                own.set_exception(e)
+            finally:
+                with self._lock:
+                    self._running.remove(entry)
+
+        futures = attached + ([own] if own is not None else [])
+        return [future.result() for future in futures]
@@ -0,0 +1,256 @@
+"""
+Strukturierte Berichte pro Crawl-Lauf
+Erfasst für jede Such-URL die geladenen Seiten (HTTP-Status, Lade- und Parse-Zeit, Links),
+den Abbruchgrund, wiederholte und aufgegebene Seiten und die Anzahl neuer bzw. bekannter Links
+sowie p50/p95-Latenzen über den ganzen Lauf. Berichte werden als JSON unter crawl_reports/ gespeichert.
+"""
+import math
+import os
+import re
+import time
+import uuid
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from store import atomic_write_json, read_json
+
+logger = logging.getLogger(__name__)
+
+# Abbruchgründe je Such-URL
+STOP_EMPTY_PAGE = 'empty_page'
+STOP_ERROR = 'error'
+STOP_MAX_PAGES = 'max_pages'
+STOP_LAST_PAGE = 'last_page'
+STOP_INVALID_URL = 'invalid_url'
+# Seite 1 unverändert seit dem letzten vollständigen Crawl (result_fingerprint.py)
+STOP_UNCHANGED = 'unchanged'
+
+_RUN_ID_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$')
+
+
+def is_valid_run_id(run_id: str) -> bool:
+    """Prüft das Format einer Lauf-ID (schützt auch Dateipfade vor fremden Eingaben)"""
+    return bool(run_id) and _RUN_ID_PATTERN.match(run_id) is not None
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Perzentil nach Nearest-Rank-Methode (None bei leerer Liste)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return round(ordered[min(rank, len(ordered)) - 1], 1)
+
+
+class UrlReport:
+    """Bericht für eine Such-URL innerhalb eines Laufs"""
+
+    def __init__(self, search_url: str, makler: Optional[str]):
+        self.search_url = search_url
+        self.makler = makler
+        self.pages: List[Dict] = []
+        self.stop_reason: Optional[str] = None
+        self.links_found = 0
+        # Seitenzahl laut Seite 1 (None = unbekannt, Seiten wurden bis zur ersten leeren geladen)
+        self.page_count: Optional[int] = None
+        self.new_links = 0
+        self.known_links = 0
+        # Fingerabdruck von Seite 1 und Ergebnis des Vergleichs (siehe result_fingerprint.py)
+        self.fingerprint: Optional[str] = None
+        self.fingerprint_status: Optional[str] = None
+        self._started = time.perf_counter()
+        self.total_ms: Optional[float] = None
+
+    def add_page(self, page: int, url: str, status: Optional[int], fetch_ms: float, parse_ms: Optional[float] = None,
+                 links_found: int = 0, error: Optional[str] = None, attempts: int = 1, abandoned: bool = False):
+        """attempts = Anzahl Versuche inkl. Wiederholungen; abandoned = Seite trotz Wiederholungen nicht geladen"""
+        self.pages.append({
+            'page': page,
+            'url': url,
+            'status': status,
+            'fetch_ms': round(fetch_ms, 1),
+            'parse_ms': round(parse_ms, 1) if parse_ms is not None else None,
+            'links_found': links_found,
+            'error': error,
+            'attempts': attempts,
+            'abandoned': abandoned
+        })
+
+    def load(self, data: Dict):
+        """Übernimmt Seiten, Abbruchgrund und Zeiten aus dem Bericht eines anderen Prozesses (verteilter Crawl)"""
+        self.pages = list(data.get('pages', []))
+        self.page_count = data.get('page_count')
+        self.links_found = data.get('links_found', 0)
+        self.stop_reason = data.get('stop_reason')
+        self.total_ms = data.get('total_ms')
+        self.fingerprint = data.get('fingerprint')
+
+    def stop(self, reason: str):
+        self.stop_reason = reason
+        self.total_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            'search_url': self.search_url,
+            'makler': self.makler,
+            'page_count': self.page_count,
+            'pages_fetched': len(self.pages),
+            'retried_pages': sum(1 for page in self.pages if page['attempts'] > 1),
+            'abandoned_pages': sum(1 for page in self.pages if page['abandoned']),
+            'links_found': self.links_found,
+            'new_links': self.new_links,
+            'known_links': self.known_links,
+            'stop_reason': self.stop_reason,
+            'fingerprint': self.fingerprint,
+            'fingerprint_status': self.fingerprint_status,
+            'total_ms': self.total_ms,
+            'pages': self.pages
+        }
+
+
+class CrawlReport:
+    """Bericht für einen Crawl-Lauf (thread-sicher beim Anlegen der URL-Berichte)"""
+
+    def __init__(self):
+        self.run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.started_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.status = 'running'
+        self.url_reports: List[UrlReport] = []
+        self.new_links_total = 0
+        self.extra: Dict = {}
+        self._lock = threading.Lock()
+
+    def start_url(self, search_url: str, makler: Optional[str]) -> UrlReport:
+        report = UrlReport(search_url, makler)
+        with self._lock:
+            self.url_reports.append(report)
+        return report
+
+    def finish(self, new_links_total: int, status: str = 'finished'):
+        self.new_links_total = new_links_total
+        self.status = status
+        self.finished_at = datetime.now().isoformat()
+
+    def summary(self) -> Dict:
+        """Aggregierte Kennzahlen: Seiten, Links, Abbruchgründe und p50/p95-Latenzen"""
+        with self._lock:
+            url_reports = list(self.url_reports)
+        pages = [page for report in url_reports for page in report.pages]
+        fetch_ms = [page['fetch_ms'] for page in pages]
+        parse_ms = [page['parse_ms'] for page in pages if page['parse_ms'] is not None]
+        url_ms = [report.total_ms for report in url_reports if report.total_ms is not None]
+        stop_reasons: Dict[str, int] = {}
+        for report in url_reports:
+            if report.stop_reason:
+                stop_reasons[report.stop_reason] = stop_reasons.get(report.stop_reason, 0) + 1
+        # Übersprungen = Seite 1 unverändert; Anteil bezogen auf alle Such-URLs des Laufs
+        fingerprint_status: Dict[str, int] = {}
+        for report in url_reports:
+            if report.fingerprint_status:
+                fingerprint_status[report.fingerprint_status] = fingerprint_status.get(report.fingerprint_status, 0) + 1
+        skipped = sum(1 for report in url_reports if report.stop_reason == STOP_UNCHANGED)
+        slowest = sorted((r for r in url_reports if r.total_ms is not None), key=lambda r: r.total_ms, reverse=True)[:10]
+        return {
+            'search_urls': len(url_reports),
+            'pages_fetched': len(pages),
+            'page_errors': sum(1 for page in pages if page['error']),
+            'retried_pages': sum(1 for page in pages if page['attempts'] > 1),
+            'retries': sum(page['attempts'] - 1 for page in pages),
+            'abandoned_pages': sum(1 for page in pages if page['abandoned']),
+            'links_found': sum(report.links_found for report in url_reports),
+            'new_links': self.new_links_total,
+            'stop_reasons': stop_reasons,
+            'skipped_unchanged': skipped,
+            'skip_rate': round(skipped / len(url_reports), 3) if url_reports else None,
+            'fingerprint_status': fingerprint_status,
+            'fetch_ms': {'p50': percentile(fetch_ms, 50), 'p95': percentile(fetch_ms, 95)},
+            'parse_ms': {'p50': percentile(parse_ms, 50), 'p95': percentile(parse_ms, 95)},
+            'url_total_ms': {'p50': percentile(url_ms, 50), 'p95': percentile(url_ms, 95)},
+            'slowest_urls': [{'search_url': r.search_url, 'total_ms': r.total_ms} for r in slowest],
+            'failed_urls': [r.search_url for r in url_reports if r.stop_reason == STOP_ERROR]
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            url_reports = list(self.url_reports)
+        return {
+            'run_id': self.run_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'summary': self.summary(),
+            **self.extra,
+            'urls': [report.to_dict() for report in url_reports]
+        }
+
+
+class CrawlReportStore:
+    """Hält laufende Berichte im Speicher und speichert abgeschlossene als JSON-Dateien"""
+
+    def __init__(self, directory: str = "crawl_reports", max_reports: int = 200):
+        self.directory = directory
+        self.max_reports = max_reports
+        self._active: Dict[str, CrawlReport] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> CrawlReport:
+        report = CrawlReport()
+        with self._lock:
+            self._active[report.run_id] = report
+        return report
+
+    def save(self, report: CrawlReport):
+        """Speichert einen abgeschlossenen Bericht und entfernt ihn aus den laufenden"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write_json(os.path.join(self.directory, f"{report.run_id}.json"), report.to_dict(), indent=None)
+            self._prune()
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern des Crawl-Berichts {report.run_id}: {e}")
+        finally:
+            with self._lock:
+                self._active.pop(report.run_id, None)
+
+    def _prune(self):
+        run_ids = sorted(name[:-len('.json')] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for run_id in run_ids[:-self.max_reports]:
+            os.remove(os.path.join(self.directory, f"{run_id}.json"))
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        """Gibt einen laufenden oder gespeicherten Bericht zurück"""
+        if not is_valid_run_id(run_id):
+            return None
+        with self._lock:
+            report = self._active.get(run_id)
+        if report is not None:
+            return report.to_dict()
+        path = os.path.join(self.directory, f"{run_id}.json")
+        try:
+            return read_json(path, None)
+        except Exception as e:
+            logger.error(f"Fehler beim Lesen des Crawl-Berichts {run_id}: {e}")
+            return None
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        """Kurzübersicht der neuesten Läufe (laufende zuerst)"""
+        with self._lock:
+            running = [{'run_id': r.run_id, 'status': r.status, 'started_at': r.started_at} for r in self._active.values()]
+        finished = []
+        if os.path.isdir(self.directory):
+            names = sorted((n for n in os.listdir(self.directory) if n.endswith('.json')), reverse=True)[:limit]
+            for name in names:
+                try:
+                    data = read_json(os.path.join(self.directory, name), {})
+                except Exception:
+                    continue
+                finished.append({
+                    'run_id': data.get('run_id'),
+                    'status': data.get('status'),
+                    'started_at': data.get('started_at'),
+                    'finished_at': data.get('finished_at'),
+                    'summary': data.get('summary')
+                })
+        return (running + finished)[:limit]
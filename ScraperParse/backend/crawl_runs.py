@@ -0,0 +1,136 @@
+"""
+Verlauf der Crawl-Läufe mit Index Lauf -> neue Links
+Jeder Crawl schreibt beim Zusammenführen die neu gefundenen Links unter seiner Lauf-ID
+(wie die Crawl-Berichte, /crawls/{run_id}) nach crawl_runs/<run_id>.json, Schub für Schub in
+Fundreihenfolge. Die letzte Suche (last_search.json) verweist zusätzlich auf ihren Lauf.
+
+Damit lassen sich die Links jedes früheren Laufs exportieren (/export/last?run_id=...): die
+URLs des Laufs werden über den URL-Index des Bestands (LinkSnapshot.select) nachgeschlagen,
+statt den ganzen Bestand zu durchsuchen. Inzwischen gelöschte Links fehlen im Export.
+
+Geschrieben wird nur über den Schreib-Thread des Scrapers (unter der Zustands-Sperre);
+mehrere Prozesse lesen dieselben Dateien. Gelesene Läufe werden je Datei-Signatur gecacht.
+Wie bei den Crawl-Berichten bleiben nur die neuesten max_runs Läufe erhalten.
+"""
+import os
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from store import atomic_write_json, file_signature, read_json
+from crawl_report import is_valid_run_id
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlRunStore:
+    """
+    Gespeicherte Crawl-Läufe
+
+    Args:
+        directory: Verzeichnis für die Lauf-Dateien
+        max_runs: Anzahl gespeicherter Läufe (wie CrawlReportStore.max_reports)
+        cached_runs: Anzahl Läufe, deren Links im Speicher gehalten werden
+    """
+
+    def __init__(self, directory: str = "crawl_runs", max_runs: int = 200, cached_runs: int = 32):
+        self.directory = directory
+        self.max_runs = max_runs
+        self.cached_runs = cached_runs
+        # Lauf-ID -> (Signatur der Datei, URLs)
+        self._cache: "OrderedDict[str, Tuple[tuple, Tuple[str, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Neuester Lauf, gültig solange sich das Verzeichnis nicht ändert (Signatur des Verzeichnisses)
+        self._latest: Optional[str] = None
+        self._latest_signature = None
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def record(self, run_id: str, urls: List[str], append: bool):
+        """
+        Speichert neue Links eines Laufs; läuft auf dem Schreib-Thread
+
+        Args:
+            run_id: ID des Crawl-Laufs
+            urls: Im Schub neu gefundene Links
+            append: Weiterer Schub desselben Laufs (sonst beginnt der Lauf neu)
+        """
+        if not is_valid_run_id(run_id):
+            return
+        previous = self.links(run_id) if append else None
+        data = {
+            'run_id': run_id,
+            'updated_at': datetime.now().isoformat(),
+            'links': list(previous or ()) + list(urls)
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(run_id)
+            atomic_write_json(path, data, indent=None)
+            if not append:
+                self._prune()
+            with self._lock:
+                self._cache[run_id] = (file_signature(path), tuple(data['links']))
+                self._cache.move_to_end(run_id)
+                self._trim()
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern des Crawl-Laufs {run_id}: {e}")
+
+    def _prune(self):
+        """Löscht die ältesten Läufe über max_runs (beim Beginn eines neuen Laufs)"""
+        for run_id in self.run_ids()[:-self.max_runs]:
+            try:
+                os.remove(self._path(run_id))
+            except OSError:
+                pass
+            with self._lock:
+                self._cache.pop(run_id, None)
+
+    def _trim(self):
+        while len(self._cache) > self.cached_runs:
+            self._cache.popitem(last=False)
+
+    def links(self, run_id: str) -> Optional[Tuple[str, ...]]:
+        """Neue Links eines Laufs in Fundreihenfolge (None, wenn der Lauf unbekannt ist)"""
+        if not is_valid_run_id(run_id):
+            return None
+        path = self._path(run_id)
+        signature = file_signature(path)
+        if signature is None:
+            return None
+        with self._lock:
+            cached = self._cache.get(run_id)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(run_id)
+                return cached[1]
+        try:
+            urls = tuple(read_json(path, {}).get('links', []))
+        except Exception as e:
+            logger.error(f"Fehler beim Lesen des Crawl-Laufs {run_id}: {e}")
+            return None
+        with self._lock:
+            self._cache[run_id] = (signature, urls)
+            self._trim()
+        return urls
+
+    def run_ids(self) -> List[str]:
+        """Alle gespeicherten Läufe, älteste zuerst (die ID beginnt mit dem Startzeitpunkt)"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(self.directory)
+                      if name.endswith('.json') and is_valid_run_id(name[:-len('.json')]))
+
+    def latest(self) -> Optional[str]:
+        """Neuester gespeicherter Lauf; das Verzeichnis wird nur nach Änderungen neu gelesen"""
+        signature = file_signature(self.directory)
+        with self._lock:
+            if signature == self._latest_signature:
+                return self._latest
+        run_ids = self.run_ids()
+        with self._lock:
+            self._latest = run_ids[-1] if run_ids else None
+            self._latest_signature = signature
+            return self._latest
@@ -0,0 +1,141 @@
+"""
+Worker für den verteilten Crawl
+Leiht sich Such-URLs aus der gemeinsamen Auftragswarteschlange (lease_queue.py), lädt und
+parst die Ergebnisseiten und liefert die gefundenen Links samt Seitenbericht zurück. Links,
+Blacklist und Makler-Zuordnung werden ausschließlich im Koordinator (dem Backend mit
+CRAWL_QUEUE) zusammengeführt - Worker schreiben keine Bestandsdateien.
+
+Während ein Auftrag läuft, wird die Lease regelmäßig verlängert. Stirbt der Worker, läuft die
+Lease ab und ein anderer Worker übernimmt den Auftrag.
+
+Aufruf: python crawl_worker.py --queue /shared/crawl_queue.db [--threads 4]
+Egress, Streaming, Wiederholungen und Circuit Breaker werden wie im Backend über
+egress.json bzw. Umgebungsvariablen konfiguriert.
+"""
+import argparse
+import os
+import signal
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from crawl_report import UrlReport, STOP_ERROR
+from egress import SessionCache
+from lease_queue import Lease, LeaseQueue, default_worker_id
+from log_setup import setup_logging
+from resilience import RetryPolicy, HostCircuitBreaker
+from scraper import KleinanzeigenScraper
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlWorker:
+    """
+    Arbeitet Aufträge mit threads parallelen Such-URLs ab
+
+    Args:
+        queue: Gemeinsame Auftragswarteschlange
+        scraper: Scraper für Abruf und Parsen (der Bestand wird nie geladen)
+        threads: Anzahl gleichzeitig bearbeiteter Aufträge
+        idle_seconds: Wartezeit, wenn kein Auftrag offen ist
+    """
+
+    def __init__(self, queue: LeaseQueue, scraper: KleinanzeigenScraper, threads: int = 4, idle_seconds: float = 1.0):
+        self.queue = queue
+        self.scraper = scraper
+        self.threads = threads
+        self.idle_seconds = idle_seconds
+        self.stopping = threading.Event()
+        self.sessions = SessionCache()
+        self.page_executor = ThreadPoolExecutor(max_workers=scraper.egress.total_concurrency(), thread_name_prefix='page')
+
+    def run(self):
+        """Läuft bis stop(); laufende Aufträge werden noch abgeschlossen"""
+        workers = [threading.Thread(target=self._loop, name=f"crawl-worker-{i}") for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.page_executor.shutdown()
+        self.sessions.close()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _loop(self):
+        worker_id = default_worker_id()
+        while not self.stopping.is_set():
+            try:
+                lease = self.queue.lease(worker_id)
+            except Exception as e:
+                logger.error(f"Fehler beim Abholen eines Auftrags: {e}")
+                lease = None
+            if lease is None:
+                self.stopping.wait(self.idle_seconds)
+                continue
+            self.process(lease)
+
+    def process(self, lease: Lease):
+        """Crawlt eine Such-URL und liefert das Ergebnis ab"""
+        logger.info(f"Auftrag {lease.job_id} (Versuch {lease.attempts}): {lease.search_url}")
+        url_report = UrlReport(lease.search_url, lease.makler)
+        done = threading.Event()
+
+        def keep_alive():
+            while not done.wait(self.queue.lease_seconds / 3):
+                try:
+                    if not self.queue.heartbeat(lease):
+                        logger.warning(f"Lease für Auftrag {lease.job_id} verloren - Ergebnis wird verworfen")
+                        return
+                except Exception as e:
+                    logger.error(f"Fehler beim Verlängern der Lease {lease.job_id}: {e}")
+
+        heartbeat = threading.Thread(target=keep_alive, name=f"lease-{lease.job_id}", daemon=True)
+        heartbeat.start()
+        try:
+            links = self.scraper.scrape_search_string(lease.search_url, lease.max_pages, url_report=url_report,
+                                                      sessions=self.sessions, page_executor=self.page_executor,
+                                                      known_fingerprint=lease.known_fingerprint)
+        except Exception as e:
+            logger.error(f"Fehler bei Auftrag {lease.job_id}: {e}")
+            self.queue.fail(lease, str(e))
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+
+        # Ganz ohne Ergebnis abgebrochen (z.B. Seite 1 nicht erreichbar): anderer Worker versucht es erneut
+        if url_report.stop_reason == STOP_ERROR and not links:
+            self.queue.fail(lease, f"Keine Seite geladen ({lease.search_url})")
+            return
+        if self.queue.complete(lease, list(links), url_report.to_dict()):
+            logger.info(f"Auftrag {lease.job_id} erledigt: {len(links)} Links")
+        else:
+            logger.warning(f"Auftrag {lease.job_id} wurde inzwischen neu vergeben - Ergebnis verworfen")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queue', default=os.environ.get('CRAWL_QUEUE', 'crawl_queue.db'), help='Pfad der Auftragsdatenbank')
+    parser.add_argument('--threads', type=int, default=4, help='Gleichzeitig bearbeitete Such-URLs')
+    parser.add_argument('--lease', type=float, default=float(os.environ.get('CRAWL_LEASE_SECONDS', '60')), help='Lease-Dauer in Sekunden')
+    parser.add_argument('--log-file', default='crawl_worker.log')
+    args = parser.parse_args()
+
+    setup_logging(args.log_file)
+    scraper = KleinanzeigenScraper(
+        streaming=os.environ.get("SCRAPER_STREAMING") == "1",
+        lazy=True,
+        retry=RetryPolicy.from_env(),
+        breaker=HostCircuitBreaker.from_env()
+    )
+    worker = CrawlWorker(LeaseQueue(args.queue, lease_seconds=args.lease), scraper, threads=args.threads)
+    # SIGTERM/Strg+C: keine neuen Aufträge mehr, laufende noch abliefern
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    logger.info(f"Crawl-Worker gestartet ({args.threads} Threads, Warteschlange {args.queue})")
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
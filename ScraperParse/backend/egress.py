@@ -0,0 +1,257 @@
+"""
+Egress-Pool für das Scraping
+Verteilt Anfragen auf mehrere Ausgangswege (Proxy + Header-Profil), jeweils mit eigenem
+Parallelitäts- und Ratenlimit sowie Health-Score. Fehlerhafte Wege werden aus dem Pool entfernt
+und nach readmit_after Sekunden über eine einzelne Probeanfrage wieder aufgenommen.
+
+Gegen eine Route zählen nur Fehler des Ausgangswegs (route_failure): Verbindungsfehler, Timeouts,
+HTTP 5xx/429 und 407 (Proxy-Authentifizierung). Antworten wie 404/410 für gelöschte Anzeigen
+hat die Route korrekt durchgereicht - sie zählen als Erfolg der Route.
+
+Konfiguration über egress.json (Pfad über Umgebungsvariable EGRESS_CONFIG änderbar):
+
+    {
+      "min_health": 0.3,
+      "readmit_after": 60,
+      "routes": [
+        {"name": "direkt", "proxy": null, "max_concurrency": 4, "rate_per_second": 5},
+        {"name": "proxy-1", "proxy": "http://127.0.0.1:8899", "max_concurrency": 2,
+         "rate_per_second": 2, "headers": {"User-Agent": "..."}}
+      ]
+    }
+
+Zum Testen können lokale Stand-in-Proxies (z.B. 127.0.0.1) eingetragen werden;
+python bench_egress.py prüft Budgets, Entfernen und Wiederaufnahme gegen lokale Proxy-Stubs.
+"""
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import requests
+
+from store import read_json
+from resilience import is_transient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+def route_failure(error: requests.exceptions.RequestException) -> bool:
+    """Fehler, die gegen den Ausgangsweg zählen (nicht z.B. 404 einer gelöschten Anzeige)"""
+    if error.response is not None and error.response.status_code == 407:
+        return True
+    return is_transient(error)
+
+
+class EgressRoute:
+    """Ein Ausgangsweg: optionaler Proxy, Header-Profil, Budget und Health-Score"""
+
+    def __init__(self, name: str, proxy: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 max_concurrency: int = 4, rate_per_second: Optional[float] = None):
+        self.name = name
+        self.proxy = proxy
+        self.headers = dict(headers) if headers else dict(DEFAULT_HEADERS)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate_per_second = rate_per_second
+        # Health-Score als gleitender Mittelwert der Erfolgsquote (1.0 = gesund)
+        self.health = 1.0
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.active = True
+        # Zeitpunkt des Entfernens (monotonic) und Thread der laufenden Probeanfrage
+        self.deactivated_at = 0.0
+        self.probe_thread: Optional[int] = None
+        self._next_slot = 0.0
+        self._rate_lock = threading.Lock()
+
+    def create_session(self) -> requests.Session:
+        """Erstellt eine Session mit dem Header-Profil und Proxy dieser Route"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        if self.proxy:
+            session.proxies.update({'http': self.proxy, 'https': self.proxy})
+        return session
+
+    def throttle(self):
+        """Wartet, bis das Ratenbudget dieser Route die nächste Anfrage erlaubt"""
+        if not self.rate_per_second:
+            return
+        interval = 1.0 / self.rate_per_second
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'proxy': self.proxy,
+            'max_concurrency': self.max_concurrency,
+            'rate_per_second': self.rate_per_second,
+            'health': round(self.health, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'in_flight': self.in_flight,
+            'active': self.active,
+            'probing': self.probe_thread is not None
+        }
+
+
+class EgressPool:
+    """
+    Pool von Egress-Routen
+
+    Vergibt freie Routen nach Health-Score und Auslastung und entfernt Routen,
+    deren Health-Score unter min_health fällt. Die letzte aktive Route bleibt immer erhalten.
+    Nach readmit_after Sekunden erhält eine entfernte Route eine einzelne Probeanfrage: nur
+    deren Ergebnis (nicht das verspäteter Anfragen von vor dem Entfernen) nimmt sie wieder auf
+    oder startet die nächste Wartezeit.
+    """
+
+    def __init__(self, routes: List[EgressRoute], min_health: float = 0.3, min_requests: int = 5, smoothing: float = 0.2,
+                 readmit_after: float = 60.0):
+        if not routes:
+            raise ValueError("Egress-Pool braucht mindestens eine Route")
+        self.routes = routes
+        self.min_health = min_health
+        self.min_requests = min_requests
+        self.smoothing = smoothing
+        self.readmit_after = readmit_after
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "EgressPool":
+        """
+        Lädt den Pool aus einer JSON-Konfiguration
+
+        Ohne Konfigurationsdatei wird eine einzelne direkte Route mit Standard-Headern verwendet.
+        """
+        path = path or os.environ.get('EGRESS_CONFIG', 'egress.json')
+        try:
+            config = read_json(path, None)
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der Egress-Konfiguration: {e}")
+            config = None
+        if not config or not config.get('routes'):
+            return cls([EgressRoute('direkt')])
+        routes = [
+            EgressRoute(
+                name=route.get('name') or f"route-{i}",
+                proxy=route.get('proxy'),
+                headers=route.get('headers'),
+                max_concurrency=route.get('max_concurrency', 4),
+                rate_per_second=route.get('rate_per_second')
+            )
+            for i, route in enumerate(config['routes'], start=1)
+        ]
+        logger.info(f"Egress-Pool mit {len(routes)} Route(n) geladen")
+        return cls(routes, min_health=config.get('min_health', 0.3), readmit_after=config.get('readmit_after', 60.0))
+
+    def total_concurrency(self) -> int:
+        """Summe der Parallelitätsbudgets aller aktiven Routen"""
+        return sum(route.max_concurrency for route in self.routes if route.active)
+
+    def _pick(self) -> Optional[EgressRoute]:
+        # Entfernte Route mit abgelaufener Wartezeit: die nächste Anfrage ist ihre Probe
+        now = time.monotonic()
+        for route in self.routes:
+            if (not route.active and route.probe_thread is None and route.in_flight < route.max_concurrency
+                    and now - route.deactivated_at >= self.readmit_after):
+                route.probe_thread = threading.get_ident()
+                return route
+        candidates = [r for r in self.routes if r.active and r.in_flight < r.max_concurrency]
+        if not candidates:
+            return None
+        # Gesündeste Route zuerst, bei Gleichstand die am wenigsten ausgelastete
+        return max(candidates, key=lambda r: (r.health, -r.in_flight / r.max_concurrency))
+
+    @contextmanager
+    def acquire(self):
+        """Belegt einen Slot auf einer freien Route für die Dauer des with-Blocks"""
+        with self._cond:
+            route = self._pick()
+            while route is None:
+                self._cond.wait()
+                route = self._pick()
+            route.in_flight += 1
+        try:
+            yield route
+        finally:
+            with self._cond:
+                route.in_flight -= 1
+                if route.probe_thread == threading.get_ident():
+                    # Probe ohne Ergebnis (z.B. Abbruch vor dem Laden): später erneut versuchen
+                    route.probe_thread = None
+                    route.deactivated_at = time.monotonic()
+                self._cond.notify_all()
+
+    def report(self, route: EgressRoute, success: bool):
+        """
+        Aktualisiert den Health-Score nach einer Anfrage und entfernt fehlerhafte Routen
+
+        Args:
+            route: Route der Anfrage (aus acquire)
+            success: False nur bei Fehlern des Ausgangswegs (siehe route_failure)
+        """
+        with self._cond:
+            route.requests += 1
+            if not success:
+                route.failures += 1
+            route.health = (1 - self.smoothing) * route.health + self.smoothing * (1.0 if success else 0.0)
+            if route.probe_thread == threading.get_ident():
+                route.probe_thread = None
+                if success:
+                    route.active = True
+                    route.health = 1.0
+                    logger.info(f"Egress-Route '{route.name}' nach erfolgreicher Probe wieder aufgenommen")
+                else:
+                    route.deactivated_at = time.monotonic()
+                self._cond.notify_all()
+                return
+            unhealthy = route.requests >= self.min_requests and route.health < self.min_health
+            others_active = any(r.active for r in self.routes if r is not route)
+            if route.active and unhealthy and others_active:
+                route.active = False
+                route.deactivated_at = time.monotonic()
+                logger.warning(f"Egress-Route '{route.name}' entfernt (Health {route.health:.2f}, {route.failures}/{route.requests} Fehler)")
+                self._cond.notify_all()
+
+    def status(self) -> List[Dict]:
+        """Status aller Routen (für Monitoring)"""
+        with self._cond:
+            return [route.to_dict() for route in self.routes]
+
+
+class SessionCache:
+    """Eine Session je Thread und Route für die Dauer eines Crawls (Verbindungen werden wiederverwendet)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._lock = threading.Lock()
+
+    def get(self, route: EgressRoute) -> requests.Session:
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        session = sessions.get(route.name)
+        if session is None:
+            session = sessions[route.name] = route.create_session()
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
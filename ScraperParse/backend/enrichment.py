@@ -0,0 +1,205 @@
+"""
+Anreicherung neuer Anzeigen mit Daten aus der Detailseite
+Lädt /s-anzeige/-Seiten parallel (begrenzt über Worker und Egress-Pool), extrahiert
+Preis, Wohnfläche, Zimmer und Einstellungsdatum und cached die Ergebnisse.
+Detailseiten laufen über dieselben Wiederholungen und denselben Circuit Breaker wie die
+Suchseiten (resilience.fetch_with_retry) und teilen sich je Thread und Route eine Session.
+"""
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from store import FileLock, read_json, atomic_write_json
+from egress import SessionCache, route_failure
+from resilience import RetryPolicy, HostCircuitBreaker, fetch_with_retry
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Reihenfolge der Felder, wie sie auch im CSV-Export erscheinen
+DETAIL_FIELDS = ['title', 'price', 'living_space', 'rooms', 'posted_at']
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parst eine deutsch formatierte Zahl ('150.000 €', '3,5', '120 m²')"""
+    if not text:
+        return None
+    match = re.search(r'\d[\d.]*(?:,\d+)?', text)
+    if not match:
+        return None
+    number = match.group(0).replace('.', '').replace(',', '.')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def extract_details(html_content: str) -> Dict:
+    """
+    Extrahiert strukturierte Felder aus einer Anzeigen-Detailseite
+
+    Returns:
+        Dict mit 'title', 'price', 'living_space', 'rooms', 'posted_at' (fehlende Felder = None)
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    details = {field: None for field in DETAIL_FIELDS}
+
+    title = soup.select_one('#viewad-title')
+    if title:
+        details['title'] = ' '.join(title.get_text().split())
+
+    price = soup.select_one('#viewad-price')
+    if price:
+        value = parse_number(price.get_text())
+        details['price'] = int(value) if value is not None else None
+
+    # Detail-Liste: <li class="addetailslist--detail">Wohnfläche<span ...--value>120 m²</span></li>
+    for item in soup.select('.addetailslist--detail'):
+        value_element = item.select_one('.addetailslist--detail--value')
+        if not value_element:
+            continue
+        value_text = value_element.get_text().strip()
+        label = item.get_text().replace(value_element.get_text(), '').strip().lower()
+        if label.startswith('wohnfläche'):
+            details['living_space'] = parse_number(value_text)
+        elif label.startswith('zimmer'):
+            details['rooms'] = parse_number(value_text)
+
+    # Einstellungsdatum steht im Extra-Info-Block als TT.MM.JJJJ
+    extra_info = soup.select_one('#viewad-extra-info')
+    if extra_info:
+        match = re.search(r'(\d{2})\.(\d{2})\.(\d{4})', extra_info.get_text())
+        if match:
+            day, month, year = match.groups()
+            try:
+                details['posted_at'] = datetime(int(year), int(month), int(day)).date().isoformat()
+            except ValueError:
+                pass
+
+    return details
+
+
+class ListingEnricher:
+    """
+    Lädt Detailseiten neuer Links parallel und cached die extrahierten Felder
+
+    Die Parallelität ist durch max_workers und zusätzlich durch das Budget des
+    Egress-Pools begrenzt; die Laufzeit wächst damit nicht linear mit der Anzahl Links.
+    retry und breaker sollten die des Scrapers sein, damit ein gesperrter Host auch für
+    Detailseiten gesperrt ist.
+    """
+
+    def __init__(self, egress_pool, cache_file: str = "details_cache.json", max_workers: int = 8, max_cache_entries: int = 50000,
+                 retry: RetryPolicy = None, breaker: HostCircuitBreaker = None):
+        self.egress = egress_pool
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else HostCircuitBreaker()
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.max_cache_entries = max_cache_entries
+        self._cache_lock = FileLock(cache_file + '.lock')
+        # Wird erst beim ersten enrich() geladen (hält den Start schnell)
+        self._cache: Optional[Dict[str, Dict]] = None
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            return read_json(self.cache_file, {}).get('details', {})
+        except Exception as e:
+            logger.error(f"Fehler beim Laden des Detail-Caches: {e}")
+            return {}
+
+    def _save_cache(self, new_entries: Dict[str, Dict]):
+        """Übernimmt neue Einträge in den Cache (auf aktuellem Stand der Datei) und speichert"""
+        try:
+            with self._cache_lock.acquire():
+                cache = self._load_cache()
+                cache.update(new_entries)
+                if len(cache) > self.max_cache_entries:
+                    # Älteste Einträge verwerfen (Dict behält Einfügereihenfolge)
+                    for url in list(cache)[:len(cache) - self.max_cache_entries]:
+                        del cache[url]
+                atomic_write_json(self.cache_file, {'details': cache}, indent=None)
+                self._cache = cache
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern des Detail-Caches: {e}")
+
+    def fetch_details(self, url: str, sessions: SessionCache = None) -> Optional[Dict]:
+        """
+        Lädt eine Detailseite über eine freie Egress-Route und extrahiert die Felder
+
+        Jeder Versuch belegt einen eigenen Slot im Egress-Pool; vorübergehende Fehler werden
+        wie bei Suchseiten wiederholt.
+
+        Args:
+            url: URL der Detailseite
+            sessions: Optional Sessions je Thread und Route (sonst eine Session für diesen Aufruf)
+        """
+        own_sessions = sessions is None
+        if own_sessions:
+            sessions = SessionCache()
+
+        def fetch_once():
+            with self.egress.acquire() as route:
+                route.throttle()
+                try:
+                    response = sessions.get(route).get(url, timeout=10)
+                    response.raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    self.egress.report(route, not route_failure(e))
+                    raise
+                self.egress.report(route, True)
+                return response
+
+        try:
+            response = fetch_with_retry(fetch_once, url, urlparse(url).netloc, self.retry, self.breaker)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Detailseite konnte nicht geladen werden: {url}: {e}")
+            return None
+        finally:
+            if own_sessions:
+                sessions.close()
+        try:
+            details = extract_details(response.text)
+        except Exception as e:
+            logger.error(f"Fehler beim Auslesen der Detailseite {url}: {e}")
+            return None
+        details['fetched_at'] = datetime.now().isoformat()
+        return details
+
+    def enrich(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        Gibt für jede URL die Detaildaten zurück (aus dem Cache oder frisch geladen)
+
+        Returns:
+            Dict mit URL als Key und Detail-Dict als Value (nicht ladbare URLs fehlen)
+        """
+        if self._cache is None:
+            self._cache = self._load_cache()
+        results = {url: self._cache[url] for url in urls if url in self._cache}
+        missing = [url for url in dict.fromkeys(urls) if url not in results]
+        if not missing:
+            return results
+
+        fetched = {}
+        # Eine Session je Worker-Thread und Route für alle Detailseiten dieses Aufrufs
+        sessions = SessionCache()
+        fetch = profiling.propagate(lambda url: self.fetch_details(url, sessions))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(missing)))) as executor:
+                for url, details in zip(missing, executor.map(fetch, missing)):
+                    if details is not None:
+                        fetched[url] = details
+        finally:
+            sessions.close()
+
+        if fetched:
+            self._save_cache(fetched)
+        results.update(fetched)
+        logger.info(f"Detaildaten: {len(results) - len(fetched)} aus Cache, {len(fetched)} geladen, {len(missing) - len(fetched)} fehlgeschlagen")
+        return results
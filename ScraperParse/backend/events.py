@@ -0,0 +1,106 @@
+"""
+Live-Ereignisse für das Frontend (Server-Sent Events)
+Crawl-Threads veröffentlichen Ereignisse (neue Links, Fortschritt), jede offene
+/events-Verbindung erhält sie über eine eigene, begrenzte asyncio-Queue. Läuft eine
+Queue über, wird das älteste Ereignis verworfen und der Client per 'resync' aufgefordert,
+den Bestand neu zu laden.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ereignistypen
+EVENT_CRAWL_STARTED = 'crawl_started'
+EVENT_PROGRESS = 'progress'
+EVENT_LINKS = 'links'
+EVENT_MAKLER_FINISHED = 'makler_finished'
+EVENT_CRAWL_FINISHED = 'crawl_finished'
+EVENT_RESYNC = 'resync'
+
+
+def format_sse(event: Dict) -> str:
+    """Formatiert ein Ereignis im text/event-stream-Format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+class Subscription:
+    """Eine offene Verbindung; Ereignisse kommen threadsicher über die Event-Loop an"""
+
+    def __init__(self, broker: "EventBroker", max_queue: int):
+        self._broker = broker
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._overflowed = False
+
+    def put(self, event: Dict):
+        """Aus beliebigem Thread aufrufbar"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event-Loop bereits geschlossen - Verbindung ist weg
+            self._broker.unsubscribe(self)
+
+    def _put(self, event: Dict):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._overflowed = True
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Nächstes Ereignis oder None nach timeout Sekunden (für Keep-Alive)"""
+        if self._overflowed:
+            self._overflowed = False
+            return self._broker.make_event(EVENT_RESYNC, {'reason': 'overflow'})
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Verteilt Ereignisse an alle offenen Verbindungen dieses Prozesses"""
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def make_event(self, event_type: str, data: Dict) -> Dict:
+        return {'id': next(self._ids), 'type': event_type, 'data': data}
+
+    def subscribe(self) -> Subscription:
+        """Neue Verbindung anmelden; muss in der Event-Loop aufgerufen werden"""
+        subscription = Subscription(self, self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict):
+        """Veröffentlicht ein Ereignis an alle Verbindungen (aus beliebigem Thread)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        event = self.make_event(event_type, data)
+        for subscription in subscribers:
+            subscription.put(event)
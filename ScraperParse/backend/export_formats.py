@@ -0,0 +1,99 @@
+"""
+Exportformate neben CSV
+- ndjson: eine JSON-Zeile pro Link, wird gestreamt (Zeitstempel unverändert im ISO-Format)
+- parquet: spaltenbasiert mit typisierten Spalten (Zeitstempel, Makler als Liste, Zahlen),
+  direkt ladbar in pandas/DuckDB/Spark; benötigt pyarrow
+"""
+import io
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from enrichment import DETAIL_FIELDS
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Zeilen pro Chunk beim Streamen
+NDJSON_CHUNK_ROWS = 1000
+
+
+def _record(link_data: Dict) -> Dict:
+    """Flacher Export-Datensatz: URL, Makler-Liste, Zeitstempel und Detailfelder"""
+    details = link_data.get('details') or {}
+    record = {
+        'url': link_data.get('url', ''),
+        'makler_names': link_data.get('makler_names', []),
+        'scraped_at': link_data.get('scraped_at') or None
+    }
+    for field in DETAIL_FIELDS:
+        record[field] = details.get(field)
+    return record
+
+
+def iter_ndjson(links_with_metadata: Iterable[Dict]) -> Iterator[bytes]:
+    """Erzeugt NDJSON in Chunks zu NDJSON_CHUNK_ROWS Zeilen (liest die Datensätze erst beim Streamen)"""
+    lines = []
+    for link_data in links_with_metadata:
+        lines.append(json.dumps(_record(link_data), ensure_ascii=False))
+        if len(lines) >= NDJSON_CHUNK_ROWS:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _typed_array(values: List, arrow_type):
+    """Wandelt ISO-Strings spaltenweise um; ungültige Einzelwerte werden zu null"""
+    strings = pyarrow.array(values, type=pyarrow.string())
+    try:
+        return strings.cast(arrow_type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+        converted = []
+        for value in values:
+            try:
+                converted.append(pyarrow.scalar(value, pyarrow.string()).cast(arrow_type).as_py() if value else None)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+                converted.append(None)
+        return pyarrow.array(converted, type=arrow_type)
+
+
+def to_parquet(links_with_metadata: List[Dict]) -> bytes:
+    """
+    Schreibt die Links als Parquet-Datei
+
+    Raises:
+        RuntimeError: Wenn pyarrow nicht installiert ist
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet-Export benötigt pyarrow (pip install pyarrow)")
+    records = [_record(link_data) for link_data in links_with_metadata]
+
+    def column(name):
+        return [record[name] for record in records]
+
+    table = pyarrow.table({
+        'url': pyarrow.array(column('url'), type=pyarrow.string()),
+        'makler_names': pyarrow.array(column('makler_names'), type=pyarrow.list_(pyarrow.string())),
+        'scraped_at': _typed_array(column('scraped_at'), pyarrow.timestamp('us')),
+        'title': pyarrow.array(column('title'), type=pyarrow.string()),
+        'price': pyarrow.array([int(v) if v is not None else None for v in column('price')], type=pyarrow.int64()),
+        'living_space': pyarrow.array(column('living_space'), type=pyarrow.float64()),
+        'rooms': pyarrow.array(column('rooms'), type=pyarrow.float64()),
+        'posted_at': _typed_array(column('posted_at'), pyarrow.date32())
+    })
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(table, buffer, compression='zstd')
+    return buffer.getvalue()
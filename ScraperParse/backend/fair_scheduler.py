@@ -0,0 +1,110 @@
+"""
+Faire Reihenfolge der Such-URLs innerhalb eines Crawls
+Statt alle Such-URLs in Eingabereihenfolge in den Pool zu geben (ein Makler mit hunderten
+URLs belegt dann alle Slots, bevor kleine Makler drankommen), vergibt der FairScheduler
+freie Slots reihum nach Makler - gewichtet nach Priorität ("smooth weighted round-robin":
+jeder Makler sammelt pro Vergabe seine Priorität an, der mit dem höchsten Guthaben ist dran
+und gibt die Summe aller Prioritäten ab). Ein Makler mit Priorität 2 erhält so doppelt so
+viele Slots wie einer mit 1, gleichmäßig verteilt statt in Blöcken. Kleine Makler sind
+dadurch früh fertig.
+
+Optional begrenzt max_concurrency die gleichzeitig laufenden Such-URLs eines Maklers; freie
+Slots gehen dann an die übrigen Makler.
+
+Einstellungen je Makler stehen in makler.json ('priority', 'max_concurrency').
+"""
+from collections import deque
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Schlüssel einer Such-URL: (Such-URL, Makler oder None)
+Key = Tuple[str, Optional[str]]
+
+
+class MaklerSchedule:
+    """
+    Scheduling-Einstellungen eines Maklers
+
+    Args:
+        priority: Gewicht bei der Vergabe freier Slots (ganzzahlig, mindestens 1)
+        max_concurrency: Höchstens so viele gleichzeitig laufende Such-URLs (None = unbegrenzt)
+    """
+
+    def __init__(self, priority: int = 1, max_concurrency: Optional[int] = None):
+        self.priority = max(1, int(priority))
+        self.max_concurrency = max(1, int(max_concurrency)) if max_concurrency else None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "MaklerSchedule":
+        """Liest die Einstellungen aus einem Makler-Eintrag (fehlende Felder = Standard)"""
+        data = data or {}
+        return cls(data.get('priority') or 1, data.get('max_concurrency'))
+
+    def to_dict(self) -> Dict:
+        return {'priority': self.priority, 'max_concurrency': self.max_concurrency}
+
+
+DEFAULT_SCHEDULE = MaklerSchedule()
+
+
+class FairScheduler:
+    """
+    Vergibt Such-URLs reihum nach Makler (nicht thread-sicher; nur der Crawl-Thread ruft auf)
+
+    Args:
+        keys: Such-URLs als (Such-URL, Makler)-Schlüssel; innerhalb eines Maklers bleibt die
+            Reihenfolge erhalten. Such-URLs ohne Makler bilden eine eigene Gruppe
+        schedules: Einstellungen je Makler (fehlende Makler: Priorität 1, unbegrenzt)
+    """
+
+    def __init__(self, keys: List[Key], schedules: Dict[str, MaklerSchedule] = None):
+        self._queues: Dict[Hashable, deque] = {}
+        for key in keys:
+            self._queues.setdefault(key[1], deque()).append(key)
+        schedules = schedules or {}
+        self._schedules = {makler: schedules.get(makler, DEFAULT_SCHEDULE) for makler in self._queues}
+        self._running: Dict[Hashable, int] = dict.fromkeys(self._queues, 0)
+        self._credit: Dict[Hashable, int] = dict.fromkeys(self._queues, 0)
+
+    def __len__(self) -> int:
+        """Noch nicht vergebene Such-URLs"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _eligible(self) -> List[Hashable]:
+        eligible = []
+        for makler, queue in self._queues.items():
+            cap = self._schedules[makler].max_concurrency
+            if queue and (cap is None or self._running[makler] < cap):
+                eligible.append(makler)
+        return eligible
+
+    def next(self) -> Optional[Key]:
+        """Nächste Such-URL oder None, wenn alle übrigen Makler ihr Limit ausschöpfen bzw. nichts mehr offen ist"""
+        eligible = self._eligible()
+        if not eligible:
+            return None
+        # Smooth weighted round-robin über die Makler, die gerade einen Slot bekommen dürfen
+        total = 0
+        for makler in eligible:
+            self._credit[makler] += self._schedules[makler].priority
+            total += self._schedules[makler].priority
+        chosen = max(eligible, key=self._credit.__getitem__)
+        self._credit[chosen] -= total
+        self._running[chosen] += 1
+        return self._queues[chosen].popleft()
+
+    def done(self, key: Key):
+        """Meldet eine Such-URL als abgeschlossen (gibt den Slot des Maklers frei)"""
+        self._running[key[1]] -= 1
+
+    def order(self) -> List[Key]:
+        """
+        Vollständige Vergabereihenfolge ohne Parallelitätslimits - für die Auftragswarteschlange,
+        deren Worker Aufträge in Einstellreihenfolge abholen
+        """
+        ordered = []
+        while True:
+            key = self.next()
+            if key is None:
+                return ordered
+            self.done(key)
+            ordered.append(key)
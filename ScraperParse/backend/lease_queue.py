@@ -0,0 +1,285 @@
+"""
+Verteilter Crawl: gemeinsame Auftragswarteschlange in SQLite
+Der Koordinator (der Prozess, der die Suche startet) legt je Such-URL einen Auftrag an.
+Worker-Prozesse (crawl_worker.py, auch auf anderen Rechnern mit gemeinsamem Volume) leihen
+sich Aufträge für eine begrenzte Zeit (Lease), verlängern die Lease während des Crawls und
+liefern die gefundenen Links zurück. Zusammengeführt wird nur im Koordinator.
+
+- Lease-Ablauf: Meldet sich ein Worker nicht mehr (abgestürzt, Netz weg), läuft seine Lease
+  ab und der Auftrag wird erneut vergeben - bis max_attempts, danach gilt er als gescheitert
+- Fencing: Jede Vergabe erhält ein neues Token; Ergebnisse und Verlängerungen mit einem
+  veralteten Token (z.B. eines totgeglaubten Workers) werden verworfen
+- Übernahme mit Bestätigung: Ergebnisse bleiben 'done', bis der Koordinator sie nach dem
+  Zusammenführen bestätigt (ack: 'done' -> 'merged'). Bricht er vorher ab, liefert der nächste
+  Crawl sie erneut aus (unmerged_results). Da das Zusammenführen idempotent ist (Blacklist),
+  landet jedes Ergebnis genau einmal im Bestand
+
+Zustände: pending -> leased -> done -> merged, bzw. failed/cancelled
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = 'pending'
+STATE_LEASED = 'leased'
+STATE_DONE = 'done'
+STATE_MERGED = 'merged'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    search_url TEXT NOT NULL,
+    makler TEXT,
+    max_pages INTEGER NOT NULL,
+    known_fingerprint TEXT,
+    state TEXT NOT NULL,
+    worker TEXT,
+    token INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, seq);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id, state);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident() % 100000}"
+
+
+class Lease:
+    """Ein verliehener Auftrag"""
+
+    def __init__(self, job_id: str, run_id: str, search_url: str, makler: Optional[str], max_pages: int, token: int, attempts: int,
+                 known_fingerprint: Optional[str] = None):
+        self.job_id = job_id
+        self.run_id = run_id
+        self.search_url = search_url
+        self.makler = makler
+        self.max_pages = max_pages
+        self.token = token
+        self.attempts = attempts
+        # Fingerabdruck von Seite 1 beim letzten vollständigen Crawl (None = immer vollständig crawlen)
+        self.known_fingerprint = known_fingerprint
+
+
+class LeaseQueue:
+    """
+    Auftragswarteschlange in einer SQLite-Datei
+
+    Args:
+        path: Pfad der Datenbank (für mehrere Rechner auf einem gemeinsamen Volume)
+        lease_seconds: Dauer einer Lease ohne Verlängerung
+        max_attempts: Vergaben pro Auftrag, bevor er als gescheitert gilt
+    """
+
+    def __init__(self, path: str = "crawl_queue.db", lease_seconds: float = 60.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+            # Datenbanken aus älteren Versionen um neue Spalten ergänzen
+            columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            if 'known_fingerprint' not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN known_fingerprint TEXT")
+
+    @contextmanager
+    def _connect(self):
+        # Eine Verbindung pro Aufruf: Threads und Prozesse teilen sich nur die Datei. Ohne WAL,
+        # da WAL auf Netzlaufwerken nicht zuverlässig funktioniert
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Schreibtransaktion, die andere Schreiber sofort ausschließt"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def submit(self, run_id: str, keys: List[Tuple[str, Optional[str]]], max_pages: int,
+               fingerprints: Optional[List[Optional[str]]] = None) -> List[str]:
+        """
+        Legt je (Such-URL, Makler) einen Auftrag an; Reihenfolge = Vergabereihenfolge
+
+        fingerprints: Optional je Schlüssel der bekannte Fingerabdruck von Seite 1 (result_fingerprint.py)
+        """
+        now = time.time()
+        job_ids = [f"{run_id}-{seq}" for seq in range(len(keys))]
+        fingerprints = fingerprints or [None] * len(keys)
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT INTO jobs (job_id, run_id, seq, search_url, makler, max_pages, known_fingerprint, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(job_id, run_id, seq, url, makler, max_pages, fingerprint, STATE_PENDING, now)
+                 for seq, (job_id, (url, makler), fingerprint) in enumerate(zip(job_ids, keys, fingerprints))]
+            )
+        return job_ids
+
+    def _reap(self, db, now: float):
+        """Abgelaufene Leases: erneut vergeben oder nach max_attempts als gescheitert markieren"""
+        db.execute(
+            "UPDATE jobs SET state = ?, error = 'Lease abgelaufen', finished_at = ? WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+            (STATE_FAILED, now, STATE_LEASED, now, self.max_attempts)
+        )
+        expired = db.execute(
+            "UPDATE jobs SET state = ?, worker = NULL WHERE state = ? AND lease_expires < ?",
+            (STATE_PENDING, STATE_LEASED, now)
+        ).rowcount
+        if expired:
+            logger.warning(f"{expired} Auftrag/Aufträge mit abgelaufener Lease werden neu vergeben")
+
+    def lease(self, worker_id: str, run_id: Optional[str] = None) -> Optional[Lease]:
+        """Verleiht den ältesten offenen Auftrag (optional nur aus einem Lauf) oder None"""
+        now = time.time()
+        with self._transaction() as db:
+            self._reap(db, now)
+            query = "SELECT job_id, run_id, search_url, makler, max_pages, token, attempts, known_fingerprint FROM jobs WHERE state = ?"
+            params: list = [STATE_PENDING]
+            if run_id is not None:
+                query += " AND run_id = ?"
+                params.append(run_id)
+            row = db.execute(query + " ORDER BY created_at, seq LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            job_id, job_run_id, search_url, makler, max_pages, token, attempts, known_fingerprint = row
+            db.execute(
+                "UPDATE jobs SET state = ?, worker = ?, token = ?, lease_expires = ?, attempts = ? WHERE job_id = ?",
+                (STATE_LEASED, worker_id, token + 1, now + self.lease_seconds, attempts + 1, job_id)
+            )
+        return Lease(job_id, job_run_id, search_url, makler, max_pages, token + 1, attempts + 1, known_fingerprint)
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Verlängert die Lease; False, wenn sie inzwischen an einen anderen Worker ging"""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND token = ? AND state = ?",
+                (time.time() + self.lease_seconds, lease.job_id, lease.token, STATE_LEASED)
+            ).rowcount == 1
+
+    def complete(self, lease: Lease, links: List[str], url_report: Dict) -> bool:
+        """Liefert das Ergebnis ab; False, wenn die Lease nicht mehr gültig war (Ergebnis verworfen)"""
+        result = json.dumps({'links': sorted(links), 'report': url_report}, ensure_ascii=False)
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET state = ?, result = ?, finished_at = ? WHERE job_id = ? AND token = ? AND state = ?",
+                (STATE_DONE, result, time.time(), lease.job_id, lease.token, STATE_LEASED)
+            ).rowcount == 1
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        """Meldet einen Fehler; der Auftrag wird erneut vergeben, bis max_attempts erreicht ist"""
+        state = STATE_FAILED if lease.attempts >= self.max_attempts else STATE_PENDING
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, error = ?, finished_at = ? WHERE job_id = ? AND token = ? AND state = ?",
+                (state, error, time.time() if state == STATE_FAILED else None, lease.job_id, lease.token, STATE_LEASED)
+            ).rowcount == 1
+
+    @staticmethod
+    def _result_rows(rows) -> List[Dict]:
+        results = []
+        for job_id, run_id, search_url, makler, result in rows:
+            data = json.loads(result)
+            results.append({'job_id': job_id, 'run_id': run_id, 'search_url': search_url, 'makler': makler,
+                            'links': data['links'], 'report': data['report']})
+        return results
+
+    def results(self, run_id: str) -> List[Dict]:
+        """
+        Fertige, noch nicht bestätigte Ergebnisse eines Laufs (Zustand bleibt 'done')
+
+        Bis zur Bestätigung per ack wird ein Ergebnis bei jedem Aufruf erneut geliefert; der
+        Aufrufer überspringt bereits verarbeitete Aufträge selbst.
+
+        Returns:
+            Liste von Dicts mit 'job_id', 'run_id', 'search_url', 'makler', 'links', 'report'
+        """
+        with self._transaction() as db:
+            self._reap(db, time.time())
+            rows = db.execute(
+                "SELECT job_id, run_id, search_url, makler, result FROM jobs WHERE run_id = ? AND state = ? ORDER BY seq",
+                (run_id, STATE_DONE)
+            ).fetchall()
+        return self._result_rows(rows)
+
+    def ack(self, job_ids: List[str]) -> int:
+        """Bestätigt zusammengeführte Ergebnisse (done -> merged)"""
+        if not job_ids:
+            return 0
+        with self._transaction() as db:
+            return sum(
+                db.execute("UPDATE jobs SET state = ? WHERE job_id = ? AND state = ?", (STATE_MERGED, job_id, STATE_DONE)).rowcount
+                for job_id in job_ids
+            )
+
+    def unmerged_results(self, exclude_run_id: Optional[str] = None) -> List[Dict]:
+        """
+        Fertige Ergebnisse früherer Läufe, die nie bestätigt wurden (Koordinator abgebrochen)
+
+        Nur unter der Crawl-Sperre aufrufen - sonst könnten es Ergebnisse eines laufenden Crawls sein.
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT job_id, run_id, search_url, makler, result FROM jobs WHERE state = ? AND run_id != ? ORDER BY run_id, seq",
+                (STATE_DONE, exclude_run_id or '')
+            ).fetchall()
+        return self._result_rows(rows)
+
+    def failures(self, run_id: str) -> List[Dict]:
+        """Gescheiterte Aufträge eines Laufs"""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT job_id, search_url, makler, error FROM jobs WHERE run_id = ? AND state = ?",
+                (run_id, STATE_FAILED)
+            ).fetchall()
+        return [{'job_id': job_id, 'search_url': url, 'makler': makler, 'error': error} for job_id, url, makler, error in rows]
+
+    def cancel(self, run_id: str) -> int:
+        """Bricht alle noch offenen Aufträge eines Laufs ab"""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET state = ?, finished_at = ? WHERE run_id = ? AND state IN (?, ?)",
+                (STATE_CANCELLED, time.time(), run_id, STATE_PENDING, STATE_LEASED)
+            ).rowcount
+
+    def prune(self, max_age_seconds: float = 7 * 86400) -> int:
+        """Entfernt abgeschlossene Aufträge älter als max_age_seconds"""
+        with self._transaction() as db:
+            return db.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?, ?) AND created_at < ?",
+                (STATE_MERGED, STATE_FAILED, STATE_CANCELLED, time.time() - max_age_seconds)
+            ).rowcount
+
+    def stats(self) -> Dict:
+        """Aufträge je Zustand und aktive Worker (für Monitoring)"""
+        with self._connect() as db:
+            counts = dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            workers = [row[0] for row in db.execute(
+                "SELECT DISTINCT worker FROM jobs WHERE state = ? AND lease_expires >= ?", (STATE_LEASED, time.time())
+            ).fetchall()]
+        return {'jobs': counts, 'active_workers': workers, 'lease_seconds': self.lease_seconds, 'max_attempts': self.max_attempts}
@@ -0,0 +1,256 @@
+"""
+Kompakte Link-Einträge für den Bestand im Speicher
+Statt eines Dicts pro Link (mit eigener ISO-Zeichenkette für scraped_at und eigener Liste
+von Makler-Namen) hält der Scraper LinkRecord-Objekte mit __slots__:
+- timestamp: scraped_at als Integer (Mikrosekunden seit 1970-01-01, Wandzeit ohne Zeitzone
+  wie in links.json). Zeitstempel, die sich so nicht verlustfrei darstellen lassen (mit
+  Zeitzone, anderes Format), bleiben Zeichenketten
+- makler: Tupel von Makler-IDs aus einer prozessweiten Namenstabelle
+- Gleiche Zeitstempel (ein Wert pro Crawl-Schub), Makler-Kombinationen und Such-URLs werden
+  geteilt statt pro Link gespeichert
+
+links.json, die Snapshots und alle API-Antworten behalten das bisherige Dict-Format;
+from_dict/to_dict wandeln um. python bench_link_memory.py misst die Bytes pro Link.
+"""
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+MICROS_PER_DAY = 86400 * 1000000
+
+# Felder mit eigenem Slot; alle übrigen Schlüssel landen unverändert in extra
+_FIELDS = frozenset(('url', 'scraped_at', 'search_url', 'makler_names', 'details'))
+
+# Prozessweite Makler-Namenstabelle (nur wachsend, IDs bleiben stabil)
+_makler_names: List[str] = []
+_makler_ids: Dict[str, int] = {}
+_makler_lock = threading.Lock()
+
+# Geteilte Objekte: ISO-Zeichenkette -> Integer-Zeitstempel, Makler-Tupel, Such-URLs
+_timestamps: Dict[str, int] = {}
+_shared: Dict[object, object] = {}
+
+Timestamp = Union[int, str, None]
+
+
+def makler_id(name: str) -> int:
+    """ID eines Makler-Namens (wird beim ersten Auftreten vergeben)"""
+    makler = _makler_ids.get(name)
+    if makler is None:
+        with _makler_lock:
+            makler = _makler_ids.get(name)
+            if makler is None:
+                makler = len(_makler_names)
+                _makler_names.append(sys.intern(name))
+                _makler_ids[_makler_names[makler]] = makler
+    return makler
+
+
+def makler_name(makler: int) -> str:
+    return _makler_names[makler]
+
+
+def makler_table() -> List[str]:
+    """Alle bisher vergebenen Makler-Namen (Index = ID)"""
+    return list(_makler_names)
+
+
+def makler_ids(names) -> Tuple[int, ...]:
+    """Makler-Namen (Liste, einzelner Name oder leer) -> geteiltes Tupel von IDs"""
+    if not names:
+        return ()
+    if not isinstance(names, list):
+        names = [names]
+    ids = tuple(makler_id(name if name.__class__ is str else str(name)) for name in names)
+    return _shared.setdefault(ids, ids)
+
+
+def share(value):
+    """Gibt für gleiche Werte (z.B. Such-URLs) immer dasselbe Objekt zurück"""
+    if value is None:
+        return None
+    return _shared.setdefault(value, value)
+
+
+def encode_timestamp(value) -> Timestamp:
+    """ISO-Zeitstempel -> Mikrosekunden; nicht verlustfrei darstellbare Werte bleiben unverändert"""
+    if value.__class__ is not str:
+        return value
+    encoded = _timestamps.get(value)
+    if encoded is not None:
+        return encoded
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if dt.tzinfo is not None or dt.isoformat() != value:
+        return value
+    encoded = (dt - _EPOCH) // _MICROSECOND
+    return _timestamps.setdefault(value, encoded)
+
+
+def decode_timestamp(value: Timestamp) -> Optional[str]:
+    """Gespeicherter Zeitstempel -> ISO-Zeichenkette wie in links.json"""
+    if value.__class__ is int:
+        return (_EPOCH + value * _MICROSECOND).isoformat()
+    return value
+
+
+def day_start(day: int) -> datetime:
+    """Tagesnummer (Integer-Zeitstempel // MICROS_PER_DAY) -> Beginn des Tages"""
+    return _EPOCH + timedelta(days=day)
+
+
+def timestamp_datetime(value: Timestamp) -> Optional[datetime]:
+    """Gespeicherter Zeitstempel -> datetime (None bei fehlendem oder ungültigem Wert)"""
+    if value.__class__ is int:
+        return _EPOCH + value * _MICROSECOND
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+class LinkRecord:
+    """Ein Link im Bestand; Felder wie in links.json, aber kompakt gespeichert"""
+
+    __slots__ = ('url', 'timestamp', 'search_url', 'makler', 'details', 'extra')
+
+    def __init__(self, url: str, timestamp: Timestamp = None, search_url: Optional[str] = None,
+                 makler: Tuple[int, ...] = (), details: Optional[Dict] = None, extra: Optional[Dict] = None):
+        self.url = url
+        self.timestamp = timestamp
+        self.search_url = search_url
+        self.makler = makler
+        self.details = details
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LinkRecord":
+        record = cls(
+            data.get('url', ''),
+            encode_timestamp(data.get('scraped_at')),
+            share(data.get('search_url')),
+            makler_ids(data.get('makler_names')),
+            data.get('details')
+        )
+        if not _FIELDS.issuperset(data):
+            record.extra = {key: value for key, value in data.items() if key not in _FIELDS}
+        return record
+
+    def replace(self, **changes) -> "LinkRecord":
+        """Kopie mit geänderten Feldern (veröffentlichte Einträge werden nie verändert, siehe link_snapshot.py)"""
+        record = LinkRecord(self.url, self.timestamp, self.search_url, self.makler, self.details, self.extra)
+        for field, value in changes.items():
+            setattr(record, field, value)
+        return record
+
+    @property
+    def scraped_at(self) -> Optional[str]:
+        return decode_timestamp(self.timestamp)
+
+    @property
+    def makler_names(self) -> List[str]:
+        return [_makler_names[makler] for makler in self.makler]
+
+    def to_dict(self) -> Dict:
+        """Eintrag im Format von links.json"""
+        data = {'url': self.url}
+        if self.timestamp is not None:
+            data['scraped_at'] = decode_timestamp(self.timestamp)
+        if self.search_url is not None:
+            data['search_url'] = self.search_url
+        data['makler_names'] = [_makler_names[makler] for makler in self.makler]
+        if self.details is not None:
+            data['details'] = self.details
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"LinkRecord({self.to_dict()!r})"
+
+
+def records_from_dicts(links: Iterable) -> List[LinkRecord]:
+    """
+    Einträge aus links.json -> LinkRecords (wie from_dict, für den ganzen Bestand beim Laden);
+    ältere Einträge als reiner URL-String werden übernommen
+    """
+    timestamps = _timestamps
+    shared = _shared
+    # Namenslisten werden pro vorkommender Kombination nur einmal übersetzt
+    makler_cache: Dict[tuple, Tuple[int, ...]] = {}
+    records = []
+    append = records.append
+    for link in links:
+        if link.__class__ is not dict:
+            if isinstance(link, dict):
+                append(LinkRecord.from_dict(link))
+            elif isinstance(link, str):
+                append(LinkRecord(link))
+            continue
+        scraped_at = link.get('scraped_at')
+        timestamp = timestamps.get(scraped_at) if scraped_at.__class__ is str else None
+        if timestamp is None:
+            timestamp = encode_timestamp(scraped_at)
+        names = link.get('makler_names')
+        if names.__class__ is list:
+            key = tuple(names)
+            makler = makler_cache.get(key)
+            if makler is None:
+                makler = makler_cache[key] = makler_ids(names)
+        else:
+            makler = makler_ids(names)
+        search_url = link.get('search_url')
+        record = LinkRecord(
+            link.get('url', ''),
+            timestamp,
+            shared.setdefault(search_url, search_url) if search_url is not None else None,
+            makler,
+            link.get('details')
+        )
+        if not _FIELDS.issuperset(link):
+            record.extra = {key: value for key, value in link.items() if key not in _FIELDS}
+        append(record)
+    return records
+
+
+def records_to_dicts(records: Iterable[LinkRecord]) -> List[Dict]:
+    """
+    LinkRecords -> Einträge im Format von links.json (wie to_dict, aber ISO-Zeitstempel und
+    Namenslisten werden pro vorkommendem Wert bzw. Makler-Kombination nur einmal berechnet)
+
+    Einträge mit denselben Maklern teilen sich eine Namensliste - das Ergebnis ist zum
+    Serialisieren gedacht und darf nicht verändert werden.
+    """
+    table = _makler_names
+    scraped_at: Dict[object, str] = {}
+    names: Dict[Tuple[int, ...], List[str]] = {}
+    rows = []
+    append = rows.append
+    for record in records:
+        data = {'url': record.url}
+        timestamp = record.timestamp
+        if timestamp is not None:
+            iso = scraped_at.get(timestamp)
+            if iso is None:
+                iso = scraped_at[timestamp] = decode_timestamp(timestamp)
+            data['scraped_at'] = iso
+        if record.search_url is not None:
+            data['search_url'] = record.search_url
+        makler = record.makler
+        makler_names = names.get(makler)
+        if makler_names is None:
+            makler_names = names[makler] = [table[m] for m in makler]
+        data['makler_names'] = makler_names
+        if record.details is not None:
+            data['details'] = record.details
+        if record.extra:
+            data.update(record.extra)
+        append(data)
+    return rows
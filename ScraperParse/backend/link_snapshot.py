@@ -0,0 +1,73 @@
+"""
+Unveränderliche Stände des Link-Bestands für Leser
+Der Scraper hält Bestand und letzte Suche nicht mehr als veränderliche Listen, sondern als
+LinkSnapshot: ein Tupel von LinkRecords plus die URLs der letzten Suche und die Cache-Kennung.
+Ein Snapshot wird nach der Veröffentlichung nie mehr verändert:
+- Der Schreib-Thread baut jede Änderung (neue Links, Makler-Zuordnung, Details, Löschen) auf
+  einer Kopie der Liste auf, ersetzt geänderte Einträge durch neue LinkRecords und
+  veröffentlicht den neuen Stand erst nach dem Speichern - durch Zuweisen einer einzigen
+  Referenz
+- Neu laden (anderer Prozess hat links.json geschrieben) veröffentlicht ebenfalls einen
+  neuen Snapshot, statt die Liste eines laufenden Lesers auszutauschen
+- Leser holen den Snapshot einmal pro Anfrage (KleinanzeigenScraper.snapshot) und arbeiten
+  ohne Sperre darauf; ein laufender Crawl ist für sie entweder noch gar nicht oder mit dem
+  kompletten Schub sichtbar
+
+Einträge werden zwischen aufeinanderfolgenden Snapshots geteilt, eine Änderung kostet also
+eine Kopie der Referenzliste, nicht des Bestands. Der URL-Index (select) wird beim ersten
+Nachschlagen gebaut und an Snapshots mit unverändertem Bestand weitergegeben.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from link_record import LinkRecord
+
+
+class LinkSnapshot:
+    """
+    Ein veröffentlichter Stand
+
+    Args:
+        links: Alle Links (wird nicht mehr verändert)
+        last_search: URLs der letzten Suche in Fundreihenfolge
+        version: Version des Bestands (Änderungsprotokoll)
+        key: Kennung für Ergebnis-Caches (ändert sich mit jeder Änderung, auch durch andere Prozesse)
+        last_run_id: Crawl-Lauf der letzten Suche (None bei älteren Dateien)
+        previous: Vorheriger Snapshot; bei gleichem Bestand wird dessen URL-Index übernommen
+    """
+
+    __slots__ = ('links', 'last_search', 'version', 'key', 'last_run_id', '_by_url')
+
+    def __init__(self, links: Tuple[LinkRecord, ...] = (), last_search: Tuple[str, ...] = (),
+                 version: int = 0, key: Optional[tuple] = None, last_run_id: Optional[str] = None,
+                 previous: "LinkSnapshot" = None):
+        self.links = links
+        self.last_search = last_search
+        self.version = version
+        self.key = key
+        self.last_run_id = last_run_id
+        self._by_url: Optional[Dict[str, LinkRecord]] = previous._by_url if previous is not None and previous.links is links else None
+
+    def select(self, urls: Iterable[str]) -> List[LinkRecord]:
+        """
+        Einträge zu den URLs in deren Reihenfolge, ohne den Bestand zu durchsuchen
+
+        Nicht (mehr) vorhandene URLs werden übersprungen, doppelte nur einmal geliefert.
+        """
+        by_url = self._by_url
+        if by_url is None:
+            # Mehrere Leser bauen im schlimmsten Fall denselben Index; das Ergebnis ist gleich
+            by_url = self._by_url = {link.url: link for link in self.links}
+        selected = []
+        seen = set()
+        for url in urls:
+            link = by_url.get(url)
+            if link is not None and url not in seen:
+                seen.add(url)
+                selected.append(link)
+        return selected
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def __repr__(self):
+        return f"LinkSnapshot(version={self.version}, links={len(self.links)}, last_search={len(self.last_search)})"
@@ -0,0 +1,344 @@
+"""
+Lasttest der API mit großen Beständen
+Startet das Backend auf einer Kopie eines (synthetischen) Bestands - als eigenen uvicorn-Prozess
+auf einem lokalen Port oder im selben Prozess (--in-process, über den TestClient) - oder nutzt
+einen laufenden Server (--url). Pro Endpoint schicken --clients parallele Clients insgesamt
+--requests Anfragen mit wechselnden Filtern (Makler, Monat, Tag); gemessen werden p50/p95/p99
+der Antwortzeit, Durchsatz sowie RSS des Servers (Höchstwert während der Phase und danach).
+
+Der Ergebnis-Cache ist standardmäßig aus (--cache-mb 0), damit die Zeiten die Berechnung
+zeigen und nicht wiederholte Treffer. DELETE /links läuft zuletzt und löscht pro Anfrage die
+Links eines Tages; gegen --url nur mit --allow-delete.
+
+Aufruf:
+    python loadtest.py --links 100000 [--clients 8 --requests 40]
+    python loadtest.py --data /tmp/bestand_1m --endpoints grouped export_filtered delete
+    python loadtest.py --url http://127.0.0.1:9000 --pid 1234
+Bestände erzeugt synthetic_data.py.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from synthetic_data import write_dataset
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILES = ('links.json', 'blacklist.json', 'makler.json', 'last_search.json')
+SERVER_START_TIMEOUT = 120
+REQUEST_TIMEOUT = 600
+
+
+class Scenario:
+    """
+    Ein Endpoint im Lasttest
+
+    Args:
+        name: Kurzname (für --endpoints und die Ausgabe)
+        method: HTTP-Methode
+        path: Pfad des Endpoints
+        params: Anfrage-Nummer -> Query-Parameter (wechselnde Filter)
+        destructive: Verändert den Bestand (läuft zuletzt, gegen --url nur mit --allow-delete)
+    """
+
+    def __init__(self, name: str, method: str, path: str, params: Callable[[int], Dict], destructive: bool = False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.params = params
+        self.destructive = destructive
+
+
+def recent_months(count: int = 12) -> List[Tuple[int, int]]:
+    """(Jahr, Monat) der letzten count Monate, beginnend mit dem aktuellen"""
+    today = date.today()
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months
+
+
+def build_scenarios(makler: List[str]) -> List[Scenario]:
+    """Alle Szenarien; Filter wechseln über die Makler des Bestands und die letzten 12 Monate"""
+    months = recent_months()
+    makler = makler or ['']
+
+    def month_params(i: int, **extra) -> Dict:
+        year, month = months[i % len(months)]
+        return {'year': year, 'month': month, **extra}
+
+    # Löschen: pro Anfrage ein anderer Tag, vom ältesten vollständig erfassten Monat an
+    full_months = months[:0:-1]
+
+    def delete_params(i: int) -> Dict:
+        year, month = full_months[(i // 28) % len(full_months)]
+        return {'year': year, 'month': month, 'day': 1 + i % 28}
+
+    return [
+        Scenario('grouped', 'GET', '/links/grouped', lambda i: {}),
+        Scenario('grouped_makler', 'GET', '/links/grouped', lambda i: month_params(i, makler_names=makler[i % len(makler)])),
+        Scenario('export_filtered', 'GET', '/export/filtered', lambda i: month_params(i)),
+        Scenario('export_filtered_makler', 'GET', '/export/filtered', lambda i: month_params(i, makler_names=makler[i % len(makler)])),
+        Scenario('export_ndjson', 'GET', '/export/filtered', lambda i: month_params(i, format='ndjson')),
+        Scenario('export_all', 'GET', '/export/all', lambda i: {}),
+        Scenario('export_last', 'GET', '/export/last', lambda i: {'format': 'ndjson'}),
+        Scenario('changes', 'GET', '/links/changes', lambda i: {}),
+        Scenario('stats', 'GET', '/stats', lambda i: {'makler_names': makler[i % len(makler)]} if i % 2 else {}),
+        Scenario('delete', 'DELETE', '/links', delete_params, destructive=True),
+    ]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """p-Perzentil (Nearest-Rank) einer sortierten Liste"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def read_rss(pid: Optional[int]) -> Optional[int]:
+    """Resident Set Size eines Prozesses in Bytes (None ohne /proc, z.B. unter Windows/macOS)"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Misst im Hintergrund den höchsten RSS-Wert eines Prozesses während einer Phase"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = read_rss(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = read_rss(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_scenario(client, scenario: Scenario, requests: int, clients: int, warmup: int, pid: Optional[int]) -> Dict:
+    """Führt ein Szenario aus und gibt die Kennzahlen zurück"""
+
+    def call(i: int) -> Tuple[float, Optional[str]]:
+        started = time.perf_counter()
+        try:
+            response = client.request(scenario.method, scenario.path, params=scenario.params(i), timeout=REQUEST_TIMEOUT)
+            # Antwort vollständig lesen (auch gestreamte Exporte)
+            response.read()
+            error = None if response.status_code < 400 else f"HTTP {response.status_code}"
+        except Exception as e:
+            error = type(e).__name__
+        return (time.perf_counter() - started) * 1000, error
+
+    if not scenario.destructive:
+        for i in range(warmup):
+            call(i)
+    with RssSampler(pid) as sampler, ThreadPoolExecutor(max_workers=clients) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(call, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(ms for ms, error in results if error is None)
+    errors = [error for _, error in results if error is not None]
+    rss_after = read_rss(pid)
+    return {
+        'endpoint': scenario.name,
+        'request': f"{scenario.method} {scenario.path}",
+        'requests': requests,
+        'errors': len(errors),
+        'error_types': sorted(set(errors)),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1] if latencies else None,
+        'rps': requests / elapsed if elapsed else None,
+        'rss_peak_mb': sampler.peak / 1e6 if sampler.peak is not None else None,
+        'rss_after_mb': rss_after / 1e6 if rss_after is not None else None,
+    }
+
+
+def prepare_workdir(args) -> str:
+    """Kopiert den Bestand (oder erzeugt ihn) in ein temporäres Arbeitsverzeichnis für den Server"""
+    workdir = tempfile.mkdtemp(prefix='loadtest_')
+    if args.data:
+        for filename in DATA_FILES:
+            source = os.path.join(args.data, filename)
+            if os.path.exists(source):
+                shutil.copy(source, workdir)
+    else:
+        print(f"Erzeuge synthetischen Bestand: {args.links} Links, {args.makler} Makler (skew {args.skew})")
+        write_dataset(workdir, links=args.links, makler=args.makler, skew=args.skew)
+    return workdir
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, cache_mb: int) -> Tuple[subprocess.Popen, str]:
+    """Startet uvicorn mit workdir als Arbeitsverzeichnis und wartet, bis der Server antwortet"""
+    port = free_port()
+    env = {**os.environ, 'RESULT_CACHE_MB': str(cache_mb)}
+    log = open(os.path.join(workdir, 'uvicorn.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', BACKEND_DIR,
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server beendet (Exit-Code {process.returncode}), siehe {log.name}")
+        try:
+            httpx.get(url + '/', timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server nicht innerhalb von {SERVER_START_TIMEOUT} s erreichbar")
+
+
+def print_table(results: List[Dict]):
+    def fmt(value, digits=0):
+        return '-' if value is None else f"{value:.{digits}f}"
+
+    header = (f"{'Endpoint':<24} {'Anfr.':>6} {'Fehler':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'Anfr./s':>8} {'RSS max MB':>11} {'RSS nach MB':>12}")
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['endpoint']:<24} {result['requests']:>6} {result['errors']:>6} {fmt(result['p50_ms']):>8} "
+              f"{fmt(result['p95_ms']):>8} {fmt(result['p99_ms']):>8} {fmt(result['max_ms']):>8} "
+              f"{fmt(result['rps'], 1):>8} {fmt(result['rss_peak_mb']):>11} {fmt(result['rss_after_mb']):>12}")
+        if result['error_types']:
+            print(f"{'':<24} Fehler: {', '.join(result['error_types'])}")
+
+
+def run_all(client, scenarios: List[Scenario], args, pid: Optional[int]) -> Dict:
+    """Lädt den Bestand (erste Anfrage) und führt die Szenarien nacheinander aus"""
+    started = time.perf_counter()
+    client.get('/links/grouped', params={'makler_names': '__loadtest__'}, timeout=REQUEST_TIMEOUT).raise_for_status()
+    ready_ms = (time.perf_counter() - started) * 1000
+    rss_ready = read_rss(pid)
+    print(f"Bestand geladen nach {ready_ms:.0f} ms, RSS {rss_ready / 1e6:.0f} MB" if rss_ready else
+          f"Bestand geladen nach {ready_ms:.0f} ms")
+
+    results = []
+    for scenario in scenarios:
+        results.append(run_scenario(client, scenario, args.requests, args.clients, args.warmup, pid))
+        print(f"  {scenario.name}: fertig")
+    print()
+    print_table(results)
+    return {'ready_ms': ready_ms, 'rss_ready_mb': rss_ready / 1e6 if rss_ready else None, 'results': results}
+
+
+def select_scenarios(client, args) -> List[Scenario]:
+    makler = sorted(client.get('/makler', timeout=REQUEST_TIMEOUT).json().get('makler', {}))
+    scenarios = build_scenarios(makler)
+    if args.endpoints:
+        unknown = set(args.endpoints) - {scenario.name for scenario in scenarios}
+        if unknown:
+            raise SystemExit(f"Unbekannte Endpoints: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.endpoints]
+    if args.url and not args.allow_delete:
+        scenarios = [scenario for scenario in scenarios if not scenario.destructive]
+    # Verändernde Szenarien zuletzt, damit die übrigen den vollen Bestand sehen
+    return sorted(scenarios, key=lambda scenario: scenario.destructive)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--data', help='Verzeichnis mit einem Bestand (wird kopiert, nicht verändert)')
+    source.add_argument('--url', help='Laufender Server statt eines eigenen (z.B. http://127.0.0.1:9000)')
+    parser.add_argument('--links', type=int, default=100000, help='Größe des synthetischen Bestands ohne --data/--url')
+    parser.add_argument('--makler', type=int, default=50)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--in-process', action='store_true', help='App im selben Prozess über den TestClient statt über einen Port')
+    parser.add_argument('--clients', type=int, default=8, help='Parallele Clients')
+    parser.add_argument('--requests', type=int, default=40, help='Anfragen pro Endpoint')
+    parser.add_argument('--warmup', type=int, default=1, help='Nicht gemessene Anfragen vorab (nicht bei DELETE)')
+    parser.add_argument('--endpoints', nargs='+', help='Nur diese Szenarien (Namen siehe Ausgabe)')
+    parser.add_argument('--cache-mb', type=int, default=0, help='RESULT_CACHE_MB des gestarteten Servers')
+    parser.add_argument('--pid', type=int, help='PID des Servers bei --url (für RSS)')
+    parser.add_argument('--allow-delete', action='store_true', help='DELETE /links auch gegen --url ausführen')
+    parser.add_argument('--json', help='Ergebnisse zusätzlich als JSON speichern')
+    parser.add_argument('--keep', action='store_true', help='Arbeitsverzeichnis nicht löschen')
+    args = parser.parse_args()
+
+    if args.url:
+        with httpx.Client(base_url=args.url, limits=httpx.Limits(max_connections=args.clients)) as client:
+            report = run_all(client, select_scenarios(client, args), args, args.pid)
+    else:
+        workdir = prepare_workdir(args)
+        try:
+            if args.in_process:
+                # main.py liest seine Dateien relativ zum Arbeitsverzeichnis
+                os.chdir(workdir)
+                os.environ['RESULT_CACHE_MB'] = str(args.cache_mb)
+                sys.path.insert(0, BACKEND_DIR)
+                from fastapi.testclient import TestClient
+                import main as app_module
+                # Jede Anfrage des TestClients würde sonst eine Log-Zeile erzeugen
+                logging.getLogger('httpx').setLevel(logging.WARNING)
+                with TestClient(app_module.app) as client:
+                    report = run_all(client, select_scenarios(client, args), args, os.getpid())
+            else:
+                process, url = start_server(workdir, args.cache_mb)
+                try:
+                    with httpx.Client(base_url=url, limits=httpx.Limits(max_connections=args.clients)) as client:
+                        report = run_all(client, select_scenarios(client, args), args, process.pid)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+        finally:
+            if args.keep:
+                print(f"Arbeitsverzeichnis: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        report['config'] = {key: value for key, value in vars(args).items() if key != 'json'}
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Lokaler Index für Orts-Vorschläge (PLZ und Ortsname -> Location-ID)
+Jede Location-ID, die über die Vorschlags-API von Kleinanzeigen aufgelöst wurde, landet hier
+samt Anzeigename und PLZ; zusätzlich lassen sich Ortslisten importieren (CSV oder JSON, siehe
+import_file). Suchschlüssel sind PLZ, Anzeigename, Ortsname, jedes Wort des Ortsnamens (z.B.
+"mitte" in "Berlin - Mitte") und die Anfragen, die zu einem Ort geführt haben (kleingeschrieben),
+in einem sortierten Array - ein Präfix wird per Binärsuche gefunden, ohne Netzwerkzugriff.
+
+Gespeichert wird in locations.json; mehrere Prozesse teilen sich die Datei wie bei makler.json.
+
+Import: python location_index.py --import orte.csv [--file locations.json]
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from store import FileLock, file_signature, read_json, atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Anzeigename der Vorschlags-API, z.B. "10115 Berlin - Mitte"
+_PLZ_LABEL = re.compile(r'^(\d{5})\s+(.+)$')
+# Trennzeichen zwischen Wörtern eines Ortsnamens ("Berlin - Mitte", "Frankfurt (Oder)")
+_WORD_SEPARATOR = re.compile(r'[^\w]+')
+
+
+def normalize(text: str) -> str:
+    """Suchschlüssel: kleingeschrieben (casefold), Leerraum zusammengefasst"""
+    return ' '.join(str(text).casefold().split())
+
+
+def parse_label(name: str) -> Tuple[Optional[str], str]:
+    """Anzeigename -> (PLZ oder None, Ortsname)"""
+    match = _PLZ_LABEL.match(name.strip())
+    if match:
+        return match.group(1), match.group(2)
+    return None, name.strip()
+
+
+class LocationIndex:
+    """
+    Präfix-Index über bekannte Orte
+
+    Args:
+        locations_file: JSON-Datei mit den bekannten Orten
+        lazy: Datei erst beim ersten Zugriff laden
+    """
+
+    def __init__(self, locations_file: str = "locations.json", lazy: bool = False):
+        self.locations_file = locations_file
+        # Prozessübergreifende Sperre für Änderungen (mehrere uvicorn-Worker)
+        self._lock = FileLock(locations_file + '.lock')
+        self._guard = threading.Lock()
+        self._signature = None
+        # Location-ID -> {'id', 'name', 'plz', 'queries'}
+        self._locations: Dict[str, Dict] = {}
+        # Suchanfrage/PLZ/Name (normalisiert) -> Location-ID für exakte Treffer
+        self._exact: Dict[str, str] = {}
+        # Sortierte Schlüssel mit zugehöriger ID; wird bei Änderungen als Ganzes ersetzt
+        self._sorted: Tuple[List[str], List[str]] = ([], [])
+        if not lazy:
+            self.refresh()
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._locations)
+
+    def refresh(self):
+        """Lädt die Orte neu, falls ein anderer Prozess die Datei geändert hat"""
+        if file_signature(self.locations_file) == self._signature:
+            return
+        with self._guard:
+            signature = file_signature(self.locations_file)
+            if signature == self._signature:
+                return
+            data = read_json(self.locations_file, {}) if os.path.exists(self.locations_file) else {}
+            self._locations = {
+                str(entry['id']): self._entry(entry['id'], entry['name'], entry.get('plz'), entry.get('queries'))
+                for entry in data.get('locations', []) if entry.get('id') and entry.get('name')
+            }
+            self._rebuild()
+            self._signature = signature
+
+    @staticmethod
+    def _entry(location_id, name: str, plz: Optional[str] = None, queries: Optional[List[str]] = None) -> Dict:
+        parsed_plz, _ = parse_label(name)
+        return {'id': str(location_id), 'name': name.strip(), 'plz': plz or parsed_plz, 'queries': list(queries or [])}
+
+    def _rebuild(self):
+        """Baut Schlüssel-Array und exakte Zuordnung neu auf (Aufrufer hält _guard)"""
+        exact: Dict[str, str] = {}
+        pairs = set()
+        for location_id, entry in self._locations.items():
+            plz, town = parse_label(entry['name'])
+            keys = [normalize(entry['name']), normalize(town)]
+            if entry['plz']:
+                keys.append(entry['plz'])
+            for key in keys:
+                pairs.add((key, location_id))
+                exact.setdefault(key, location_id)
+            # Einzelne Wörter nur als Präfix (sonst würde "mitte" exakt auf einen Stadtteil zeigen)
+            for word in _WORD_SEPARATOR.split(normalize(town)):
+                if len(word) >= 2:
+                    pairs.add((word, location_id))
+            # Tatsächlich gestellte Anfragen haben Vorrang vor abgeleiteten Schlüsseln und
+            # führen beim nächsten Tastendruck lokal zum selben Ort
+            for query in entry['queries']:
+                pairs.add((normalize(query), location_id))
+                exact[normalize(query)] = location_id
+        ordered = sorted(pairs)
+        self._exact = exact
+        self._sorted = ([key for key, _ in ordered], [location_id for _, location_id in ordered])
+
+    def _save(self):
+        atomic_write_json(self.locations_file, {'locations': list(self._locations.values())})
+        self._signature = file_signature(self.locations_file)
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Location-ID für eine PLZ/einen Ort, falls lokal bekannt (exakter Treffer)"""
+        self.refresh()
+        return self._exact.get(normalize(query))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Orte, deren PLZ, Anzeigename oder Ortsname mit prefix beginnt
+
+        Returns:
+            Liste von {'id', 'name', 'plz'}, höchstens limit Einträge
+        """
+        self.refresh()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        keys, ids = self._sorted
+        locations = self._locations
+        found = []
+        seen = set()
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            location_id = ids[position]
+            entry = locations.get(location_id)
+            if entry is not None and location_id not in seen:
+                seen.add(location_id)
+                found.append({'id': entry['id'], 'name': entry['name'], 'plz': entry['plz']})
+                if len(found) >= limit:
+                    break
+        return found
+
+    def get(self, location_id: str) -> Optional[Dict]:
+        self.refresh()
+        entry = self._locations.get(str(location_id))
+        return {'id': entry['id'], 'name': entry['name'], 'plz': entry['plz']} if entry else None
+
+    def add(self, locations: Iterable[Tuple[str, str]], query: Optional[str] = None) -> int:
+        """
+        Übernimmt aufgelöste Orte und speichert die Datei
+
+        Args:
+            locations: (Location-ID, Anzeigename)-Paare, z.B. aus der Vorschlags-API
+            query: Anfrage, die zum ersten Ort geführt hat (wird exakt zugeordnet)
+
+        Returns:
+            Anzahl neuer Orte
+        """
+        return self.add_entries([{'id': location_id, 'name': name} for location_id, name in locations], query)
+
+    def add_entries(self, entries: Iterable[Dict], query: Optional[str] = None) -> int:
+        """Wie add, mit Einträgen {'id', 'name', optional 'plz'}"""
+        with self._lock.acquire():
+            self.refresh()
+            with self._guard:
+                added = 0
+                changed = False
+                first = None
+                for entry in entries:
+                    if not entry.get('id') or not entry.get('name'):
+                        continue
+                    location_id = str(entry['id'])
+                    first = first or location_id
+                    if location_id not in self._locations:
+                        self._locations[location_id] = self._entry(location_id, entry['name'], entry.get('plz'))
+                        added += 1
+                        changed = True
+                    elif entry.get('plz') and not self._locations[location_id]['plz']:
+                        self._locations[location_id]['plz'] = entry['plz']
+                        changed = True
+                if query and first and normalize(query) not in self._exact:
+                    self._locations[first]['queries'].append(query.strip())
+                    changed = True
+                if not changed:
+                    return 0
+                self._rebuild()
+                self._save()
+        return added
+
+    def import_file(self, path: str) -> int:
+        """
+        Importiert eine Ortsliste
+
+        Formate:
+            .csv: Spalten id, name und optional plz (Trennzeichen , oder ;)
+            .json: {"locations": [{"id", "name", "plz"}]} wie locations.json oder direkt eine
+                Antwort der Vorschlags-API ({"_<id>": "<Anzeigename>"})
+
+        Returns:
+            Anzahl neuer Orte
+        """
+        if path.lower().endswith('.csv'):
+            with open(path, encoding='utf-8-sig', newline='') as handle:
+                sample = handle.read(4096)
+                handle.seek(0)
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+                entries = [{key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+                           for row in csv.DictReader(handle, dialect=dialect)]
+        else:
+            data = read_json(path, {})
+            if 'locations' in data:
+                entries = data['locations']
+            else:
+                entries = [{'id': key[1:], 'name': name} for key, name in data.items() if key.startswith('_') and key != '_0']
+        added = self.add_entries(entries)
+        logger.info(f"{added} neue Orte aus {path} importiert ({len(self._locations)} bekannt)")
+        return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--import', dest='import_path', required=True, help='CSV- oder JSON-Datei mit Orten')
+    parser.add_argument('--file', default='locations.json', help='Index-Datei')
+    args = parser.parse_args()
+
+    index = LocationIndex(args.file)
+    added = index.import_file(args.import_path)
+    print(f"{added} neue Orte importiert, {len(index)} insgesamt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Asynchrones, gedrosseltes Logging
+Worker-Threads legen Log-Records nur in eine Queue (QueueHandler); ein eigener Thread
+(QueueListener) schreibt sie in backend_export.log (JSON, eine Zeile pro Record) und auf
+die Konsole. Häufige INFO/DEBUG-Meldungen (z.B. pro geladener Seite) werden pro
+Aufrufstelle auf ein Kontingent je Zeitfenster begrenzt; Warnungen und Fehler nie.
+
+Umgebungsvariablen:
+    LOG_FORMAT=json      Auch die Konsole im JSON-Format (Standard: Text)
+    LOG_RATE_LIMIT=20/10 Höchstens 20 Meldungen pro Aufrufstelle in 10 Sekunden (0 = aus)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attribute eines LogRecords, die nicht als Zusatzfelder ins JSON übernommen werden
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatiert Records als einzeiliges JSON inkl. Zusatzfelder aus extra={...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Begrenzt INFO/DEBUG-Meldungen pro Schlüssel auf max_messages je interval Sekunden
+
+    Schlüssel ist extra={'rate_key': ...} oder sonst die Aufrufstelle (Logger + Zeile), da die
+    Meldungstexte per f-String variieren. Die erste durchgelassene Meldung nach einem
+    gedrosselten Fenster trägt die Anzahl unterdrückter Meldungen im Feld 'suppressed'.
+    """
+
+    def __init__(self, max_messages: int = 20, interval: float = 10.0):
+        super().__init__()
+        self.max_messages = max_messages
+        self.interval = interval
+        # Schlüssel -> [Fensterbeginn, Anzahl im Fenster, unterdrückt]
+        self._windows: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_messages <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = getattr(record, 'rate_key', None) or (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.max_messages:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler für eine prozessinterne Queue
+
+    Die Standard-Implementierung formatiert den Record schon im aufrufenden Thread (für
+    Queues zwischen Prozessen nötig); hier wird nur die Meldung fixiert und das Formatieren
+    dem Listener-Thread überlassen.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _parse_rate_limit(value: str) -> Tuple[int, float]:
+    try:
+        count, _, seconds = value.partition('/')
+        return int(count), float(seconds or 10)
+    except ValueError:
+        return 20, 10.0
+
+
+def setup_logging(log_file: str = 'backend_export.log', level: int = logging.INFO):
+    """
+    Richtet asynchrones Logging für den Root-Logger ein (mehrfacher Aufruf ist wirkungslos)
+
+    Vorhandene Handler am Root-Logger werden durch den QueueHandler ersetzt.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        console_handler = logging.StreamHandler()
+        if os.environ.get('LOG_FORMAT', '').lower() == 'json':
+            console_handler.setFormatter(JsonFormatter())
+        else:
+            console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _ThreadQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(*_parse_rate_limit(os.environ.get('LOG_RATE_LIMIT', '20/10'))))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_logging)
+
+
+def _stop_logging():
+    """Schreibt noch wartende Records und beendet den Listener-Thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -1,23 +1,30 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Callable, Iterator, List, Optional, Dict
 import uvicorn
+import json
 import logging
+import os
+import threading
+import time
 from scraper import KleinanzeigenScraper
-from url_finder import find_urls_for_plzs
+from link_snapshot import LinkSnapshot
+from url_finder import find_urls_for_plzs, fetch_location_suggestions
+from location_index import LocationIndex
 from makler import MaklerManager
+import profiling
+from profiling import profiled
+from log_setup import setup_logging
+from events import format_sse
+from export_formats import MEDIA_TYPES, iter_ndjson, to_parquet
+from result_cache import ResultCache
+from resilience import RetryPolicy, HostCircuitBreaker
+from lease_queue import LeaseQueue
 
-# Konfiguriere Logging mit Datei-Output
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('backend_export.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Konfiguriere Logging mit Datei-Output (asynchron über einen Listener-Thread, JSON-Zeilen)
+setup_logging('backend_export.log')
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Kleinanzeigen Scraper")
@@ -29,45 +36,100 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],  # Wichtig: Erlaube Frontend, Content-Disposition Header zu lesen
+    expose_headers=["Content-Disposition", "X-Profile-Id"],  # Wichtig: Erlaube Frontend, Content-Disposition Header zu lesen
+)
+
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """Profiliert die Anfrage, wenn X-Profile: 1 oder ?profile=1 gesetzt ist (Endpoints mit @profiled)"""
+    if not profiling.is_requested(request.headers, request.query_params):
+        return await call_next(request)
+    holder = profiling.request_profile(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    if holder['profile_id']:
+        response.headers["X-Profile-Id"] = holder['profile_id']
+    return response
+
+# SCRAPER_STREAMING=1: Suchseiten nur bis zum Ende der Ergebnisliste herunterladen
+# lazy=True: Links, Blacklist und Makler werden nicht beim Import geladen, sondern im
+# Startup-Hook im Hintergrund (bzw. spätestens beim ersten Zugriff)
+# CRAWL_QUEUE=<pfad>: Such-URLs werden über die Auftragswarteschlange an crawl_worker.py
+# verteilt, dieser Prozess führt nur noch zusammen
+crawl_queue = LeaseQueue(
+    os.environ["CRAWL_QUEUE"],
+    lease_seconds=float(os.environ.get("CRAWL_LEASE_SECONDS", "60"))
+) if os.environ.get("CRAWL_QUEUE") else None
+scraper = KleinanzeigenScraper(
+    streaming=os.environ.get("SCRAPER_STREAMING") == "1",
+    lazy=True,
+    retry=RetryPolicy.from_env(),
+    breaker=HostCircuitBreaker.from_env(),
+    crawl_queue=crawl_queue
 )
+makler_manager = MaklerManager(lazy=True)
+# PLZ/Ortsname -> Location-ID für den URL-Generator (lokal, die Vorschlags-API nur bei unbekannten Orten)
+location_index = LocationIndex(lazy=True)
+# Gerenderte Exporte und /links/grouped-Antworten, gültig bis zur nächsten Bestandsänderung
+result_cache = ResultCache(max_bytes=int(os.environ.get("RESULT_CACHE_MB", "64")) * 1024 * 1024)
+
+def _preload_state():
+    """Lädt den Bestand vor, damit die erste Anfrage nicht auf das Parsen warten muss"""
+    started = time.perf_counter()
+    try:
+        scraper.refresh_state()
+        makler_manager.refresh()
+        location_index.refresh()
+        logger.info(f"Bestand geladen: {len(scraper.links)} Links in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.error(f"Fehler beim Vorladen des Bestands: {e}")
 
-scraper = KleinanzeigenScraper()
-makler_manager = MaklerManager()
+@app.on_event("startup")
+def preload_state():
+    """Startet das Vorladen im Hintergrund - der Server nimmt sofort Anfragen an"""
+    threading.Thread(target=_preload_state, name="state-preload", daemon=True).start()
 
 class SearchRequest(BaseModel):
     search_strings: List[str]
+    enrich: bool = False  # Neue Links mit Daten aus der Detailseite anreichern
 
 class MaklerSearchRequest(BaseModel):
     makler_names: List[str]
+    enrich: bool = False  # Neue Links mit Daten aus der Detailseite anreichern
 
 class SearchResponse(BaseModel):
     success: bool
     new_links: List[str]
     total_links: int
     message: str
+    run_ids: List[str] = []  # IDs der Crawl-Berichte (/crawls/{run_id})
 
 @app.get("/")
 def read_root():
     return {"message": "Kleinanzeigen Scraper API"}
 
+# Such-Endpoints sind synchron: FastAPI führt sie im Threadpool aus, sodass gleichzeitige
+# Suchen sich an einen laufenden Crawl anhängen können, statt die Event-Loop zu blockieren
 @app.post("/search", response_model=SearchResponse)
-async def start_search(request: SearchRequest):
+@profiled
+def start_search(request: SearchRequest):
     """Legacy-Endpoint: Sucht direkt nach Links (für Kompatibilität)"""
     try:
-        new_links = scraper.search_and_collect_links(request.search_strings)
+        result = scraper.run_search(request.search_strings, enrich=request.enrich)
+        new_links = result['new_links']
         total_links = scraper.get_total_links_count()
         return SearchResponse(
             success=True,
             new_links=new_links,
             total_links=total_links,
-            message=f"{len(new_links)} neue Anzeigen gefunden"
+            message=f"{len(new_links)} neue Anzeigen gefunden",
+            run_ids=result['run_ids']
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/search/makler", response_model=SearchResponse)
-async def start_search_makler(request: MaklerSearchRequest):
+@profiled
+def start_search_makler(request: MaklerSearchRequest):
     """Sucht nach Links der angegebenen Makler"""
     try:
         # Erstelle Mapping: search_url -> makler_name
@@ -89,26 +151,42 @@ async def start_search_makler(request: MaklerSearchRequest):
             )
         
         # Führe Scraping durch mit URL-zu-Makler-Mapping
-        new_links = scraper.search_and_collect_links(all_links, url_to_makler_mapping=url_to_makler)
+        # Freie Slots werden reihum nach Makler vergeben (Priorität/Limit aus makler.json)
+        result = scraper.run_search(all_links, url_to_makler_mapping=url_to_makler, enrich=request.enrich,
+                                    makler_schedules=makler_manager.get_schedules(request.makler_names))
+        new_links = result['new_links']
         total_links = scraper.get_total_links_count()
         
         return SearchResponse(
             success=True,
             new_links=new_links,
             total_links=total_links,
-            message=f"{len(new_links)} neue Anzeigen gefunden für {len(request.makler_names)} Makler"
+            message=f"{len(new_links)} neue Anzeigen gefunden für {len(request.makler_names)} Makler",
+            run_ids=result['run_ids']
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/links")
 def get_all_links():
+    snapshot = scraper.snapshot()
     return {
-        "links": scraper.get_all_links(),
-        "count": scraper.get_total_links_count()
+        "links": scraper.get_all_links(snapshot),
+        "count": len(snapshot)
     }
 
+@app.get("/links/changes")
+def get_link_changes(since: Optional[int] = Query(None, ge=0, description="Zuletzt bekannte Version des Bestands (leer = kompletter Bestand)")):
+    """
+    Delta-Synchronisation: neue, geänderte und gelöschte Links seit Version since
+
+    Ohne since oder wenn since nicht mehr im Änderungsprotokoll liegt, enthält die Antwort
+    stattdessen den kompletten Bestand ("snapshot": true). Die neue Version steht in "version".
+    """
+    return scraper.get_link_changes(since)
+
 @app.get("/links/grouped")
+@profiled
 def get_links_grouped_by_makler(
     makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
     year: Optional[int] = Query(None, description="Jahr zum Filtern"),
@@ -128,24 +206,34 @@ def get_links_grouped_by_makler(
     if day is not None and (day < 1 or day > 31):
         raise HTTPException(status_code=400, detail="Tag muss zwischen 1 und 31 sein")
     
-    # Filtere Links
-    grouped = scraper.get_filtered_links_grouped(
-        makler_names=makler_list,
-        year=year,
-        month=month,
-        day=day,
-        last_search_only=last_search_only
-    )
+    # Ein Stand für die ganze Anfrage - ein laufender Crawl ändert ihn nicht
+    snapshot = scraper.snapshot()
     
-    # Konvertiere für Frontend: Dict mit Makler-Namen als Keys
-    return {
-        "grouped": grouped,
-        "makler_names": list(grouped.keys()),
-        "total_count": scraper.get_total_links_count(),
-        "filtered_count": sum(len(links) for links in grouped.values())
-    }
+    def compute():
+        # Filtere Links
+        grouped = scraper.get_filtered_links_grouped(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            last_search_only=last_search_only,
+            snapshot=snapshot
+        )
+        
+        # Konvertiere für Frontend: Dict mit Makler-Namen als Keys
+        return json.dumps({
+            "grouped": grouped,
+            "makler_names": list(grouped.keys()),
+            "total_count": len(snapshot),
+            "filtered_count": sum(len(links) for links in grouped.values())
+        }, ensure_ascii=False).encode("utf-8")
+    
+    params = {"makler_names": makler_list, "year": year, "month": month, "day": day, "last_search_only": last_search_only}
+    content = result_cache.get_or_compute("links/grouped", params, snapshot.key, compute)
+    return Response(content=content, media_type="application/json")
 
 @app.delete("/links")
+@profiled
 def clear_links(
     makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
     year: Optional[int] = Query(None, description="Jahr zum Filtern"),
@@ -188,6 +276,96 @@ def clear_links(
         "deleted_count": deleted_count
     }
 
+@app.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events: neue Links (mit Maklern) sobald sie übernommen wurden, Fortschritt pro
+    Such-URL sowie Start/Ende jedes Crawls. Ereignisse kommen nur aus dem Worker-Prozess, der
+    die Verbindung hält.
+    """
+    async def event_stream():
+        with scraper.events.subscribe() as subscription:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=15)
+                # Kommentarzeile als Keep-Alive für Proxies
+                yield format_sse(event) if event is not None else ": ping\n\n"
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/stats")
+@profiled
+def get_stats(
+    interval: str = Query("day", description="Periode für Histogramme: day, week oder month"),
+    makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
+    since: Optional[str] = Query(None, description="Nur Links ab diesem Datum (YYYY-MM-DD, inklusive)"),
+    until: Optional[str] = Query(None, description="Nur Links vor diesem Datum (YYYY-MM-DD, exklusive)"),
+    top: int = Query(10, ge=0, le=100, description="Anzahl der Such-URLs mit den meisten Links")
+):
+    """Kennzahlen über alle Links: je Makler, je Tag/Woche/Monat, je Makler und Periode, Top-Such-URLs"""
+    makler_list = None
+    if makler_names:
+        makler_list = [name.strip() for name in makler_names.split(',') if name.strip()]
+    started = time.perf_counter()
+    try:
+        stats = scraper.get_stats(interval=interval, makler_names=makler_list, since=since, until=until, top=top,
+                                  snapshot=scraper.snapshot())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return stats
+
+@app.get("/crawls")
+def list_crawls(limit: int = Query(20, ge=1, le=200, description="Maximale Anzahl Läufe")):
+    """Kurzübersicht der letzten Crawl-Läufe mit Kennzahlen"""
+    return {"crawls": scraper.crawl_reports.list(limit)}
+
+@app.get("/crawls/{run_id}")
+def get_crawl_report(run_id: str):
+    """Gibt den Bericht eines Crawl-Laufs zurück (pro Such-URL und Seite, p50/p95-Latenzen)"""
+    report = scraper.crawl_reports.get(run_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Crawl-Lauf '{run_id}' nicht gefunden")
+    return report
+
+@app.get("/egress")
+def get_egress_status():
+    """Gibt den Status aller Egress-Routen (Budget, Auslastung, Health-Score) und der Circuit Breaker je Host zurück"""
+    return {"routes": scraper.egress.status(), "hosts": scraper.breaker.status()}
+
+@app.get("/admin/queue")
+def get_queue_stats():
+    """Aufträge je Zustand und aktive Worker der verteilten Crawl-Warteschlange (CRAWL_QUEUE)"""
+    if crawl_queue is None:
+        return {"enabled": False}
+    return {"enabled": True, **crawl_queue.stats()}
+
+@app.get("/admin/cache")
+def get_cache_stats():
+    """Trefferquote und Größe des Ergebnis-Caches (Exporte, gruppierte Links) in diesem Prozess"""
+    return result_cache.stats()
+
+@app.get("/admin/profiles")
+def get_profiles():
+    """Listet gespeicherte Profile auf (neueste zuerst)"""
+    return {"profiles": profiling.list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", description="pstats (Datei-Download) oder text (Top-Funktionen)"),
+    sort: str = Query("cumulative", description="Sortierung für format=text (cumulative, tottime, calls)")
+):
+    """Gibt ein gespeichertes Profil als .pstats-Datei oder als Text-Zusammenfassung zurück"""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profil '{profile_id}' nicht gefunden")
+    if format == "text":
+        if sort not in ("cumulative", "tottime", "calls"):
+            raise HTTPException(status_code=400, detail="Sortierung muss cumulative, tottime oder calls sein")
+        return PlainTextResponse(profiling.profile_summary(profile_id, sort=sort))
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+
 @app.delete("/blacklist")
 def clear_blacklist():
     scraper.clear_blacklist()
@@ -215,6 +393,20 @@ def delete_makler(name: str):
         raise HTTPException(status_code=404, detail=f"Makler '{name}' nicht gefunden")
     return {"message": f"Makler '{name}' wurde gelöscht"}
 
+class MaklerScheduleRequest(BaseModel):
+    priority: int = 1  # Gewicht bei der Vergabe freier Slots während eines Crawls
+    max_concurrency: Optional[int] = None  # Höchstens so viele gleichzeitige Such-URLs (leer = unbegrenzt)
+
+@app.put("/makler/{name}/schedule")
+def set_makler_schedule(name: str, request: MaklerScheduleRequest):
+    """Setzt Priorität und Parallelitätslimit eines Maklers für Crawls"""
+    if request.priority < 1 or (request.max_concurrency is not None and request.max_concurrency < 1):
+        raise HTTPException(status_code=400, detail="priority und max_concurrency müssen mindestens 1 sein")
+    success = makler_manager.set_schedule(name, request.priority, request.max_concurrency)
+    if not success:
+        raise HTTPException(status_code=404, detail=f"Makler '{name}' nicht gefunden")
+    return {"message": f"Scheduling für Makler '{name}' gespeichert", "makler": makler_manager.get_makler(name)}
+
 class AddLinkRequest(BaseModel):
     link: str
 
@@ -243,7 +435,7 @@ class URLGeneratorRequest(BaseModel):
 def generate_urls_with_ids(request: URLGeneratorRequest):
     """Generiert URLs mit IDs für eine Liste von PLZs"""
     try:
-        results = find_urls_for_plzs(request.plz_list, request.filters, request.reference_url)
+        results = find_urls_for_plzs(request.plz_list, request.filters, request.reference_url, index=location_index)
         urls = list(results.values())
         return {
             "success": True,
@@ -254,14 +446,77 @@ def generate_urls_with_ids(request: URLGeneratorRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Generieren der URLs: {str(e)}")
 
+@app.get("/locations/suggest")
+def suggest_locations(
+    q: str = Query(..., min_length=1, description="Anfang einer PLZ oder eines Ortsnamens"),
+    limit: int = Query(10, ge=1, le=50, description="Maximale Anzahl Vorschläge"),
+    remote: bool = Query(True, description="Bei unbekanntem Ort die Vorschlags-API von Kleinanzeigen fragen")
+):
+    """Orts-Vorschläge für den URL-Generator aus dem lokalen Index, bei einem Fehlschlag von Kleinanzeigen"""
+    started = time.perf_counter()
+    suggestions = location_index.suggest(q, limit)
+    source = "local"
+    # Sehr kurze Eingaben nicht weiterreichen - dafür liefert die API ohnehin nichts Brauchbares
+    if not suggestions and remote and len(q.strip()) >= 2:
+        source = "remote"
+        try:
+            found = fetch_location_suggestions(q.strip())
+        except Exception as e:
+            logger.error(f"Fehler bei Orts-Vorschlägen für {q}: {e}")
+            raise HTTPException(status_code=502, detail=f"Vorschlags-API nicht erreichbar: {e}")
+        if found:
+            try:
+                # Mit Anfrage speichern, damit dieselbe Eingabe beim nächsten Mal lokal beantwortet wird
+                location_index.add(found, query=q.strip())
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern der Orts-Vorschläge für {q}: {e}")
+        suggestions = [location_index.get(location_id) or {"id": location_id, "name": name, "plz": None}
+                       for location_id, name in found[:limit]]
+    return {
+        "query": q,
+        "source": source,
+        "suggestions": suggestions,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+def _export_response(endpoint: str, params: Dict, snapshot: LinkSnapshot, load_links: Callable[[], List[Dict]], filename: str, export_format: str,
+                     stream_links: Callable[[], Iterator[Dict]]) -> Response:
+    """
+    Download-Antwort im gewünschten Format (filename ohne Endung)
+    
+    load_links und stream_links lesen aus snapshot, dem zu Beginn der Anfrage festgehaltenen
+    Stand. CSV und Parquet kommen aus dem Ergebnis-Cache, solange sich der Bestand nicht ändert;
+    NDJSON wird immer frisch gestreamt - Zeile für Zeile aus stream_links, ohne vorab alle
+    Datensätze im Speicher aufzubauen.
+    """
+    filename = f"{filename}.{export_format}"
+    # Content-Disposition Header mit korrektem Dateinamen
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if export_format == "ndjson":
+        return StreamingResponse(iter_ndjson(stream_links()), media_type=MEDIA_TYPES["ndjson"], headers=headers)
+    
+    def render():
+        if export_format == "parquet":
+            return to_parquet(load_links())
+        return scraper.export_to_csv_with_metadata(load_links()).encode("utf-8")
+    
+    try:
+        content = result_cache.get_or_compute(endpoint, {**params, "format": export_format}, snapshot.key, render)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return Response(content=content, media_type=MEDIA_TYPES[export_format], headers=headers)
+
 @app.get("/export/last")
+@profiled
 def export_last_scraping(
     makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
     year: Optional[int] = Query(None, description="Jahr (z.B. 2026)"),
     month: Optional[int] = Query(None, description="Monat (1-12)"),
-    day: Optional[int] = Query(None, description="Tag (1-31)")
+    day: Optional[int] = Query(None, description="Tag (1-31)"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson (gestreamt) oder parquet"),
+    run_id: Optional[str] = Query(None, description="Statt der letzten Suche die neuen Links dieses Crawl-Laufs (/crawls)")
 ):
-    """Exportiert die Links der letzten Suche als CSV, optional gefiltert nach Makler und/oder Datum"""
+    """Exportiert die Links der letzten Suche (oder eines früheren Crawl-Laufs) als CSV, NDJSON oder Parquet, optional gefiltert nach Makler und/oder Datum"""
     makler_list = None
     if makler_names:
         from urllib.parse import unquote
@@ -274,18 +529,24 @@ def export_last_scraping(
         raise HTTPException(status_code=400, detail="Monat muss zwischen 1 und 12 sein")
     if day is not None and (day < 1 or day > 31):
         raise HTTPException(status_code=400, detail="Tag muss zwischen 1 und 31 sein")
+    if run_id is not None and scraper.get_run_links(run_id) is None:
+        raise HTTPException(status_code=404, detail=f"Crawl-Lauf '{run_id}' nicht gefunden")
     
-    links_with_metadata = scraper.get_filtered_links_with_metadata(
-        makler_names=makler_list,
-        year=year,
-        month=month,
-        day=day,
-        last_search_only=True
-    )
-    csv_content = scraper.export_to_csv_with_metadata(links_with_metadata)
+    snapshot = scraper.snapshot()
     
-    # Dateiname mit allen Filterkriterien: Datum + Makler
-    filename = "letzte_suche"
+    def load_links():
+        return scraper.get_filtered_links_with_metadata(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            last_search_only=True,
+            snapshot=snapshot,
+            run_id=run_id
+        )
+    
+    # Dateiname mit allen Filterkriterien: Lauf + Datum + Makler
+    filename = f"lauf_{run_id}" if run_id else "letzte_suche"
     if year and month:
         filename += f"_{year}_{month:02d}"
         if day:
@@ -298,24 +559,33 @@ def export_last_scraping(
         else:
             # Mehrere Makler: "mehrere" als Platzhalter
             filename += "_mehrere_makler"
-    filename += ".csv"
     
-    logger.info(f"Export letzte_suche - Dateiname: {filename}, Makler: {makler_list}")
+    logger.info(f"Export letzte_suche - Dateiname: {filename}.{export_format}, Makler: {makler_list}, Lauf: {run_id}")
     
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    def stream_links():
+        return scraper.iter_filtered_links_with_metadata(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            last_search_only=True,
+            snapshot=snapshot,
+            run_id=run_id
+        )
+    
+    params = {"makler_names": makler_list, "year": year, "month": month, "day": day, "run_id": run_id}
+    return _export_response("export/last", params, snapshot, load_links, filename, export_format, stream_links)
 
 @app.get("/export/all")
+@profiled
 def export_all_links(
     makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
     year: Optional[int] = Query(None, description="Jahr (z.B. 2026)"),
     month: Optional[int] = Query(None, description="Monat (1-12)"),
-    day: Optional[int] = Query(None, description="Tag (1-31)")
+    day: Optional[int] = Query(None, description="Tag (1-31)"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson (gestreamt) oder parquet")
 ):
-    """Exportiert alle Links als CSV, optional gefiltert nach Makler und/oder Datum"""
+    """Exportiert alle Links als CSV, NDJSON oder Parquet, optional gefiltert nach Makler und/oder Datum"""
     makler_list = None
     if makler_names:
         from urllib.parse import unquote
@@ -329,17 +599,20 @@ def export_all_links(
     if day is not None and (day < 1 or day > 31):
         raise HTTPException(status_code=400, detail="Tag muss zwischen 1 und 31 sein")
     
-    # Wenn Filter gesetzt sind, verwende get_filtered_links_with_metadata
-    if makler_list or year or month or day:
-        links_with_metadata = scraper.get_filtered_links_with_metadata(
-            makler_names=makler_list,
-            year=year,
-            month=month,
-            day=day
-        )
-    else:
+    snapshot = scraper.snapshot()
+    
+    def load_links():
+        # Wenn Filter gesetzt sind, verwende get_filtered_links_with_metadata
+        if makler_list or year or month or day:
+            return scraper.get_filtered_links_with_metadata(
+                makler_names=makler_list,
+                year=year,
+                month=month,
+                day=day,
+                snapshot=snapshot
+            )
         # Für "alle Links" ohne Filter: hole alle Links mit Metadaten
-        all_links_data = scraper.get_all_links_with_dates()
+        all_links_data = scraper.get_all_links_with_dates(snapshot)
         links_with_metadata = []
         for link_entry in all_links_data:
             if isinstance(link_entry, dict):
@@ -350,10 +623,11 @@ def export_all_links(
                 links_with_metadata.append({
                     'url': link_entry.get('url', ''),
                     'makler': makler_str,
-                    'scraped_at': link_entry.get('scraped_at', '')
+                    'makler_names': makler_names_list,
+                    'scraped_at': link_entry.get('scraped_at', ''),
+                    'details': link_entry.get('details')
                 })
-    
-    csv_content = scraper.export_to_csv_with_metadata(links_with_metadata)
+        return links_with_metadata
     
     # Dateiname mit allen Filterkriterien: Datum + Makler
     filename = "alle_links"
@@ -369,22 +643,30 @@ def export_all_links(
         else:
             # Mehrere Makler: "mehrere" als Platzhalter
             filename += "_mehrere_makler"
-    filename += ".csv"
     
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    def stream_links():
+        # Ohne Filter liefert die leere Abfrage alle Links im selben Format wie load_links
+        return scraper.iter_filtered_links_with_metadata(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            snapshot=snapshot
+        )
+    
+    params = {"makler_names": makler_list, "year": year, "month": month, "day": day}
+    return _export_response("export/all", params, snapshot, load_links, filename, export_format, stream_links)
 
 @app.get("/export/filtered")
+@profiled
 def export_filtered_links(
     year: int = Query(..., description="Jahr (z.B. 2026)"),
     month: int = Query(..., description="Monat (1-12)"),
     day: Optional[int] = Query(None, description="Tag (1-31)"),
-    makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen")
+    makler_names: Optional[str] = Query(None, description="Komma-getrennte Liste von Makler-Namen"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson (gestreamt) oder parquet")
 ):
-    """Exportiert Links gefiltert nach Jahr, Monat, optional Tag und optional Makler als CSV"""
+    """Exportiert Links gefiltert nach Jahr, Monat, optional Tag und optional Makler als CSV, NDJSON oder Parquet"""
     if month < 1 or month > 12:
         raise HTTPException(status_code=400, detail="Monat muss zwischen 1 und 12 sein")
     if day is not None and (day < 1 or day > 31):
@@ -399,13 +681,16 @@ def export_filtered_links(
         makler_list = [name.strip() for name in decoded_names.split(',') if name.strip()]
         logger.info(f"Export filtered - Makler-Liste nach Split: {makler_list}, len: {len(makler_list) if makler_list else 0}")
     
-    links_with_metadata = scraper.get_filtered_links_with_metadata(
-        makler_names=makler_list,
-        year=year,
-        month=month,
-        day=day
-    )
-    csv_content = scraper.export_to_csv_with_metadata(links_with_metadata)
+    snapshot = scraper.snapshot()
+    
+    def load_links():
+        return scraper.get_filtered_links_with_metadata(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            snapshot=snapshot
+        )
     
     # Dateiname mit allen Filterkriterien: Datum + Makler
     filename = f"links_{year}_{month:02d}"
@@ -413,7 +698,6 @@ def export_filtered_links(
         filename += f"_{day:02d}"
     
     logger.info(f"Export filtered - Vor Makler-Prüfung: makler_list={makler_list}, type={type(makler_list)}, len={len(makler_list) if makler_list else 0}")
-    print(f"DEBUG: makler_list = {makler_list}, bool(makler_list) = {bool(makler_list)}, len = {len(makler_list) if makler_list else 'None'}")
     
     if makler_list is not None and len(makler_list) > 0:
         logger.info(f"Export filtered - Makler-Liste gefüllt: {makler_list}")
@@ -429,20 +713,21 @@ def export_filtered_links(
     else:
         logger.warning(f"Export filtered - KEIN Makler im Dateinamen! makler_list={makler_list}")
     
-    filename += ".csv"
-    
-    logger.info(f"Export filtered - Finaler Dateiname: {filename}, Makler: {makler_list}")
+    logger.info(f"Export filtered - Finaler Dateiname: {filename}.{export_format}, Makler: {makler_list}")
     
-    # Content-Disposition Header mit korrektem Dateinamen
-    content_disposition = f'attachment; filename="{filename}"'
-    logger.info(f"Export filtered - Content-Disposition Header: {content_disposition}")
+    def stream_links():
+        return scraper.iter_filtered_links_with_metadata(
+            makler_names=makler_list,
+            year=year,
+            month=month,
+            day=day,
+            snapshot=snapshot
+        )
     
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": content_disposition}
-    )
+    params = {"makler_names": makler_list, "year": year, "month": month, "day": day}
+    return _export_response("export/filtered", params, snapshot, load_links, filename, export_format, stream_links)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=9000)
+    # Mehrere Worker teilen sich den Zustand über die JSON-Dateien (siehe store.py)
+    uvicorn.run("main:app", host="0.0.0.0", port=9000, workers=int(os.environ.get("WEB_CONCURRENCY", "1")))
 
@@ -2,27 +2,34 @@
 Makler-Verwaltung
 Verwaltet Makler mit ihren zugehörigen Links
 """
-import json
 import os
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
+from store import FileLock, file_signature, read_json, atomic_write_json
+from fair_scheduler import MaklerSchedule
 
 logger = logging.getLogger(__name__)
 
 
 class MaklerManager:
-    def __init__(self, makler_file="makler.json"):
+    def __init__(self, makler_file="makler.json", lazy=False):
         self.makler_file = makler_file
-        self.makler: Dict[str, Dict] = self.load_makler()
+        # Prozessübergreifende Sperre für Änderungen (mehrere uvicorn-Worker)
+        self._lock = FileLock(makler_file + '.lock')
+        self._signature = None
+        self.makler: Dict[str, Dict] = {}
+        # lazy=True: Datei wird erst beim ersten Zugriff (refresh) geladen
+        if not lazy:
+            self.refresh()
     
     def load_makler(self) -> Dict[str, Dict]:
         """Lädt die Makler-Daten aus einer JSON-Datei"""
+        self._signature = file_signature(self.makler_file)
         if os.path.exists(self.makler_file):
             try:
-                with open(self.makler_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('makler', {})
+                data = read_json(self.makler_file, {})
+                return data.get('makler', {})
             except Exception as e:
                 logger.error(f"Fehler beim Laden der Makler: {e}")
                 return {}
@@ -31,11 +38,16 @@ class MaklerManager:
     def save_makler(self):
         """Speichert die Makler-Daten in eine JSON-Datei"""
         try:
-            with open(self.makler_file, 'w', encoding='utf-8') as f:
-                json.dump({'makler': self.makler}, f, indent=2, ensure_ascii=False)
+            atomic_write_json(self.makler_file, {'makler': self.makler})
+            self._signature = file_signature(self.makler_file)
         except Exception as e:
             logger.error(f"Fehler beim Speichern der Makler: {e}")
     
+    def refresh(self):
+        """Lädt die Makler-Daten neu, falls ein anderer Prozess sie geändert hat"""
+        if file_signature(self.makler_file) != self._signature:
+            self.makler = self.load_makler()
+    
     def add_makler(self, name: str) -> bool:
         """
         Fügt einen neuen Makler hinzu
@@ -46,16 +58,18 @@ class MaklerManager:
         Returns:
             True wenn erfolgreich, False wenn Makler bereits existiert
         """
-        if name in self.makler:
-            return False
-        
-        self.makler[name] = {
-            'name': name,
-            'links': [],
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-        self.save_makler()
+        with self._lock.acquire():
+            self.refresh()
+            if name in self.makler:
+                return False
+            
+            self.makler[name] = {
+                'name': name,
+                'links': [],
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            }
+            self.save_makler()
         logger.info(f"Makler '{name}' hinzugefügt")
         return True
     
@@ -69,11 +83,13 @@ class MaklerManager:
         Returns:
             True wenn erfolgreich, False wenn Makler nicht existiert
         """
-        if name not in self.makler:
-            return False
-        
-        del self.makler[name]
-        self.save_makler()
+        with self._lock.acquire():
+            self.refresh()
+            if name not in self.makler:
+                return False
+            
+            del self.makler[name]
+            self.save_makler()
         logger.info(f"Makler '{name}' gelöscht")
         return True
     
@@ -88,14 +104,16 @@ class MaklerManager:
         Returns:
             True wenn erfolgreich, False wenn Makler nicht existiert
         """
-        if name not in self.makler:
-            return False
-        
-        if link not in self.makler[name]['links']:
-            self.makler[name]['links'].append(link)
-            self.makler[name]['updated_at'] = datetime.now().isoformat()
-            self.save_makler()
-            logger.info(f"Link zu Makler '{name}' hinzugefügt")
+        with self._lock.acquire():
+            self.refresh()
+            if name not in self.makler:
+                return False
+            
+            if link not in self.makler[name]['links']:
+                self.makler[name]['links'].append(link)
+                self.makler[name]['updated_at'] = datetime.now().isoformat()
+                self.save_makler()
+                logger.info(f"Link zu Makler '{name}' hinzugefügt")
         
         return True
     
@@ -110,17 +128,48 @@ class MaklerManager:
         Returns:
             True wenn erfolgreich, False wenn Makler oder Link nicht existiert
         """
-        if name not in self.makler:
-            return False
+        with self._lock.acquire():
+            self.refresh()
+            if name not in self.makler:
+                return False
+            
+            if link in self.makler[name]['links']:
+                self.makler[name]['links'].remove(link)
+                self.makler[name]['updated_at'] = datetime.now().isoformat()
+                self.save_makler()
+                logger.info(f"Link von Makler '{name}' entfernt")
         
-        if link in self.makler[name]['links']:
-            self.makler[name]['links'].remove(link)
+        return True
+    
+    def set_schedule(self, name: str, priority: int = 1, max_concurrency: Optional[int] = None) -> bool:
+        """
+        Setzt Priorität und Parallelitätslimit eines Maklers für Crawls
+        
+        Args:
+            name: Name des Maklers
+            priority: Gewicht bei der Vergabe freier Slots (mindestens 1)
+            max_concurrency: Höchstens so viele gleichzeitig gecrawlte Such-URLs (None = unbegrenzt)
+        
+        Returns:
+            True wenn erfolgreich, False wenn Makler nicht existiert
+        """
+        schedule = MaklerSchedule(priority, max_concurrency)
+        with self._lock.acquire():
+            self.refresh()
+            if name not in self.makler:
+                return False
+            
+            self.makler[name].update(schedule.to_dict())
             self.makler[name]['updated_at'] = datetime.now().isoformat()
             self.save_makler()
-            logger.info(f"Link von Makler '{name}' entfernt")
-        
+        logger.info(f"Scheduling für Makler '{name}' gesetzt: Priorität {schedule.priority}, Limit {schedule.max_concurrency}")
         return True
     
+    def get_schedules(self, makler_names: List[str]) -> Dict[str, MaklerSchedule]:
+        """Scheduling-Einstellungen der angegebenen Makler (unbekannte Makler: Standard)"""
+        self.refresh()
+        return {name: MaklerSchedule.from_dict(self.makler.get(name)) for name in makler_names}
+    
     def get_makler(self, name: Optional[str] = None) -> Dict:
         """
         Gibt Makler-Daten zurück
@@ -131,12 +180,14 @@ class MaklerManager:
         Returns:
             Dict mit Makler-Daten
         """
+        self.refresh()
         if name:
             return self.makler.get(name)
         return self.makler
     
     def get_all_makler_names(self) -> List[str]:
         """Gibt alle Makler-Namen zurück"""
+        self.refresh()
         return list(self.makler.keys())
     
     def get_links_for_makler(self, name: str) -> List[str]:
@@ -149,6 +200,7 @@ class MaklerManager:
         Returns:
             Liste von URLs
         """
+        self.refresh()
         if name not in self.makler:
             return []
         return self.makler[name].get('links', [])
@@ -0,0 +1,166 @@
+"""
+Opt-in-Profiling für API-Anfragen und Crawls
+Eine Anfrage mit Header "X-Profile: 1" oder Query-Parameter "profile=1" wird mit cProfile
+profiliert (inklusive der Crawl-Worker-Threads). Das Ergebnis wird als .pstats-Datei
+gespeichert und ist über die Admin-Endpoints abrufbar. Ohne Flag kostet das nur einen
+Kontextvariablen-Zugriff pro Aufruf.
+"""
+import cProfile
+import io
+import os
+import re
+import pstats
+import threading
+import uuid
+import logging
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Optional
+
+from store import atomic_write_json, read_json
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+MAX_PROFILES = 50
+_PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+# Von der Middleware gesetzt: Dict mit 'label' und (nach dem Lauf) 'profile_id'
+_requested: ContextVar[Optional[Dict]] = ContextVar('profile_requested', default=None)
+# Laufende Profiling-Session (verhindert verschachteltes Profiling)
+_active: ContextVar[Optional["ProfileSession"]] = ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """Sammelt cProfile-Daten aus mehreren Threads und speichert sie als eine .pstats-Datei"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        """Führt fn im aktuellen Thread unter cProfile aus"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def save(self) -> Optional[str]:
+        """Speichert die zusammengeführten Daten und gibt die Profil-ID zurück"""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.pstats"))
+        atomic_write_json(os.path.join(PROFILE_DIR, f"{profile_id}.json"), {
+            'id': profile_id,
+            'label': self.label,
+            'threads': len(profiles),
+            'created_at': datetime.now().isoformat()
+        })
+        _prune_profiles()
+        logger.info(f"Profil gespeichert: {profile_id} ({self.label})")
+        return profile_id
+
+
+def is_requested(headers, query_params) -> bool:
+    """Prüft, ob eine Anfrage Profiling anfordert (Header X-Profile oder Query profile)"""
+    flag = headers.get('x-profile') or query_params.get('profile')
+    return flag is not None and flag.lower() in ('1', 'true', 'yes')
+
+
+def request_profile(label: str) -> Dict:
+    """Markiert den aktuellen Kontext als zu profilieren; das Dict erhält später 'profile_id'"""
+    holder = {'label': label, 'profile_id': None}
+    _requested.set(holder)
+    return holder
+
+
+def profiled(fn):
+    """Decorator: profiliert fn, wenn die aktuelle Anfrage Profiling angefordert hat"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        holder = _requested.get()
+        if holder is None or _active.get() is not None:
+            return fn(*args, **kwargs)
+        session = ProfileSession(holder['label'])
+        token = _active.set(session)
+        try:
+            return session.run(fn, *args, **kwargs)
+        finally:
+            _active.reset(token)
+            try:
+                holder['profile_id'] = session.save()
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern des Profils: {e}")
+    return wrapper
+
+
+def propagate(fn):
+    """
+    Bindet fn an die aktive Profiling-Session, z.B. für Aufgaben eines ThreadPoolExecutors
+
+    Ohne aktive Session wird fn unverändert zurückgegeben.
+    """
+    session = _active.get()
+    if session is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return session.run(fn, *args, **kwargs)
+    return wrapper
+
+
+def _prune_profiles():
+    """Behält nur die neuesten MAX_PROFILES Profile"""
+    profile_ids = sorted(name[:-len('.pstats')] for name in os.listdir(PROFILE_DIR) if name.endswith('.pstats'))
+    for profile_id in profile_ids[:-MAX_PROFILES]:
+        for suffix in ('.pstats', '.json'):
+            path = os.path.join(PROFILE_DIR, profile_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Pfad zur .pstats-Datei oder None bei ungültiger/unbekannter ID"""
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.pstats")
+    return path if os.path.exists(path) else None
+
+
+def list_profiles() -> List[Dict]:
+    """Metadaten aller gespeicherten Profile, neueste zuerst"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith('.json'):
+            try:
+                profiles.append(read_json(os.path.join(PROFILE_DIR, name), {}))
+            except Exception as e:
+                logger.error(f"Fehler beim Lesen von Profil-Metadaten {name}: {e}")
+    return profiles
+
+
+def profile_summary(profile_id: str, limit: int = 40, sort: str = 'cumulative') -> Optional[str]:
+    """Textuelle Zusammenfassung eines Profils (Top-Funktionen nach Sortierung)"""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,257 @@
+"""
+Abfragen über den Link-Bestand
+Filter (Makler, Jahr/Monat/Tag, letzte Suche) werden einmal zu einer LinkQuery kompiliert:
+Makler-Namen werden einmal normalisiert und in Makler-IDs übersetzt (der Bestand besteht aus
+LinkRecords, siehe link_record.py), nicht gesetzte Filter kosten nichts, und der
+Datumsfilter prüft jeden vorkommenden Zeitstempel nur einmal (ein Wert pro Crawl-Schub).
+run_query wertet die Filterstufen aus und übergibt die Treffer an eine Projektion (flache
+URL-Liste, Metadaten, nach Makler gruppiert oder Aufteilung für das Löschen).
+
+Einheitliche Regeln für alle Abfragen:
+- Makler-Namen werden auf beiden Seiten ohne umgebenden Leerraum verglichen
+- scraped_at wird ohne Leerraum und mit 'Z' als '+00:00' gelesen; Links ohne oder mit
+  ungültigem Datum erfüllen keinen Datumsfilter (werden also auch nicht gelöscht)
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from link_record import LinkRecord, MICROS_PER_DAY, day_start, decode_timestamp, makler_table, records_to_dicts, timestamp_datetime
+
+NO_MAKLER = 'Sonstige'
+
+
+class LinkQuery:
+    """
+    Kompilierte Filter
+
+    Args:
+        makler_names: Links mit mindestens einem dieser Makler (optional)
+        year, month, day: Datum von scraped_at (optional, einzeln kombinierbar)
+        last_search_urls: Nur diese URLs, z.B. die der letzten Suche (optional)
+    """
+
+    def __init__(
+        self,
+        makler_names: List[str] = None,
+        year: int = None,
+        month: int = None,
+        day: int = None,
+        last_search_urls: Iterable[str] = None
+    ):
+        self.makler_names = frozenset(str(name).strip() for name in makler_names) if makler_names else None
+        self.year = year
+        self.month = month
+        self.day = day
+        if last_search_urls is not None and not isinstance(last_search_urls, (set, frozenset)):
+            last_search_urls = set(last_search_urls)
+        self.last_search_urls = last_search_urls
+        # IDs aller bekannten Makler, deren Name (ohne Leerraum) gesucht ist
+        self.makler_ids = frozenset(
+            makler for makler, name in enumerate(makler_table()) if name.strip() in self.makler_names
+        ) if self.makler_names is not None else None
+        self.stages = self._compile()
+
+    def _compile(self) -> List[Callable[[List[LinkRecord]], List[LinkRecord]]]:
+        """
+        Filterstufen der gesetzten Filter, die trennschärfste zuerst; jede Stufe filtert
+        die Treffer der vorigen in einer eigenen Listen-Abstraktion (kein Funktionsaufruf pro
+        Link und Filter)
+        """
+        stages = []
+        if self.last_search_urls is not None:
+            urls = self.last_search_urls
+            stages.append(lambda links: [link for link in links if link.url in urls])
+        if self.makler_ids is not None:
+            wanted = self.makler_ids
+            stages.append(lambda links: [link for link in links if not wanted.isdisjoint(link.makler)])
+        if self.year is not None or self.month is not None or self.day is not None:
+            stages.append(self._compile_date())
+        return stages
+
+    def _compile_date(self) -> Callable[[List[LinkRecord]], List[LinkRecord]]:
+        year, month, day = self.year, self.month, self.day
+
+        def date_stage(links):
+            # Integer-Zeitstempel werden pro Kalendertag geprüft, alle anderen Werte
+            # (Zeichenketten mit Zeitzone o.ä.) pro vorkommendem Wert - jeweils nur einmal
+            day_matches = _DateMatch(day_start, year, month, day)
+            value_matches = _DateMatch(timestamp_datetime, year, month, day)
+            return [
+                link for link in links
+                if (day_matches[timestamp // MICROS_PER_DAY] if (timestamp := link.timestamp).__class__ is int
+                    else value_matches[timestamp])
+            ]
+        return date_stage
+
+    def matching_makler(self, makler: Tuple[int, ...]) -> Tuple[int, ...]:
+        """Die Makler-IDs, die der Makler-Filter zulässt (alle, wenn kein Filter gesetzt ist)"""
+        if self.makler_ids is None:
+            return makler
+        return tuple(m for m in makler if m in self.makler_ids)
+
+    def filter(self, links: List[LinkRecord]) -> List[LinkRecord]:
+        """Alle passenden Links; jede Filterstufe läuft nur noch über die Treffer der vorigen"""
+        matched = list(links)
+        for stage in self.stages:
+            matched = stage(matched)
+        return matched
+
+
+class _DateMatch(dict):
+    """Merkt sich pro Schlüssel (Tag oder Zeitstempel), ob sein Datum zum Filter passt"""
+
+    def __init__(self, to_datetime: Callable, year: Optional[int], month: Optional[int], day: Optional[int]):
+        super().__init__()
+        self.to_datetime = to_datetime
+        self.year, self.month, self.day = year, month, day
+
+    def __missing__(self, key) -> bool:
+        dt = self.to_datetime(key)
+        matches = self[key] = (
+            dt is not None
+            and (self.year is None or dt.year == self.year)
+            and (self.month is None or dt.month == self.month)
+            and (self.day is None or dt.day == self.day)
+        )
+        return matches
+
+
+class Projection(ABC):
+    """Formt die Treffer einer Abfrage zum Ergebnis; needs_rest = auch Nicht-Treffer übergeben"""
+
+    needs_rest = False
+
+    @abstractmethod
+    def collect(self, matched: List[LinkRecord], rest: Optional[List[LinkRecord]], query: LinkQuery):
+        """Ergebnis aus den Treffern (und bei needs_rest den übrigen Einträgen)"""
+
+
+class FlatProjection(Projection):
+    """Liste der URLs"""
+
+    def collect(self, matched, rest, query) -> List[str]:
+        return [link.url for link in matched]
+
+
+class MetadataProjection(Projection):
+    """Export-Datensätze mit 'url', 'makler', 'makler_names', 'scraped_at' und 'details'"""
+
+    def collect(self, matched, rest, query) -> List[Dict]:
+        return list(self.iter_rows(matched))
+
+    @staticmethod
+    def iter_rows(matched: Iterable[LinkRecord]) -> Iterator[Dict]:
+        """Erzeugt die Datensätze einzeln (für gestreamte Exporte ohne Liste aller Zeilen)"""
+        names_table = makler_table()
+        # Namen und ISO-Zeitstempel nur einmal pro vorkommender Kombination bzw. Zeitstempel;
+        # Zeilen mit denselben Maklern teilen sich die Namensliste (Export liest nur)
+        labels: Dict[Tuple[int, ...], Tuple[List[str], str]] = {}
+        scraped_at: Dict[object, str] = {}
+        for link in matched:
+            # Export enthält immer alle Makler des Links, nicht nur die gefilterten
+            makler = link.makler
+            label = labels.get(makler)
+            if label is None:
+                names = [names_table[m] for m in makler]
+                label = labels[makler] = (names, ', '.join(names))
+            timestamp = link.timestamp
+            iso = scraped_at.get(timestamp)
+            if iso is None:
+                iso = scraped_at[timestamp] = decode_timestamp(timestamp) or ''
+            yield {
+                'url': link.url,
+                'makler': label[1],
+                'makler_names': label[0],
+                'scraped_at': iso,
+                'details': link.details
+            }
+
+
+class LinkDicts(dict):
+    """
+    Dict-Form eines Bestands-Tupels: id(LinkRecord) -> Eintrag im Format von links.json
+
+    Merkt sich zusätzlich die ungefilterte Gruppierung des ganzen Bestands (grouped), die
+    dann für alle folgenden ungefilterten Abfragen auf demselben Stand gilt. Einträge und
+    Gruppen werden geteilt und dürfen nicht verändert werden.
+    """
+
+    def __init__(self, links: Tuple[LinkRecord, ...]):
+        super().__init__()
+        self.links = links
+        self.grouped: Optional[Dict[str, List[Dict]]] = None
+
+
+class GroupedProjection(Projection):
+    """
+    Links nach Makler gruppiert (nur die gefilterten Makler); ohne Makler unter 'Sonstige'
+
+    Args:
+        rows: Dict-Form der Einträge (optional, z.B. KleinanzeigenScraper.get_link_dicts;
+            sonst pro Abfrage erzeugt)
+        complete: Die Kandidaten sind rows.links in Bestandsreihenfolge - ohne Filter wird
+            dann die in rows gemerkte Gruppierung verwendet
+    """
+
+    def __init__(self, rows: Optional[LinkDicts] = None, complete: bool = False):
+        self.rows = rows
+        self.complete = complete
+
+    def collect(self, matched, rest, query) -> Dict[str, List[Dict]]:
+        rows = self.rows
+        if self.complete and rows is not None and not query.stages:
+            grouped = rows.grouped
+            if grouped is None:
+                grouped = rows.grouped = self._group(matched, query)
+            return grouped
+        return self._group(matched, query)
+
+    def _group(self, matched: List[LinkRecord], query: LinkQuery) -> Dict[str, List[Dict]]:
+        groups: Dict[str, List[Dict]] = {}
+        filtered = query.makler_ids is not None
+        names_table = makler_table()
+        # Ziel-Gruppen (deren append) pro vorkommender Makler-Kombination nur einmal bestimmen;
+        # die meisten Links haben genau einen Makler und landen direkt in einer Gruppe
+        targets: Dict[Tuple[int, ...], object] = {}
+        # Antwort im Format von links.json
+        rows = self.rows
+        dicts = map(rows.__getitem__, map(id, matched)) if rows is not None else records_to_dicts(matched)
+        for link, data in zip(matched, dicts):
+            target = targets.get(link.makler)
+            if target is None:
+                target = targets[link.makler] = self._target(groups, link.makler, query if filtered else None, names_table)
+            if target.__class__ is tuple:
+                for append in target:
+                    append(data)
+            else:
+                target(data)
+        return groups
+
+    @staticmethod
+    def _target(groups: Dict[str, List[Dict]], makler: Tuple[int, ...], query: Optional[LinkQuery], names_table: List[str]):
+        """append der Gruppe(n) einer Makler-Kombination - einzeln oder als Tupel"""
+        if query is not None:
+            names = [names_table[m] for m in query.matching_makler(makler)]
+        else:
+            names = [names_table[m] for m in makler] or [NO_MAKLER]
+        appends = tuple(groups.setdefault(name, []).append for name in names)
+        return appends[0] if len(appends) == 1 else appends
+
+
+class PartitionProjection(Projection):
+    """Teilt den Bestand in (Treffer, Rest) auf - für das Löschen"""
+
+    needs_rest = True
+
+    def collect(self, matched, rest, query) -> Tuple[List, List]:
+        return matched, rest
+
+
+def run_query(links: List[LinkRecord], query: LinkQuery, projection: Projection):
+    """Wertet die Abfrage aus; die Projektion erhält Treffer (und ggf. den Rest) als Listen"""
+    matched = query.filter(links)
+    rest = None
+    if projection.needs_rest:
+        matched_ids = {id(link) for link in matched}
+        rest = [link for link in links if id(link) not in matched_ids]
+    return projection.collect(matched, rest, query)
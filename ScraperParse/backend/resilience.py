@@ -0,0 +1,226 @@
+"""
+Wiederholungen und Circuit Breaker für Seitenabrufe
+- RetryPolicy: Wiederholt idempotente GETs bei Verbindungsfehlern, Timeouts, 5xx und 429 mit
+  exponentiellem Backoff und Jitter ("full jitter": zufällige Wartezeit bis zur Obergrenze)
+- HostCircuitBreaker: Zählt Erfolge/Fehler je Host über die letzten Anfragen. Steigt die
+  Fehlerquote über den Schwellwert, wird der Host für cooldown Sekunden gesperrt; alle Worker
+  warten dann, statt den Host weiter zu belasten. Danach geht eine einzelne Probeanfrage
+  durch - bei Erfolg ist der Host wieder frei, sonst folgt die nächste Sperre.
+- fetch_with_retry: Gemeinsamer Ablauf für Such- und Detailseiten (Breaker abwarten, laden,
+  Ergebnis melden, ggf. nach Backoff wiederholen)
+
+Konfiguration über Umgebungsvariablen (siehe from_env).
+"""
+import os
+import random
+import time
+import threading
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Zustände des Circuit Breakers
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+def _status_code(error: requests.exceptions.RequestException) -> Optional[int]:
+    return error.response.status_code if error.response is not None else None
+
+
+def is_transient(error: requests.exceptions.RequestException) -> bool:
+    """Fehler, bei denen sich eine Wiederholung lohnt (und die gegen den Host zählen)"""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+class RetryPolicy:
+    """Anzahl Wiederholungen und Backoff-Parameter"""
+
+    def __init__(self, retries: int = 3, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.retries = max(0, int(retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """SCRAPER_RETRIES (Standard 3), SCRAPER_BACKOFF_BASE (0.5 s), SCRAPER_BACKOFF_MAX (10 s)"""
+        return cls(
+            retries=int(os.environ.get('SCRAPER_RETRIES', '3')),
+            base_delay=float(os.environ.get('SCRAPER_BACKOFF_BASE', '0.5')),
+            max_delay=float(os.environ.get('SCRAPER_BACKOFF_MAX', '10'))
+        )
+
+    def should_retry(self, error: requests.exceptions.RequestException, attempt: int) -> bool:
+        """attempt = Anzahl bereits gescheiterter Versuche"""
+        return attempt <= self.retries and is_transient(error)
+
+    def delay(self, attempt: int, error: Optional[requests.exceptions.RequestException] = None) -> float:
+        """Wartezeit vor dem nächsten Versuch; ein Retry-After-Header (Sekunden) gilt als Untergrenze"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if error is not None and error.response is not None:
+            retry_after = error.response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+
+class _HostState:
+    def __init__(self, window: int):
+        self.outcomes = deque(maxlen=window)
+        self.state = STATE_CLOSED
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+
+
+class HostCircuitBreaker:
+    """
+    Circuit Breaker je Host
+
+    Args:
+        window: Anzahl der letzten Anfragen, über die die Fehlerquote berechnet wird
+        min_requests: Mindestanzahl Anfragen im Fenster, bevor gesperrt werden kann
+        error_rate: Fehlerquote (0-1), ab der der Host gesperrt wird
+        cooldown: Sperrdauer in Sekunden
+    """
+
+    def __init__(self, window: int = 20, min_requests: int = 10, error_rate: float = 0.5, cooldown: float = 30.0):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._hosts: Dict[str, _HostState] = {}
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> "HostCircuitBreaker":
+        """SCRAPER_BREAKER_ERROR_RATE (Standard 0.5, 0 = aus), SCRAPER_BREAKER_COOLDOWN (30 s)"""
+        return cls(
+            error_rate=float(os.environ.get('SCRAPER_BREAKER_ERROR_RATE', '0.5')),
+            cooldown=float(os.environ.get('SCRAPER_BREAKER_COOLDOWN', '30'))
+        )
+
+    def _host(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.window)
+        return state
+
+    def wait(self, host: str) -> float:
+        """
+        Blockiert, solange der Host gesperrt ist; im halboffenen Zustand darf nur eine
+        Probeanfrage gleichzeitig laufen
+
+        Returns:
+            True, wenn die folgende Anfrage die Probeanfrage ist (an record weitergeben)
+        """
+        with self._cond:
+            state = self._host(host)
+            while True:
+                now = time.monotonic()
+                if state.state == STATE_CLOSED:
+                    return False
+                if state.state == STATE_OPEN and now >= state.open_until:
+                    state.state = STATE_HALF_OPEN
+                if state.state == STATE_HALF_OPEN and not state.probe_in_flight:
+                    state.probe_in_flight = True
+                    return True
+                timeout = state.open_until - now if state.state == STATE_OPEN else None
+                self._cond.wait(timeout)
+
+    def record(self, host: str, success: bool, probe: bool = False):
+        """
+        Ergebnis einer Anfrage; öffnet oder schließt den Breaker
+
+        Nur das Ergebnis der Probeanfrage (probe = Rückgabe von wait) entscheidet im
+        halboffenen Zustand - verspätete Anfragen von vor dem Sperren zählen dort nur im Fenster.
+        """
+        if not self.error_rate:
+            return
+        with self._cond:
+            state = self._host(host)
+            if probe and state.state == STATE_HALF_OPEN and state.probe_in_flight:
+                state.probe_in_flight = False
+                if success:
+                    state.state = STATE_CLOSED
+                    state.outcomes.clear()
+                    logger.info(f"Circuit Breaker für {host} wieder geschlossen")
+                else:
+                    self._trip(host, state)
+                self._cond.notify_all()
+                return
+            state.outcomes.append(success)
+            failures = state.outcomes.count(False)
+            if (state.state == STATE_CLOSED and len(state.outcomes) >= self.min_requests
+                    and failures / len(state.outcomes) >= self.error_rate):
+                self._trip(host, state)
+                self._cond.notify_all()
+
+    def _trip(self, host: str, state: _HostState):
+        state.state = STATE_OPEN
+        state.open_until = time.monotonic() + self.cooldown
+        state.trips += 1
+        logger.warning(f"Circuit Breaker für {host} geöffnet - alle Worker pausieren {self.cooldown:.0f}s")
+
+    def status(self) -> Dict[str, Dict]:
+        """Zustand je Host (für Monitoring)"""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                host: {
+                    'state': state.state,
+                    'error_rate': round(state.outcomes.count(False) / len(state.outcomes), 3) if state.outcomes else None,
+                    'open_for_s': round(max(0.0, state.open_until - now), 1) if state.state == STATE_OPEN else 0.0,
+                    'trips': state.trips
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+def fetch_with_retry(fetch_once: Callable[[], T], url: str, host: str, retry: RetryPolicy, breaker: HostCircuitBreaker,
+                     attempts: Optional[List[int]] = None) -> T:
+    """
+    Lädt eine Seite mit Wiederholungen bei vorübergehenden Fehlern
+
+    Args:
+        fetch_once: Ein Ladeversuch (idempotenter GET auf url)
+        url: Geladene URL (für das Log)
+        host: Host für den Circuit Breaker
+        retry: Wiederholungen und Backoff
+        breaker: Circuit Breaker
+        attempts: Optional [0]; attempts[0] zählt die Versuche
+
+    Returns:
+        Ergebnis von fetch_once; nach dem letzten gescheiterten Versuch wird dessen Fehler ausgelöst
+    """
+    attempts = attempts if attempts is not None else [0]
+    while True:
+        attempts[0] += 1
+        # Wartet, solange der Circuit Breaker den Host sperrt (ohne Slot im Egress-Pool)
+        probe = breaker.wait(host)
+        try:
+            result = fetch_once()
+        except requests.exceptions.RequestException as e:
+            breaker.record(host, not is_transient(e), probe)
+            if not retry.should_retry(e, attempts[0]):
+                raise
+            delay = retry.delay(attempts[0], e)
+            logger.warning(f"Fehler beim Laden von {url}: {e} - Versuch {attempts[0] + 1}/{retry.retries + 1} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            breaker.record(host, False, probe)
+            raise
+        breaker.record(host, True, probe)
+        return result
@@ -0,0 +1,124 @@
+"""
+Ergebnis-Cache für Exporte und gruppierte Abfragen
+Fertig gerenderte Antworten (CSV, Parquet, JSON) werden unter (Endpoint, normalisierte
+Filter, Bestandsversion) abgelegt. Ändert sich der Bestand (Crawl, Löschen, Anreicherung),
+ändert sich die Version. Anfragen auf einem älteren, noch gehaltenen Snapshot (z.B. während
+eines Crawls) finden ihre Einträge weiterhin, statt den Cache zu leeren; gehalten werden die
+Einträge der max_versions zuletzt neu aufgetauchten Versionen. Der Speicher ist per LRU auf
+eine Gesamtgröße in Bytes begrenzt.
+"""
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: Any) -> Hashable:
+    """Filterwerte vergleichbar machen: Listen ohne Reihenfolge/Duplikate, Strings ohne Leerraum"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted({_normalize(item) for item in value}, key=str))
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def make_key(endpoint: str, params: Dict[str, Any]) -> Tuple:
+    """Schlüssel aus Endpoint und Filtern; nicht gesetzte Filter (None, '', []) zählen nicht"""
+    normalized = tuple(sorted(
+        (name, _normalize(value)) for name, value in params.items()
+        if value is not None and value != '' and value != [] and value is not False
+    ))
+    return (endpoint, normalized)
+
+
+class ResultCache:
+    """LRU-Cache für gerenderte Antworten (bytes), begrenzt auf max_bytes, max_entries und max_versions"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 256, max_versions: int = 4):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_versions = max_versions
+        # (Version, Endpoint, Filter) -> Inhalt
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Bekannte Versionen in der Reihenfolge ihres ersten Auftretens
+        self._versions: "OrderedDict[Hashable, None]" = OrderedDict()
+        # Bereits verworfene Versionen: werden nur noch berechnet, nicht mehr gecacht
+        self._retired: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Hashable):
+        """
+        Merkt sich eine neu aufgetauchte Bestandsversion und verwirft die Einträge der ältesten
+        über max_versions; bekannte (auch ältere) Versionen ändern nichts (Aufrufer hält _lock)
+        """
+        if version in self._versions or version in self._retired:
+            return
+        self._versions[version] = None
+        while len(self._versions) > self.max_versions:
+            dropped, _ = self._versions.popitem(last=False)
+            self._retired[dropped] = None
+            if len(self._retired) > 64:
+                self._retired.popitem(last=False)
+            stale = [key for key in self._entries if key[0] == dropped]
+            if stale:
+                self.invalidations += 1
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key))
+
+    def get_or_compute(self, endpoint: str, params: Dict[str, Any], version: Hashable, compute: Callable[[], bytes]) -> bytes:
+        """
+        Gibt das gecachte Ergebnis zurück oder berechnet und speichert es
+
+        Args:
+            endpoint: Name des Endpoints (Teil des Schlüssels)
+            params: Filter- und Formatparameter (werden normalisiert)
+            version: Aktuelle Bestandsversion
+            compute: Erzeugt das Ergebnis bei einem Fehlschlag
+        """
+        key = (version,) + make_key(endpoint, params)
+        with self._lock:
+            self._check_version(version)
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+
+        content = compute()
+
+        with self._lock:
+            # Version inzwischen verworfen - veraltetes Ergebnis nicht speichern
+            if version not in self._versions or len(content) > self.max_bytes or key in self._entries:
+                return content
+            self._entries[key] = content
+            self._bytes += len(content)
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+        return content
+
+    def stats(self) -> Dict:
+        """Kennzahlen für das Monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'versions': len(self._versions)
+            }
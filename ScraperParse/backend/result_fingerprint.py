@@ -0,0 +1,172 @@
+"""
+Fingerabdrücke von Suchergebnissen
+Viele Such-URLs liefern von Lauf zu Lauf genau dieselbe erste Seite. Der Fingerabdruck einer
+Suche ist ein Hash über die Anzeigen-IDs auf Seite 1 in ihrer Reihenfolge plus die Seitenzahl.
+Stimmt er mit dem des letzten vollständigen Crawls überein, lädt scrape_search_string keine
+weiteren Seiten und die Such-URL wird nicht zusammengeführt (Abbruchgrund 'unchanged').
+
+Damit ein falscher Treffer (z.B. eine geänderte Anzeige weiter hinten bei gleicher erster Seite)
+nicht dauerhaft übersehen wird, wird jede Such-URL spätestens nach
+SCRAPER_FULL_RECRAWL_HOURS Stunden (Standard 24) wieder vollständig gecrawlt. Ebenso bei neuer
+Makler-Zuordnung oder höherem max_pages. SCRAPER_SKIP_UNCHANGED=0 schaltet das Überspringen ab.
+Werden Links gelöscht, verlieren ihre Such-URLs (bei Links ohne Such-URL bzw. beim Leeren des
+Bestands alle) den Fingerabdruck, damit die Links beim nächsten Crawl wieder gefunden werden.
+
+Gespeichert wird in search_fingerprints.json (nur im Koordinator, unter der Crawl-Sperre;
+invalidate auch vom Schreib-Thread).
+"""
+import hashlib
+import os
+import re
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from store import atomic_write_json, read_json
+
+logger = logging.getLogger(__name__)
+
+# Ergebnis der Prüfung je Such-URL (UrlReport.fingerprint_status)
+FINGERPRINT_UNCHANGED = 'unchanged'  # Seite 1 wie beim letzten Mal - übersprungen
+FINGERPRINT_CHANGED = 'changed'      # Seite 1 anders - vollständig gecrawlt
+FINGERPRINT_FORCED = 'forced'        # Periodischer vollständiger Crawl fällig
+FINGERPRINT_NEW = 'new'              # Kein vergleichbarer Fingerabdruck (neue Zuordnung, max_pages erhöht)
+FINGERPRINT_OFF = 'off'              # Überspringen abgeschaltet
+
+# Anzeigen-Links: /s-anzeige/<titel>/<anzeigen-id>-<kategorie>-<ort>
+_AD_LINK = re.compile(r'/s-anzeige/[^"\'\s<>?#]*/(\d+)-\d+-\d+')
+
+
+def ad_id(url: str) -> Optional[str]:
+    match = _AD_LINK.search(url)
+    return match.group(1) if match else None
+
+
+def ordered_ad_ids(html_content: str, page_links: Iterable[str]) -> List[str]:
+    """
+    Anzeigen-IDs der Ergebnisliste in Seitenreihenfolge
+
+    page_links (aus extract_listing_links_from_page, ungeordnet) legt fest, welche Anzeigen
+    zählen; die Reihenfolge ergibt sich aus dem ersten Vorkommen im HTML.
+    """
+    wanted = {ad_id(link) for link in page_links} - {None}
+    ordered = []
+    for match in _AD_LINK.finditer(html_content):
+        found = match.group(1)
+        if found in wanted:
+            ordered.append(found)
+            wanted.discard(found)
+    # Nicht im HTML wiedergefunden (z.B. anders kodiert): sortiert anhängen
+    return ordered + sorted(wanted)
+
+
+def result_fingerprint(ad_ids: List[str], page_count: Optional[int]) -> str:
+    payload = f"{page_count if page_count is not None else '-'}|{','.join(ad_ids)}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class FingerprintStore:
+    """
+    Letzter Fingerabdruck je Such-URL mit Zeitpunkt des letzten vollständigen Crawls
+
+    Args:
+        path: JSON-Datei
+        full_recrawl_hours: Spätestens nach so vielen Stunden wird vollständig gecrawlt
+        enabled: False = nie überspringen (Fingerabdrücke werden trotzdem gespeichert)
+    """
+
+    def __init__(self, path: str = "search_fingerprints.json", full_recrawl_hours: float = 24.0, enabled: bool = True):
+        self.path = path
+        self.full_recrawl_seconds = full_recrawl_hours * 3600
+        self.enabled = enabled
+        # (Makler, Such-URL) -> {'fingerprint', 'max_pages', 'full_crawl_at', 'checked_at', 'skips'}
+        self._entries: Dict[str, Dict] = {}
+
+    @classmethod
+    def from_env(cls, path: str = "search_fingerprints.json") -> "FingerprintStore":
+        return cls(
+            path,
+            full_recrawl_hours=float(os.environ.get("SCRAPER_FULL_RECRAWL_HOURS", "24")),
+            enabled=os.environ.get("SCRAPER_SKIP_UNCHANGED", "1") != "0"
+        )
+
+    @staticmethod
+    def _key(search_url: str, makler: Optional[str]) -> str:
+        # Eine Such-URL kann mehreren Maklern gehören; jede Zuordnung wird getrennt verglichen
+        return f"{makler}\t{search_url}" if makler else search_url
+
+    def load(self):
+        """Liest die Datei (zu Beginn jedes Crawls - ein anderer Prozess kann inzwischen gecrawlt haben)"""
+        try:
+            self._entries = read_json(self.path, {}).get('searches', {}) if os.path.exists(self.path) else {}
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der Fingerabdrücke: {e}")
+            self._entries = {}
+
+    def save(self):
+        try:
+            atomic_write_json(self.path, {'searches': self._entries}, indent=None)
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Fingerabdrücke: {e}")
+
+    def expected(self, search_url: str, makler: Optional[str], max_pages: int, now: float = None) -> Tuple[Optional[str], str]:
+        """
+        Fingerabdruck, bei dessen Übereinstimmung die Such-URL übersprungen werden darf
+
+        Returns:
+            (Fingerabdruck oder None, Status falls vollständig gecrawlt wird: FINGERPRINT_CHANGED,
+            FINGERPRINT_FORCED, FINGERPRINT_NEW oder FINGERPRINT_OFF)
+        """
+        if not self.enabled:
+            return None, FINGERPRINT_OFF
+        entry = self._entries.get(self._key(search_url, makler))
+        if not entry or entry.get('max_pages', 0) < max_pages:
+            return None, FINGERPRINT_NEW
+        now = time.time() if now is None else now
+        if now - entry.get('full_crawl_at', 0) >= self.full_recrawl_seconds:
+            return None, FINGERPRINT_FORCED
+        return entry['fingerprint'], FINGERPRINT_CHANGED
+
+    def record(self, search_url: str, makler: Optional[str], max_pages: int, fingerprint: str, skipped: bool, now: float = None):
+        """Übernimmt das Ergebnis einer vollständig gecrawlten oder übersprungenen Such-URL"""
+        now = time.time() if now is None else now
+        key = self._key(search_url, makler)
+        entry = self._entries.get(key)
+        if skipped and entry:
+            entry['checked_at'] = now
+            entry['skips'] = entry.get('skips', 0) + 1
+            return
+        self._entries[key] = {
+            'fingerprint': fingerprint,
+            'max_pages': max_pages,
+            'full_crawl_at': now,
+            'checked_at': now,
+            'skips': 0
+        }
+
+    def invalidate(self, search_urls: Optional[Set[str]] = None):
+        """
+        Verwirft Fingerabdrücke, damit die Such-URLs beim nächsten Crawl vollständig gecrawlt
+        werden (nach dem Löschen von Links; bei unveränderter Seite 1 kämen sie sonst erst mit
+        dem periodischen vollständigen Crawl zurück)
+
+        Args:
+            search_urls: Betroffene Such-URLs aller Makler (None = alle Fingerabdrücke)
+        """
+        def affected(key: str) -> bool:
+            return search_urls is None or key.rsplit('\t', 1)[-1] in search_urls
+
+        # Ein laufender Crawl hält seine Einträge im Speicher und speichert sie am Ende
+        for key in [key for key in list(self._entries) if affected(key)]:
+            self._entries.pop(key, None)
+        try:
+            entries = read_json(self.path, {}).get('searches', {}) if os.path.exists(self.path) else {}
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der Fingerabdrücke: {e}")
+            return
+        kept = {key: entry for key, entry in entries.items() if not affected(key)}
+        if len(kept) != len(entries):
+            try:
+                atomic_write_json(self.path, {'searches': kept}, indent=None)
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern der Fingerabdrücke: {e}")
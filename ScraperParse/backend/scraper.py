@@ -1,46 +1,129 @@
 import requests
 from bs4 import BeautifulSoup
-import json
 import os
 import re
 import time
+import threading
 from datetime import datetime
 from urllib.parse import urljoin, urlparse, parse_qs
-from typing import List, Set, Dict
+from typing import Iterator, List, Optional, Set, Dict, Tuple
 import logging
 import csv
 from io import StringIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import Counter
+from contextlib import closing
+from store import FileLock, file_signature, read_json, atomic_write_json
+from snapshot import load_snapshot, write_snapshot
+from crawl_queue import WriteQueue, CrawlCoalescer
+from egress import EgressPool, SessionCache, DEFAULT_HEADERS, route_failure
+from enrichment import ListingEnricher, DETAIL_FIELDS
+from streaming import StreamStats, fetch_result_page
+from resilience import RetryPolicy, HostCircuitBreaker, fetch_with_retry
+from lease_queue import LeaseQueue
+from fair_scheduler import FairScheduler, MaklerSchedule
+import profiling
+from analytics import LinkColumns, compute_stats
+from link_record import LinkRecord, records_from_dicts, records_to_dicts, encode_timestamp, makler_ids, share
+from link_snapshot import LinkSnapshot
+from query import LinkQuery, LinkDicts, run_query, FlatProjection, MetadataProjection, GroupedProjection, PartitionProjection
+from changelog import ChangeLog, OP_ADD, OP_UPDATE, OP_REMOVE
+from events import EventBroker, EVENT_CRAWL_STARTED, EVENT_PROGRESS, EVENT_LINKS, EVENT_MAKLER_FINISHED, EVENT_CRAWL_FINISHED
+from crawl_runs import CrawlRunStore
+from crawl_report import CrawlReport, CrawlReportStore, UrlReport, STOP_EMPTY_PAGE, STOP_ERROR, STOP_MAX_PAGES, STOP_LAST_PAGE, STOP_INVALID_URL, STOP_UNCHANGED
+from result_fingerprint import FingerprintStore, ordered_ad_ids, result_fingerprint, FINGERPRINT_UNCHANGED
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Trefferzahl über der Ergebnisliste, z.B. "1 - 25 von 1.234 Ergebnissen"
+RESULT_SUMMARY_PATTERN = re.compile(r'(\d+)\s*-\s*(\d+)\s+von\s+([\d.]+)\s+(?:Ergebnis|Anzeige)', re.IGNORECASE)
+# Seitenzahlen in der Navigation unter der Ergebnisliste
+PAGINATION_PAGE_PATTERN = re.compile(r'class="[^"]*pagination-(?:page|current)[^"]*"[^>]*>\s*(\d+)\s*<')
+
 class KleinanzeigenScraper:
-    def __init__(self, blacklist_file="blacklist.json", links_file="links.json"):
+    # Mindestabstand in Sekunden zwischen zwei Übernahmen neuer Links während eines Crawls
+    MERGE_INTERVAL = 2.0
+    # Verteilter Crawl: Abfrageintervall für Ergebnisse und Höchstdauer eines Laufs in Sekunden
+    DISPATCH_POLL_INTERVAL = 0.5
+    DISPATCH_TIMEOUT = 1800.0
+    
+    def __init__(self, blacklist_file="blacklist.json", links_file="links.json", last_search_file="last_search.json", egress_config=None, details_cache_file="details_cache.json", streaming=False, reports_dir="crawl_reports", changes_file="link_changes.json", lazy=False, retry: RetryPolicy = None, breaker: HostCircuitBreaker = None, crawl_queue: LeaseQueue = None,
+                 fingerprints_file="search_fingerprints.json", runs_dir="crawl_runs"):
         self.blacklist_file = blacklist_file
         self.links_file = links_file
+        self.last_search_file = last_search_file
         self.base_url = "https://www.kleinanzeigen.de"
-        self.blacklist: Set[str] = self.load_blacklist()
-        self.links: List[Dict[str, str]] = self.load_links()  # Liste von Dicts mit 'url' und 'scraped_at'
-        self.last_scraping_links: List[str] = []  # Links der letzten Suche
+        # Prozessübergreifende Sperren (mehrere uvicorn-Worker teilen sich die Dateien):
+        # - Zustands-Sperre für jede Änderung an Links, Blacklist und letzter Suche
+        # - Crawl-Sperre, damit immer nur ein Crawl gleichzeitig schreibt
+        self._state_lock = FileLock(links_file + '.lock')
+        self._crawl_lock = FileLock(links_file + '.crawl.lock')
+        # Datei -> Signatur beim letzten Laden/Speichern (für Änderungserkennung)
+        self._signatures: Dict[str, tuple] = {}
+        # Alle Änderungen laufen über einen einzigen Schreib-Thread; gleichzeitige Suchen
+        # mit denselben Such-URLs hängen sich an den laufenden Crawl an
+        self._writer = WriteQueue()
+        self._coalescer = CrawlCoalescer()
+        # Verhindert, dass neu geladen wird, während der Schreib-Thread den Bestand ändert;
+        # Leser warten nie darauf, sondern arbeiten auf dem zuletzt veröffentlichten Snapshot
+        self._state_guard = threading.RLock()
+        # Versionen und Änderungsprotokoll für /links/changes (Version steht auch in links.json)
+        self.changes = ChangeLog(changes_file)
+        self._stored_version = 0
+        # Letzte Suche und Crawl-Lauf enthalten zurückgestellte Schübe, die noch nicht gespeichert sind
+        self._unsaved_search = False
+        self.blacklist: Set[str] = set()
+        # Bestand und letzte Suche als unveränderlicher Stand (link_snapshot.py); wird bei jeder
+        # Änderung als Ganzes ersetzt
+        self._snapshot = LinkSnapshot()
+        self._loaded = False
+        # Neue Links je Crawl-Lauf (crawl_runs.py), Grundlage der letzten Suche und von /export/last?run_id=
+        self.runs = CrawlRunStore(runs_dir)
+        # lazy=True: Dateien werden erst beim ersten Zugriff (refresh_state) geladen
+        if not lazy:
+            self.refresh_state()
         # Session wird pro Thread erstellt (thread-safe)
-        self._default_headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        self._default_headers = dict(DEFAULT_HEADERS)
+        # Pool von Ausgangswegen (Proxy + Header-Profil) mit eigenem Budget je Route
+        self.egress = EgressPool.from_file(egress_config)
+        # Streaming-Modus: Download endet nach der primären Ergebnisliste
+        self.streaming = streaming
+        # Wiederholungen bei vorübergehenden Fehlern und Sperre überlasteter Hosts für alle Worker
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else HostCircuitBreaker()
+        # Optionale Anreicherung neuer Links mit Daten aus der Detailseite (gleiche Wiederholungen und Breaker)
+        self.enricher = ListingEnricher(self.egress, cache_file=details_cache_file, retry=self.retry, breaker=self.breaker)
+        # Optional: Such-URLs über eine gemeinsame Auftragswarteschlange an Worker-Prozesse verteilen
+        self.crawl_queue = crawl_queue
+        # Fingerabdruck von Seite 1 je Such-URL: unveränderte Suchen werden übersprungen
+        self.fingerprints = FingerprintStore.from_env(fingerprints_file)
+        self.last_stream_stats: Dict = {}
+        # Strukturierte Berichte pro Crawl-Lauf (/crawls/{run_id})
+        self.crawl_reports = CrawlReportStore(reports_dir)
+        # Live-Ereignisse (neue Links, Fortschritt) für /events
+        self.events = EventBroker()
+        # Spaltenform des Bestands für /stats als (Links-Tupel, Spalten), gültig für dieses Tupel
+        self._columns = None
+        # Dict-Form des Bestands für /links/grouped als (Links-Tupel, id(LinkRecord) -> Dict)
+        self._link_dicts = None
     
-    def _create_session(self):
-        """Erstellt eine neue Session für Thread-sichere Verwendung"""
+    def _create_session(self, route=None):
+        """Erstellt eine neue Session für Thread-sichere Verwendung (optional über eine Egress-Route)"""
+        if route is not None:
+            return route.create_session()
         session = requests.Session()
         session.headers.update(self._default_headers)
         return session
     
     def load_blacklist(self) -> Set[str]:
         """Lädt die Blacklist aus einer JSON-Datei"""
+        signature = file_signature(self.blacklist_file)
+        self._signatures[self.blacklist_file] = signature
         if os.path.exists(self.blacklist_file):
             try:
-                with open(self.blacklist_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return set(data.get('blacklist', []))
+                data = self._read_with_snapshot(self.blacklist_file, signature)
+                return set(data.get('blacklist', []))
             except Exception as e:
                 logger.error(f"Fehler beim Laden der Blacklist: {e}")
                 return set()
@@ -49,37 +132,200 @@ class KleinanzeigenScraper:
     def save_blacklist(self):
         """Speichert die Blacklist in eine JSON-Datei"""
         try:
-            with open(self.blacklist_file, 'w', encoding='utf-8') as f:
-                json.dump({'blacklist': list(self.blacklist)}, f, indent=2, ensure_ascii=False)
+            data = {'blacklist': list(self.blacklist)}
+            atomic_write_json(self.blacklist_file, data)
+            self._signatures[self.blacklist_file] = file_signature(self.blacklist_file)
+            write_snapshot(self.blacklist_file, data, self._signatures[self.blacklist_file])
         except Exception as e:
             logger.error(f"Fehler beim Speichern der Blacklist: {e}")
     
-    def load_links(self) -> List[Dict[str, str]]:
-        """Lädt die gesammelten Links aus einer JSON-Datei (mit Timestamps)"""
+    def load_last_scraping_links(self) -> Tuple[List[str], Optional[str]]:
+        """
+        Lädt die Links der letzten Suche aus einer JSON-Datei
+        
+        Fehlt die Datei, gilt der neueste gespeicherte Crawl-Lauf als letzte Suche.
+        
+        Returns:
+            (Links, ID des Crawl-Laufs oder None)
+        """
+        signature = file_signature(self.last_search_file)
+        self._signatures[self.last_search_file] = signature
+        if signature is None:
+            run_id = self.runs.latest()
+            return (list(self.runs.links(run_id) or []), run_id) if run_id else ([], None)
+        try:
+            data = read_json(self.last_search_file, {})
+            return data.get('links', []), data.get('run_id')
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der letzten Suche: {e}")
+            return [], None
+    
+    def save_last_scraping_links(self, last_search: List[str], run_id: Optional[str] = None):
+        """Speichert die Links der letzten Suche (und ihren Crawl-Lauf) in eine JSON-Datei"""
+        try:
+            atomic_write_json(self.last_search_file, {'run_id': run_id, 'links': list(last_search)})
+            self._signatures[self.last_search_file] = file_signature(self.last_search_file)
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der letzten Suche: {e}")
+    
+    def load_links(self) -> List[LinkRecord]:
+        """Lädt die gesammelten Links aus einer JSON-Datei (mit Timestamps) als kompakte Einträge"""
+        signature = file_signature(self.links_file)
+        self._signatures[self.links_file] = signature
+        self._stored_version = 0
         if os.path.exists(self.links_file):
             try:
-                with open(self.links_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    links = data.get('links', [])
-                    # Migration: Wenn Links noch Strings sind, konvertiere sie
-                    if links and isinstance(links[0], str):
-                        # Alte Struktur: Liste von Strings
-                        timestamp = datetime.now().isoformat()
-                        return [{'url': link, 'scraped_at': timestamp} for link in links]
-                    # Neue Struktur: Liste von Dicts
-                    return links
+                data = self._read_with_snapshot(self.links_file, signature)
+                self._stored_version = data.get('version', 0)
+                links = data.get('links', [])
+                # Migration: Wenn Links noch Strings sind, konvertiere sie
+                if links and isinstance(links[0], str):
+                    # Alte Struktur: Liste von Strings
+                    timestamp = encode_timestamp(datetime.now().isoformat())
+                    return [LinkRecord(link, timestamp) for link in links]
+                # Neue Struktur: Liste von Dicts
+                return records_from_dicts(links)
             except Exception as e:
                 logger.error(f"Fehler beim Laden der Links: {e}")
                 return []
         return []
     
-    def save_links(self):
-        """Speichert die gesammelten Links in eine JSON-Datei"""
+    def save_links(self, links: List[LinkRecord], defer: bool = False) -> bool:
+        """
+        Speichert die gesammelten Links in eine JSON-Datei
+        
+        defer=True (Schübe eines laufenden Crawls): Nur das Änderungsprotokoll wird angehängt,
+        links.json und ihr Snapshot werden erst beim nächsten vollständigen Speichern neu
+        geschrieben. Bis dahin trägt refresh_state die Schübe aus dem Protokoll nach - in anderen
+        Prozessen und nach einem Abbruch. Damit das begrenzte Protokoll sie sicher noch enthält,
+        wird spätestens nach max_entries / 2 Änderungen doch vollständig gespeichert.
+        
+        Returns:
+            True, wenn nur das Protokoll gespeichert wurde
+        """
+        if defer and self.changes.version - self._stored_version < self.changes.max_entries // 2:
+            self.changes.save()
+            return True
         try:
-            with open(self.links_file, 'w', encoding='utf-8') as f:
-                json.dump({'links': self.links}, f, indent=2, ensure_ascii=False)
+            data = {'version': self.changes.version, 'links': records_to_dicts(links)}
+            atomic_write_json(self.links_file, data)
+            self._signatures[self.links_file] = file_signature(self.links_file)
+            self._stored_version = self.changes.version
+            write_snapshot(self.links_file, data, self._signatures[self.links_file])
+            # Erst nach links.json - bei Abbruch dazwischen verwirft align() das Protokoll
+            self.changes.save()
         except Exception as e:
             logger.error(f"Fehler beim Speichern der Links: {e}")
+        return False
+    
+    def _read_with_snapshot(self, path: str, signature: tuple) -> Dict:
+        """
+        Liest eine JSON-Datei bevorzugt aus ihrem binären Snapshot
+        
+        Fehlt der Snapshot oder passt er nicht mehr zur Datei (z.B. von Hand bearbeitet),
+        wird das JSON geparst und der Snapshot neu geschrieben.
+        """
+        data = load_snapshot(path, signature)
+        if data is None:
+            data = read_json(path, {})
+            write_snapshot(path, data, signature)
+        return data
+    
+    def refresh_state(self):
+        """
+        Lädt Links, Blacklist und letzte Suche neu, falls ein anderer Prozess sie geändert hat
+        
+        Unveränderte Dateien werden nicht erneut geparst.
+        """
+        with self._state_guard:
+            self.changes.refresh()
+            links, last_search, last_run_id = self._snapshot.links, self._snapshot.last_search, self._snapshot.last_run_id
+            version = self._snapshot.version
+            if file_signature(self.links_file) != self._signatures.get(self.links_file):
+                links = tuple(self.load_links())
+                version = self._stored_version
+            if file_signature(self.blacklist_file) != self._signatures.get(self.blacklist_file):
+                self.blacklist = self.load_blacklist()
+            # Schübe eines Crawls, die bisher nur im Änderungsprotokoll stehen (save_links)
+            replay = self.changes.align(version)
+            if replay:
+                links = self._apply_changes(links, replay)
+            # Auch ohne Datei einmal laden (Rückfall auf den neuesten Crawl-Lauf)
+            if self.last_search_file not in self._signatures or file_signature(self.last_search_file) != self._signatures[self.last_search_file]:
+                last_search, last_run_id = self.load_last_scraping_links()
+            self._publish(links, last_search, last_run_id)
+            self._loaded = True
+    
+    def _apply_changes(self, links: Tuple[LinkRecord, ...], entries: List[Dict]) -> Tuple[LinkRecord, ...]:
+        """
+        Trägt Änderungen aus dem Protokoll im Bestand nach (Aufrufer hält _state_guard)
+        
+        Betrifft nur Schübe, die noch nicht in links.json stehen (save_links mit defer=True);
+        die Blacklist wird wie beim Zusammenführen bzw. Löschen mitgeführt.
+        """
+        by_url = {link.url: link for link in links}
+        for entry in entries:
+            link_url = entry['url']
+            if entry['op'] == OP_REMOVE:
+                by_url.pop(link_url, None)
+                self.blacklist.discard(link_url)
+            else:
+                by_url[link_url] = LinkRecord.from_dict(entry['link'])
+                self.blacklist.add(link_url)
+        logger.info(f"{len(entries)} Änderung(en) aus dem Änderungsprotokoll nachgetragen (noch nicht in links.json)")
+        return tuple(by_url.values())
+    
+    def _publish(self, links, last_search, last_run_id: Optional[str]):
+        """
+        Veröffentlicht einen neuen Stand (Aufrufer hält _state_guard)
+        
+        Wird erst nach dem Speichern aufgerufen, damit die Cache-Kennung die neuen
+        Datei-Signaturen enthält. Unveränderte Stände werden nicht neu veröffentlicht.
+        """
+        key = (self.changes.version, self._signatures.get(self.links_file), self._signatures.get(self.last_search_file))
+        current = self._snapshot
+        if key == current.key and links is current.links and last_search is current.last_search and last_run_id == current.last_run_id:
+            return
+        self._snapshot = LinkSnapshot(tuple(links), tuple(last_search), self.changes.version, key, last_run_id, previous=current)
+    
+    def snapshot(self) -> LinkSnapshot:
+        """
+        Aktueller Stand des Bestands für eine Leseanfrage
+        
+        Lädt vorher neu, falls ein anderer Prozess die Dateien geändert hat - außer der
+        Schreib-Thread ändert gerade den Bestand: dann wird nicht gewartet, sondern der zuletzt
+        veröffentlichte Stand zurückgegeben. Der Snapshot wird nie verändert; Leser verwenden
+        ihn für die ganze Anfrage.
+        """
+        if self._state_guard.acquire(blocking=not self._loaded):
+            try:
+                self.refresh_state()
+            finally:
+                self._state_guard.release()
+        return self._snapshot
+    
+    @property
+    def links(self) -> Tuple[LinkRecord, ...]:
+        """Alle Links des zuletzt veröffentlichten Stands (kompakte Einträge, link_record.py)"""
+        return self._snapshot.links
+    
+    @property
+    def last_scraping_links(self) -> Tuple[str, ...]:
+        """Links der letzten Suche im zuletzt veröffentlichten Stand"""
+        return self._snapshot.last_search
+    
+    def _write(self, fn, *args, **kwargs):
+        """
+        Führt eine Änderung am Bestand über den Schreib-Thread aus
+        
+        Die Änderung läuft unter der prozessübergreifenden Zustands-Sperre und auf dem
+        aktuellen Stand der Dateien.
+        """
+        def job():
+            with self._state_guard, self._state_lock.acquire():
+                self.refresh_state()
+                return fn(*args, **kwargs)
+        return self._writer.call(job)
     
     def normalize_url(self, url: str) -> str:
         """Normalisiert eine URL, um Duplikate zu vermeiden"""
@@ -352,64 +598,218 @@ class KleinanzeigenScraper:
         
         return next_url
     
-    def scrape_search_string(self, search_string: str, max_pages: int = 10, session=None) -> Set[str]:
+    def extract_page_count(self, html_content: str) -> Optional[int]:
+        """
+        Ermittelt die Seitenzahl einer Suche aus Seite 1
+        
+        Zuerst aus der Trefferzahl über der Ergebnisliste ("1 - 25 von 1.234 Ergebnissen"; steht
+        vor der Liste und ist daher auch im Streaming-Modus vorhanden), sonst aus der
+        Seitennavigation, sofern sie keinen Weiter-Pfeil auf weitere Seiten hat.
+        
+        Returns:
+            Anzahl Seiten oder None, wenn sie sich nicht bestimmen lässt
+        """
+        summary = RESULT_SUMMARY_PATTERN.search(html_content)
+        if summary:
+            first, last = int(summary.group(1)), int(summary.group(2))
+            total = int(summary.group(3).replace('.', ''))
+            per_page = last - first + 1
+            if per_page > 0:
+                return max(1, -(-total // per_page))
+        pages = [int(number) for number in PAGINATION_PAGE_PATTERN.findall(html_content)]
+        if pages and 'pagination-next' not in html_content:
+            return max(pages)
+        return None
+    
+    def _fetch_page(self, session, route, url: str, stream_stats: StreamStats = None) -> Tuple[str, int, float]:
+        """
+        Lädt eine Suchseite (ggf. im Streaming-Modus) und meldet das Ergebnis an den Egress-Pool
+        
+        Returns:
+            Tuple aus HTML, HTTP-Status und Ladezeit in ms
+        """
+        if route is not None:
+            route.throttle()
+        fetch_started = time.perf_counter()
+        try:
+            if self.streaming:
+                html_content, status = fetch_result_page(session, url, stream_stats)
+            else:
+                response = session.get(url, timeout=10)
+                status = response.status_code
+                response.raise_for_status()
+                html_content = response.text
+        except requests.exceptions.RequestException as e:
+            if route is not None:
+                self.egress.report(route, not route_failure(e))
+            raise
+        fetch_ms = (time.perf_counter() - fetch_started) * 1000
+        if route is not None:
+            self.egress.report(route, True)
+        # Kleine Pause zwischen Requests desselben Slots (optimiert für Performance)
+        time.sleep(0.2)
+        return html_content, status, fetch_ms
+    
+    def scrape_search_string(self, search_string: str, max_pages: int = 10, session=None, route=None, stream_stats: StreamStats = None, url_report: UrlReport = None,
+                             sessions: SessionCache = None, page_executor: ThreadPoolExecutor = None, known_fingerprint: str = None) -> Set[str]:
         """
         Scraped eine Suche von Kleinanzeigen
         
+        Seite 1 liefert die Seitenzahl; die übrigen Seiten werden dann ohne abschließende leere
+        Seite geladen, mit page_executor parallel. Ist die Seitenzahl unbekannt, wird wie bisher
+        Seite für Seite bis zur ersten leeren Seite geladen.
+        
+        Der Fingerabdruck von Seite 1 (Anzeigen-IDs in Reihenfolge + Seitenzahl) steht danach in
+        url_report.fingerprint. Stimmt er mit known_fingerprint überein, werden keine weiteren
+        Seiten geladen und kein Link zurückgegeben (Abbruchgrund 'unchanged').
+        
         Args:
             search_string: Die Such-URL
             max_pages: Maximale Anzahl Seiten
             session: Optional Session-Objekt (für Thread-sichere Verwendung)
+            route: Optional Egress-Route (Ratenbudget und Health-Score werden berücksichtigt)
+            stream_stats: Optional Zähler für den Streaming-Modus (gelesene/gesparte Bytes)
+            url_report: Optional Bericht für diese Such-URL (Seiten, Zeiten, Abbruchgrund)
+            sessions: Optional Sessions je Route - jede Seite belegt dann einzeln einen Slot im
+                Egress-Pool (statt session/route für die ganze Suche)
+            page_executor: Optional Thread-Pool, auf dem die Seiten 2..N parallel geladen werden
+            known_fingerprint: Optional Fingerabdruck des letzten vollständigen Crawls dieser Such-URL
         """
         all_links = set()
+        # Ohne Bericht wird in einen Wegwerf-Bericht geschrieben
+        url_report = url_report if url_report is not None else UrlReport(search_string, None)
+        stop_reason = STOP_MAX_PAGES
         # Verwende übergebene Session oder erstelle neue
-        session = session if session else self._create_session()
+        if sessions is None:
+            session = session if session else self._create_session(route)
+        
+        host = urlparse(search_string).netloc
+        
+        def fetch_once(url):
+            if sessions is None:
+                return self._fetch_page(session, route, url, stream_stats)
+            with self.egress.acquire() as page_route:
+                return self._fetch_page(sessions.get(page_route), page_route, url, stream_stats)
+        
+        def fetch(url, attempts: List[int]):
+            """Lädt eine Seite mit Wiederholungen bei vorübergehenden Fehlern; attempts[0] zählt die Versuche"""
+            return fetch_with_retry(lambda: fetch_once(url), url, host, self.retry, self.breaker, attempts)
+        
+        def scrape_page(page: int):
+            """
+            Lädt und parst eine Seite
+            
+            Returns:
+                (Links, HTML); Links = None bei Netzwerkfehler, HTML = None bei sonstigem Fehler
+            """
+            url = search_string if page == 1 else self.get_next_page_url(search_string, page)
+            fetch_started = time.perf_counter()
+            status = None
+            fetch_ms = None
+            attempts = [0]
+            try:
+                logger.info(f"Lade Seite {page}: {url}")
+                html_content, status, fetch_ms = fetch(url, attempts)
+                
+                # Extrahiere Links von dieser Seite
+                parse_started = time.perf_counter()
+                page_links = self.extract_listing_links_from_page(html_content, self.base_url)
+                parse_ms = (time.perf_counter() - parse_started) * 1000
+                url_report.add_page(page, url, status, fetch_ms, parse_ms, len(page_links), attempts=attempts[0])
+                logger.info(f"Gefunden: {len(page_links)} Links auf Seite {page}")
+                return page_links, html_content
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Fehler beim Laden von Seite {page} nach {attempts[0]} Versuch(en): {e}")
+                if e.response is not None:
+                    status = e.response.status_code
+                url_report.add_page(page, url, status, (time.perf_counter() - fetch_started) * 1000, error=str(e),
+                                    attempts=attempts[0], abandoned=True)
+                return None, None
+            except Exception as e:
+                logger.error(f"Unerwarteter Fehler auf Seite {page}: {e}")
+                url_report.add_page(page, url, status, fetch_ms if fetch_ms is not None else (time.perf_counter() - fetch_started) * 1000, error=str(e), attempts=attempts[0])
+                return set(), None
         
         try:
             # Parse die Such-URL
             if not search_string.startswith('http'):
                 logger.warning(f"'{search_string}' ist keine vollständige URL. Bitte vollständige Kleinanzeigen-URL verwenden.")
+                url_report.stop(STOP_INVALID_URL)
                 return all_links
             
             logger.info(f"Starte Scraping für: {search_string}")
             
-            for page in range(1, max_pages + 1):
-                try:
-                    if page == 1:
-                        url = search_string
+            page_links, html_content = scrape_page(1)
+            page_count = None
+            if page_links is None:
+                stop_reason = STOP_ERROR
+            elif html_content is not None and not page_links:
+                logger.info("Keine Links auf Seite 1. Beende Scraping.")
+                stop_reason = STOP_EMPTY_PAGE
+            else:
+                if html_content is not None:
+                    page_count = self.extract_page_count(html_content)
+                    url_report.page_count = page_count
+                    if page_links:
+                        url_report.fingerprint = result_fingerprint(ordered_ad_ids(html_content, page_links), page_count)
+                if known_fingerprint is not None and url_report.fingerprint == known_fingerprint:
+                    logger.info(f"Seite 1 unverändert seit dem letzten Crawl - überspringe {search_string}")
+                    stop_reason = STOP_UNCHANGED
+                    page_count = None
+                else:
+                    all_links.update(page_links)
+            
+            if page_count is not None:
+                last_page = min(page_count, max_pages)
+                if page_count <= max_pages:
+                    stop_reason = STOP_LAST_PAGE
+                pages = range(2, last_page + 1)
+                logger.info(f"{page_count} Seite(n) laut Seite 1 - lade Seiten 2 bis {last_page}" if last_page > 1 else f"{page_count} Seite(n) laut Seite 1")
+                if page_executor is not None and len(pages) > 1:
+                    results = page_executor.map(profiling.propagate(scrape_page), pages)
+                else:
+                    results = map(scrape_page, pages)
+                for page_links, _ in results:
+                    if page_links is None:
+                        stop_reason = STOP_ERROR
                     else:
-                        url = self.get_next_page_url(search_string, page)
-                    
-                    logger.info(f"Lade Seite {page}: {url}")
-                    response = session.get(url, timeout=10)
-                    response.raise_for_status()
-                    
-                    # Extrahiere Links von dieser Seite
-                    page_links = self.extract_listing_links_from_page(response.text, self.base_url)
-                    
+                        all_links.update(page_links)
+            elif stop_reason == STOP_MAX_PAGES:
+                # Seitenzahl unbekannt: Seite für Seite bis zur ersten leeren Seite
+                for page in range(2, max_pages + 1):
+                    page_links, html_content = scrape_page(page)
+                    if page_links is None:
+                        stop_reason = STOP_ERROR
+                        break
+                    if html_content is None:
+                        continue
                     if not page_links:
                         logger.info(f"Keine Links mehr auf Seite {page}. Beende Scraping.")
+                        stop_reason = STOP_EMPTY_PAGE
                         break
-                    
                     all_links.update(page_links)
-                    logger.info(f"Gefunden: {len(page_links)} Links auf Seite {page}")
-                    
-                    # Kleine Pause zwischen Requests (optimiert für Performance)
-                    time.sleep(0.2)
-                    
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"Fehler beim Laden von Seite {page}: {e}")
-                    break
-                except Exception as e:
-                    logger.error(f"Unerwarteter Fehler auf Seite {page}: {e}")
-                    continue
                     
         except Exception as e:
             logger.error(f"Fehler beim Scraping von '{search_string}': {e}")
+            stop_reason = STOP_ERROR
         
+        # Parallel geladene Seiten kommen in beliebiger Reihenfolge an
+        url_report.pages.sort(key=lambda entry: entry['page'])
+        url_report.links_found = len(all_links)
+        url_report.stop(stop_reason)
         return all_links
     
-    def search_and_collect_links(self, search_strings: List[str], max_pages: int = 10, max_workers: int = 4, makler_names: List[str] = None, url_to_makler_mapping: Dict[str, str] = None) -> List[str]:
+    def search_and_collect_links(self, search_strings: List[str], max_pages: int = 10, max_workers: int = 4, makler_names: List[str] = None, url_to_makler_mapping: Dict[str, str] = None, enrich: bool = False,
+                                 makler_schedules: Dict[str, MaklerSchedule] = None) -> List[str]:
+        """
+        Sucht nach Links für mehrere Suchstrings und fügt nur neue Links hinzu
+        
+        Argumente wie run_search; gibt nur die Liste neuer Links zurück.
+        """
+        return self.run_search(search_strings, max_pages, max_workers, makler_names, url_to_makler_mapping, enrich, makler_schedules)['new_links']
+    
+    def run_search(self, search_strings: List[str], max_pages: int = 10, max_workers: int = 4, makler_names: List[str] = None, url_to_makler_mapping: Dict[str, str] = None, enrich: bool = False,
+                   makler_schedules: Dict[str, MaklerSchedule] = None) -> Dict:
         """
         Sucht nach Links für mehrere Suchstrings und fügt nur neue Links hinzu
         
@@ -419,118 +819,581 @@ class KleinanzeigenScraper:
             max_workers: Anzahl paralleler Threads (3-5 empfohlen für Sicherheit)
             makler_names: Optionale Liste von Makler-Namen (für Gruppierung, deprecated - verwende url_to_makler_mapping)
             url_to_makler_mapping: Mapping von Such-URL zu Makler-Name (für korrekte Zuordnung)
+            enrich: Neue Links zusätzlich mit Daten aus der Detailseite anreichern
+            makler_schedules: Priorität und Parallelitätslimit je Makler (fair_scheduler.py);
+                freie Slots werden reihum nach Makler vergeben
+        
+        Such-URLs, die gerade von einem anderen Aufruf gecrawlt werden, werden nicht erneut
+        gecrawlt; der Aufruf wartet auf den laufenden Crawl und übernimmt dessen neue Links.
+        
+        Returns:
+            Dict mit 'new_links' und 'run_ids' (IDs der Crawl-Berichte aller beteiligten Läufe)
         """
+        # Schlüssel je Such-URL: (Such-URL, zugeordneter Makler)
+        keys = []
+        for search_string in search_strings:
+            makler_name = None
+            if url_to_makler_mapping and search_string in url_to_makler_mapping:
+                makler_name = url_to_makler_mapping[search_string]
+            elif makler_names and len(makler_names) == 1:
+                # Fallback: Wenn nur ein Makler, verwende diesen
+                makler_name = makler_names[0]
+            keys.append((search_string, makler_name))
+        
+        def start_crawl(remaining_keys):
+            # Nur ein Crawl gleichzeitig - auch über mehrere Worker-Prozesse hinweg
+            with self._crawl_lock.acquire():
+                return self._search_and_collect_links(remaining_keys, max_pages, max_workers, makler_schedules)
+        
+        results = self._coalescer.run(keys, start_crawl)
+        
+        # Neue Links aller beteiligten Crawls, soweit sie von Such-URLs dieser Anfrage stammen
+        requested_keys = set(keys)
         new_links = []
+        seen = set()
+        for result in results:
+            for link_url, sources in result['found_by'].items():
+                if link_url not in seen and sources & requested_keys:
+                    seen.add(link_url)
+                    new_links.append(link_url)
+        
+        if enrich and new_links:
+            self.enrich_links(new_links)
+        return {'new_links': new_links, 'run_ids': [result['run_id'] for result in results]}
+    
+    def enrich_links(self, urls: List[str]) -> int:
+        """
+        Lädt Detaildaten (Preis, Wohnfläche, Zimmer, Einstellungsdatum) für Links und speichert sie
+        
+        Returns:
+            Anzahl angereicherter Links
+        """
+        details = self.enricher.enrich(urls)
+        if not details:
+            return 0
+        return self._write(self._store_details, details)
+    
+    def _store_details(self, details: Dict[str, Dict]) -> int:
+        """Schreibt Detaildaten in die Link-Einträge; läuft auf dem Schreib-Thread"""
+        updated = 0
+        snapshot = self._snapshot
+        links = list(snapshot.links)
+        for position, link in enumerate(links):
+            if link.url in details:
+                links[position] = link = link.replace(details=details[link.url])
+                updated += 1
+                self.changes.record(OP_UPDATE, link.url, link.to_dict())
+        if updated:
+            self.save_links(links)
+            self._publish(links, snapshot.last_search, snapshot.last_run_id)
+        return updated
+    
+    def _search_and_collect_links(self, keys: List[Tuple[str, str]], max_pages: int, max_workers: int,
+                                  makler_schedules: Dict[str, MaklerSchedule] = None) -> Dict:
+        """
+        Führt den Crawl aus; Aufrufer hält die Crawl-Sperre
+        
+        Returns:
+            Dict mit 'run_id' und 'found_by' (neue Links -> (Such-URL, Makler)-Schlüssel, die sie gefunden haben)
+        """
+        report = self.crawl_reports.create()
+        try:
+            return self._run_crawl(keys, max_pages, max_workers, report, makler_schedules)
+        except BaseException:
+            report.finish(0, status='failed')
+            raise
+        finally:
+            self.crawl_reports.save(report)
+    
+    def _local_results(self, keys: List[Tuple[str, str]], max_pages: int, max_workers: int,
+                       url_reports: Dict[Tuple[str, str], UrlReport], stream_stats: StreamStats, scheduler: FairScheduler,
+                       expected: Dict[Tuple[str, str], str]):
+        """
+        Crawlt die Such-URLs in diesem Prozess; liefert (Schlüssel, Links, Fehler) in Abschlussreihenfolge
+        
+        Es laufen höchstens so viele Such-URLs wie der Pool Threads hat; jeder frei werdende
+        Slot geht an die Such-URL, die der Scheduler als nächste vergibt (reihum nach Makler).
+        expected: Fingerabdrücke, bei denen eine Such-URL nach Seite 1 übersprungen wird
+        """
+        # Jede Seite belegt einzeln einen Slot im Egress-Pool (globales Limit für alle Anfragen);
+        # Seiten 2..N einer Suche laufen auf einem eigenen Pool, damit wartende Suchen keine
+        # Slots blockieren
+        sessions = SessionCache()
+        page_executor = ThreadPoolExecutor(max_workers=self.egress.total_concurrency(), thread_name_prefix='page')
+        
+        def scrape_with_sessions(search_string, url_report, known_fingerprint):
+            """Hilfsfunktion für Threading; Sessions kommen je Thread und Route aus dem Cache"""
+            return self.scrape_search_string(search_string, max_pages, stream_stats=stream_stats, url_report=url_report,
+                                             sessions=sessions, page_executor=page_executor, known_fingerprint=known_fingerprint)
+        
+        # Bei aktivem Profiling werden auch die Worker-Threads profiliert
+        scrape_task = profiling.propagate(scrape_with_sessions)
+        
+        # Paralleles Scraping: mindestens max_workers, bei größerem Egress-Pool dessen Gesamtbudget
+        pool_size = max(max_workers, self.egress.total_concurrency())
+        with closing(sessions), page_executor, ThreadPoolExecutor(max_workers=pool_size) as executor:
+            running = {}
+            
+            def dispatch():
+                while len(running) < pool_size:
+                    key = scheduler.next()
+                    if key is None:
+                        break
+                    running[executor.submit(scrape_task, key[0], url_reports[key], expected.get(key))] = key
+            
+            dispatch()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                results = []
+                for future in finished:
+                    key = running.pop(future)
+                    scheduler.done(key)
+                    try:
+                        results.append((key, future.result(), None))
+                    except Exception as e:
+                        results.append((key, None, e))
+                # Freie Slots sofort neu vergeben, bevor die Ergebnisse zusammengeführt werden
+                dispatch()
+                yield from results
+    
+    def _remote_results(self, keys: List[Tuple[str, str]], max_pages: int, url_reports: Dict[Tuple[str, str], UrlReport], run_id: str,
+                        scheduler: FairScheduler, expected: Dict[Tuple[str, str], str], delivered: List[str]):
+        """
+        Verteilt die Such-URLs als Aufträge an Worker-Prozesse (crawl_worker.py) und liefert
+        (Schlüssel, Links, Fehler), sobald Ergebnisse ankommen; jedes Ergebnis einmal
+        
+        Die Auftrags-IDs gelieferter Ergebnisse landen in delivered; bestätigt (ack) werden sie
+        erst nach dem Zusammenführen (_ack_results), sonst bleiben sie für den nächsten Crawl liegen.
+        
+        Die Aufträge werden in der Reihenfolge des Schedulers eingestellt (Worker holen sie in
+        Einstellreihenfolge ab); Parallelitätslimits je Makler gelten hier nicht. Die erwarteten
+        Fingerabdrücke reisen im Auftrag mit.
+        """
+        queue = self.crawl_queue
+        keys = scheduler.order()
+        job_keys = dict(zip(queue.submit(run_id, keys, max_pages, fingerprints=[expected.get(key) for key in keys]), keys))
+        remaining = set(job_keys)
+        deadline = time.monotonic() + self.DISPATCH_TIMEOUT
+        logger.info(f"{len(keys)} Such-URL(s) als Aufträge für Crawl-Worker eingestellt (Lauf {run_id})")
+        try:
+            while remaining:
+                for result in queue.results(run_id):
+                    # Noch unbestätigte Ergebnisse kommen bei jeder Abfrage wieder
+                    if result['job_id'] not in remaining:
+                        continue
+                    key = job_keys[result['job_id']]
+                    remaining.discard(result['job_id'])
+                    delivered.append(result['job_id'])
+                    url_reports[key].load(result['report'])
+                    yield key, set(result['links']), None
+                for failure in queue.failures(run_id):
+                    if failure['job_id'] in remaining:
+                        key = job_keys[failure['job_id']]
+                        remaining.discard(failure['job_id'])
+                        url_reports[key].stop(STOP_ERROR)
+                        yield key, None, RuntimeError(failure['error'] or 'Auftrag gescheitert')
+                if not remaining:
+                    break
+                if time.monotonic() > deadline:
+                    logger.error(f"{len(remaining)} Auftrag/Aufträge nach {self.DISPATCH_TIMEOUT:.0f}s nicht erledigt - werden abgebrochen")
+                    for job_id in sorted(remaining):
+                        url_reports[job_keys[job_id]].stop(STOP_ERROR)
+                        yield job_keys[job_id], None, TimeoutError('Kein Worker hat den Auftrag rechtzeitig erledigt')
+                    break
+                time.sleep(self.DISPATCH_POLL_INTERVAL)
+        finally:
+            # Abbruch (Fehler, Zeitüberschreitung): offene Aufträge nicht mehr vergeben
+            if remaining:
+                queue.cancel(run_id)
+    
+    def _run_crawl(self, keys: List[Tuple[str, str]], max_pages: int, max_workers: int, report: CrawlReport,
+                   makler_schedules: Dict[str, MaklerSchedule] = None) -> Dict:
         # Mapping: gefundener Link -> Makler-Name (basierend auf Such-URL)
         link_to_makler = {}
+        # Mapping: gefundener Link -> Schlüssel der Such-URLs, die ihn gefunden haben
+        link_sources: Dict[str, Set[Tuple[str, str]]] = {}
+        # Mapping: gefundener Link -> erste Such-URL, die ihn gefunden hat (für /stats)
+        link_to_search: Dict[str, str] = {}
         current_timestamp = datetime.now().isoformat()
+        crawl_started = time.monotonic()
+        stream_stats = StreamStats() if self.streaming else None
+        url_reports = {key: report.start_url(*key) for key in keys}
+        scheduler = FairScheduler(keys, makler_schedules)
+        # Fingerabdrücke des letzten vollständigen Crawls: Such-URLs mit unveränderter Seite 1
+        # werden übersprungen; Status je Such-URL, falls doch vollständig gecrawlt wird
+        self.fingerprints.load()
+        checks = {key: self.fingerprints.expected(key[0], key[1], max_pages) for key in keys}
+        expected = {key: fingerprint for key, (fingerprint, _) in checks.items() if fingerprint}
+        
+        # Mit Auftragswarteschlange crawlen Worker-Prozesse, zusammengeführt wird nur hier
+        delivered: List[str] = []
+        if self.crawl_queue is not None:
+            self._recover_unmerged_results()
+            results = self._remote_results(keys, max_pages, url_reports, report.run_id, scheduler, expected, delivered)
+        else:
+            results = self._local_results(keys, max_pages, max_workers, url_reports, stream_stats, scheduler, expected)
         
-        # Hole bestehende URLs für Vergleich
-        existing_urls = {link['url'] if isinstance(link, dict) else link for link in self.links}
+        # Gefundene Links je Schlüssel (für neu/bekannt im Bericht)
+        found_by_key: Dict[Tuple[str, str], Set[str]] = {}
+        # Neue Links werden schubweise (höchstens alle MERGE_INTERVAL Sekunden) übernommen,
+        # damit /events sie schon während des Crawls melden kann; gespeichert wird pro Schub nur
+        # das Änderungsprotokoll, links.json erst nach dem letzten Schub
+        new_links: List[str] = []
+        # Bestehende Links mit neu zugeordnetem Makler (kommen nicht als 'links'-Ereignis)
+        reassigned_links = 0
+        pending: Set[str] = set()
+        merges = 0
+        last_merge = time.monotonic()
+        # Offene Such-URLs und gefundene Links je Makler: Ist die letzte Such-URL eines Maklers
+        # fertig, werden seine Links sofort übernommen (und sind exportierbar), auch wenn
+        # andere Makler noch laufen
+        urls_by_makler = Counter(makler_name for _, makler_name in keys if makler_name)
+        open_by_makler = Counter(urls_by_makler)
+        links_by_makler: Dict[str, Set[str]] = {}
+        makler_status = report.extra['makler'] = {}
+        self.events.publish(EVENT_CRAWL_STARTED, {'run_id': report.run_id, 'total': len(keys)})
         
-        # Parallelisierung: 4 Worker (konservativ für Sicherheit)
-        def scrape_with_session(search_string):
-            """Hilfsfunktion für Threading mit eigener Session"""
-            session = self._create_session()
-            try:
-                return self.scrape_search_string(search_string, max_pages, session=session)
-            finally:
-                session.close()
-        
-        # Paralleles Scraping
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Starte alle Scraping-Tasks
-            future_to_string = {
-                executor.submit(scrape_with_session, search_string): search_string 
-                for search_string in search_strings
-            }
-            
-            # Sammle Ergebnisse mit Zuordnung zur Such-URL
-            for future in as_completed(future_to_string):
-                search_string = future_to_string[future]
-                try:
-                    found_links = future.result()
-                    # Bestimme Makler-Name für diese Such-URL
-                    makler_name = None
-                    if url_to_makler_mapping and search_string in url_to_makler_mapping:
-                        makler_name = url_to_makler_mapping[search_string]
-                    elif makler_names and len(makler_names) == 1:
-                        # Fallback: Wenn nur ein Makler, verwende diesen
-                        makler_name = makler_names[0]
-                    
-                    # Ordne alle gefundenen Links diesem Makler zu
-                    for link_url in found_links:
-                        if makler_name:
-                            # Wenn Link bereits einem Makler zugeordnet ist, behalte beide
-                            if link_url in link_to_makler:
-                                existing_makler = link_to_makler[link_url]
-                                if isinstance(existing_makler, list):
-                                    if makler_name not in existing_makler:
-                                        existing_makler.append(makler_name)
-                                else:
-                                    if existing_makler != makler_name:
-                                        link_to_makler[link_url] = [existing_makler, makler_name]
+        # Sammle Ergebnisse mit Zuordnung zur Such-URL
+        for done, ((search_string, makler_name), found_links, error) in enumerate(results, 1):
+            url_report = url_reports[(search_string, makler_name)]
+            skipped = error is None and url_report.stop_reason == STOP_UNCHANGED
+            if error is not None:
+                logger.error(f"Fehler beim Scraping von '{search_string}': {error}")
+            elif skipped:
+                # Seite 1 wie beim letzten vollständigen Crawl: nichts zusammenzuführen
+                url_report.fingerprint_status = FINGERPRINT_UNCHANGED
+                self.fingerprints.record(search_string, makler_name, max_pages, url_report.fingerprint, skipped=True)
+            else:
+                url_report.fingerprint_status = checks[(search_string, makler_name)][1]
+                # Nur vollständig geladene Suchen dienen als Vergleich für den nächsten Lauf
+                if url_report.fingerprint and url_report.stop_reason != STOP_ERROR:
+                    self.fingerprints.record(search_string, makler_name, max_pages, url_report.fingerprint, skipped=False)
+                found_by_key[(search_string, makler_name)] = found_links
+                if makler_name:
+                    links_by_makler.setdefault(makler_name, set()).update(found_links)
+                
+                # Ordne alle gefundenen Links diesem Makler zu
+                for link_url in found_links:
+                    link_sources.setdefault(link_url, set()).add((search_string, makler_name))
+                    link_to_search.setdefault(link_url, search_string)
+                    if makler_name:
+                        pending.add(link_url)
+                        # Wenn Link bereits einem Makler zugeordnet ist, behalte beide
+                        if link_url in link_to_makler:
+                            existing_makler = link_to_makler[link_url]
+                            if isinstance(existing_makler, list):
+                                if makler_name not in existing_makler:
+                                    existing_makler.append(makler_name)
                             else:
-                                link_to_makler[link_url] = makler_name
-                    
-                    logger.info(f"Abgeschlossen: {search_string} - {len(found_links)} Links gefunden (Makler: {makler_name})")
-                except Exception as e:
-                    logger.error(f"Fehler beim Scraping von '{search_string}': {e}")
+                                if existing_makler != makler_name:
+                                    link_to_makler[link_url] = [existing_makler, makler_name]
+                        else:
+                            link_to_makler[link_url] = makler_name
+                
+                logger.info(f"Abgeschlossen: {search_string} - {len(found_links)} Links gefunden (Makler: {makler_name})")
+            
+            makler_finished = False
+            if makler_name:
+                open_by_makler[makler_name] -= 1
+                makler_finished = open_by_makler[makler_name] == 0
+            
+            if pending and (makler_finished or time.monotonic() - last_merge >= self.MERGE_INTERVAL):
+                merged, reassigned = self._merge_pending(pending, link_to_makler, current_timestamp, link_to_search, report.run_id,
+                                                         merges > 0, defer=True)
+                new_links += merged
+                reassigned_links += reassigned
+                self._ack_results(delivered)
+                merges += 1
+                last_merge = time.monotonic()
+            if makler_finished:
+                makler_status[makler_name] = {
+                    'search_urls': urls_by_makler[makler_name],
+                    'links_found': len(links_by_makler.get(makler_name, ())),
+                    'finished_after_s': round(time.monotonic() - crawl_started, 1)
+                }
+                logger.info(f"Makler '{makler_name}' fertig: {makler_status[makler_name]['links_found']} Links "
+                            f"nach {makler_status[makler_name]['finished_after_s']:.1f}s")
+                self.events.publish(EVENT_MAKLER_FINISHED, {'run_id': report.run_id, 'makler': makler_name, **makler_status[makler_name]})
+            self.events.publish(EVENT_PROGRESS, {
+                'run_id': report.run_id,
+                'done': done,
+                'total': len(keys),
+                'search_url': search_string,
+                'new_links': len(new_links)
+            })
+        
+        # Rest zusammenführen und alles vollständig speichern (mindestens einmal, damit die letzte
+        # Suche auch ohne Treffer aktualisiert wird)
+        if pending or merges == 0 or self._unsaved_search:
+            merged, reassigned = self._merge_pending(pending, link_to_makler, current_timestamp, link_to_search, report.run_id, merges > 0)
+            new_links += merged
+            reassigned_links += reassigned
+        self._ack_results(delivered)
+        # Erst nach dem Zusammenführen speichern: bricht der Crawl vorher ab, wird nächstes Mal vollständig gecrawlt
+        self.fingerprints.save()
+        
+        # Bericht: neue und bereits bekannte Links je Such-URL
+        new_link_set = set(new_links)
+        for key, found_links in found_by_key.items():
+            new_count = len(found_links & new_link_set)
+            url_reports[key].new_links = new_count
+            url_reports[key].known_links = len(found_links) - new_count
+        report.finish(len(new_links))
+        
+        if stream_stats is not None:
+            report.extra['streaming'] = stream_stats.to_dict()
+            self.last_stream_stats = stream_stats.to_dict()
+            logger.info(f"Streaming: {stream_stats.stopped_early} von {stream_stats.pages} Seiten nach der Ergebnisliste beendet, "
+                        f"{stream_stats.bytes_read / 1024:.0f} KB gelesen, ca. {stream_stats.bytes_saved / 1024:.0f} KB gespart")
+        skipped_urls = sum(1 for url_report in url_reports.values() if url_report.fingerprint_status == FINGERPRINT_UNCHANGED)
+        if skipped_urls:
+            logger.info(f"{skipped_urls} von {len(keys)} Such-URL(s) unverändert übersprungen ({skipped_urls / len(keys):.0%})")
+        logger.info(f"Insgesamt {len(new_links)} neue Links gefunden und hinzugefügt (Crawl-Bericht {report.run_id})")
+        report.extra['reassigned_links'] = reassigned_links
+        # Das Frontend lädt bei reassigned > 0 neu, statt sich auf die Live-Ereignisse zu verlassen
+        self.events.publish(EVENT_CRAWL_FINISHED, {'run_id': report.run_id, 'new_links': len(new_links), 'reassigned': reassigned_links})
+        return {'run_id': report.run_id, 'found_by': {link_url: link_sources[link_url] for link_url in new_links}}
+    
+    def _ack_results(self, delivered: List[str]):
+        """Bestätigt verteilte Ergebnisse, deren Links zusammengeführt sind"""
+        if self.crawl_queue is not None and delivered:
+            self.crawl_queue.ack(list(delivered))
+            delivered.clear()
+    
+    def _recover_unmerged_results(self):
+        """
+        Führt Ergebnisse früherer Läufe zusammen, die nie bestätigt wurden (Koordinator vorher
+        abgebrochen); Aufrufer hält die Crawl-Sperre
+        
+        Die Links werden unter ihrem ursprünglichen Lauf gespeichert. Bereits übernommene Links
+        filtert die Blacklist heraus - eine doppelte Zustellung schadet nicht.
+        """
+        by_run: Dict[str, List[Dict]] = {}
+        for result in self.crawl_queue.unmerged_results():
+            by_run.setdefault(result['run_id'], []).append(result)
+        for run_id, results in by_run.items():
+            link_to_makler: Dict[str, object] = {}
+            link_to_search: Dict[str, str] = {}
+            for result in results:
+                makler_name = result['makler']
+                if not makler_name:
+                    continue
+                for link_url in result['links']:
+                    link_to_search.setdefault(link_url, result['search_url'])
+                    existing = link_to_makler.setdefault(link_url, [])
+                    if makler_name not in existing:
+                        existing.append(makler_name)
+            new_links, _ = self._write(self._merge_found_links, link_to_makler, datetime.now().isoformat(), link_to_search, True, run_id)
+            self._ack_results([result['job_id'] for result in results])
+            logger.warning(f"{len(results)} unbestätigte(s) Ergebnis(se) aus Lauf {run_id} nachträglich übernommen, {len(new_links)} neue Links")
+    
+    def _merge_pending(self, pending: Set[str], link_to_makler: Dict[str, object], current_timestamp: str,
+                       link_to_search: Dict[str, str], run_id: str, append_last_search: bool,
+                       defer: bool = False) -> Tuple[List[str], int]:
+        """
+        Übernimmt die seit dem letzten Schub gefundenen Links und meldet neue über /events
+        
+        defer: Bestand nur veröffentlichen, vollständig gespeichert wird am Ende des Crawls
+        
+        Returns:
+            (neue Links, Anzahl bestehender Links mit neu zugeordnetem Makler)
+        """
+        batch = {link_url: link_to_makler[link_url] for link_url in pending}
+        pending.clear()
+        # Zusammenführen über den Schreib-Thread
+        new_links, reassigned = self._write(self._merge_found_links, batch, current_timestamp, link_to_search, append_last_search, run_id, defer)
+        if new_links:
+            self.events.publish(EVENT_LINKS, {
+                'run_id': run_id,
+                'links': [
+                    {
+                        'url': link_url,
+                        'scraped_at': current_timestamp,
+                        'makler_names': list(batch[link_url]) if isinstance(batch[link_url], list) else [batch[link_url]]
+                    }
+                    for link_url in new_links
+                ]
+            })
+        return new_links, reassigned
+    
+    def _merge_found_links(self, link_to_makler: Dict[str, object], current_timestamp: str, link_to_search: Dict[str, str] = None,
+                           append_last_search: bool = False, run_id: str = None, defer: bool = False) -> Tuple[List[str], int]:
+        """
+        Übernimmt gefundene Links in Links und Blacklist und speichert; läuft auf dem Schreib-Thread
+        
+        Gibt die neuen Links und die Anzahl bestehender Links mit neu zugeordnetem Makler zurück.
+        
+        append_last_search: Neue Links an die letzte Suche anhängen (weitere Schübe desselben Crawls)
+        statt sie zu ersetzen
+        run_id: Crawl-Lauf, unter dem die neuen Links im Verlauf gespeichert werden (crawl_runs.py)
+        defer: Schub eines laufenden Crawls - nur veröffentlichen und das Änderungsprotokoll
+        anhängen; links.json, Blacklist, letzte Suche und Crawl-Lauf schreibt erst der letzte
+        Schub (siehe save_links)
+        """
+        new_links = []
+        reassigned = 0
+        # Änderungen entstehen auf einer Kopie; Leser sehen den Schub erst nach _publish
+        snapshot = self._snapshot
+        links = list(snapshot.links)
+        # Bestehende URLs -> Position für Vergleich und Makler-Aktualisierung
+        positions = {link.url: position for position, link in enumerate(links)}
+        # Ein Zeitstempel-Objekt für den ganzen Schub
+        timestamp = encode_timestamp(current_timestamp)
         
         # Filtere Links, die bereits in der Blacklist sind
         for link_url, assigned_makler in link_to_makler.items():
             if link_url not in self.blacklist:
-                if link_url not in existing_urls:
+                position = positions.get(link_url)
+                if position is None:
                     new_links.append(link_url)
                     # Füge Link mit Timestamp und Makler-Name hinzu
-                    link_data = {'url': link_url, 'scraped_at': current_timestamp}
-                    # Konvertiere zu Liste falls nötig
-                    if isinstance(assigned_makler, list):
-                        link_data['makler_names'] = assigned_makler
-                    else:
-                        link_data['makler_names'] = [assigned_makler] if assigned_makler else []
-                    self.links.append(link_data)
-                    existing_urls.add(link_url)
+                    search_url = link_to_search.get(link_url) if link_to_search else None
+                    link_record = LinkRecord(link_url, timestamp, share(search_url), makler_ids(assigned_makler))
+                    positions[link_url] = len(links)
+                    links.append(link_record)
+                    self.changes.record(OP_ADD, link_url, link_record.to_dict())
                 else:
-                    # Link existiert bereits - aktualisiere Makler-Namen
-                    for link in self.links:
-                        if isinstance(link, dict) and link.get('url') == link_url:
-                            existing_makler = link.get('makler_names', [])
-                            if not isinstance(existing_makler, list):
-                                existing_makler = [existing_makler] if existing_makler else []
-                            
-                            # Füge neuen Makler hinzu, ohne Duplikate
-                            if isinstance(assigned_makler, list):
-                                for makler in assigned_makler:
-                                    if makler not in existing_makler:
-                                        existing_makler.append(makler)
-                            else:
-                                if assigned_makler and assigned_makler not in existing_makler:
-                                    existing_makler.append(assigned_makler)
-                            
-                            link['makler_names'] = existing_makler
-                            break
+                    # Link existiert bereits - aktualisiere Makler-Namen (neuer Eintrag statt Änderung)
+                    link = links[position]
+                    # Füge neuen Makler hinzu, ohne Duplikate
+                    added = tuple(m for m in dict.fromkeys(makler_ids(assigned_makler)) if m not in link.makler)
+                    if added:
+                        links[position] = link = link.replace(makler=share(link.makler + added))
+                        reassigned += 1
+                        self.changes.record(OP_UPDATE, link_url, link.to_dict())
                 # Füge zur Blacklist hinzu (auch wenn bereits in links)
                 self.blacklist.add(link_url)
         
-        # Speichere die aktualisierten Daten
-        if new_links:
-            self.save_links()
-        self.save_blacklist()
+        last_search = snapshot.last_search + tuple(new_links) if append_last_search else tuple(new_links)
+        # Speichere die aktualisierten Daten - bei defer nur das Änderungsprotokoll
+        if new_links or reassigned or self._stored_version != self.changes.version:
+            deferred = self.save_links(links, defer)
+        else:
+            deferred = defer
+        if deferred:
+            self._unsaved_search = True
+        else:
+            self.save_blacklist()
+            # Speichere Links der letzten Suche; nach zurückgestellten Schüben desselben Crawls
+            # steht der ganze Lauf nur in der letzten Suche
+            if run_id:
+                if self._unsaved_search:
+                    self.runs.record(run_id, list(last_search), False)
+                else:
+                    self.runs.record(run_id, new_links, append_last_search)
+            self.save_last_scraping_links(last_search, run_id)
+            self._unsaved_search = False
+        self._publish(links if new_links or reassigned else snapshot.links, last_search, run_id)
+        return new_links, reassigned
+    
+    def get_all_links(self, snapshot: LinkSnapshot = None) -> List[str]:
+        """Gibt alle gesammelten Links als Liste von URLs zurück (für Kompatibilität)"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return [link.url for link in snapshot.links]
+    
+    def get_all_links_with_dates(self, snapshot: LinkSnapshot = None) -> List[Dict[str, str]]:
+        """Gibt alle Links mit Timestamps zurück (im Format von links.json)"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return records_to_dicts(snapshot.links)
+    
+    def state_version(self) -> tuple:
+        """
+        Kennung des aktuellen Bestands für Caches (wie snapshot().key)
+        
+        Ändert sich bei jeder Änderung an Links oder letzter Suche, auch durch andere Prozesse.
+        """
+        return self.snapshot().key
+    
+    def get_link_changes(self, since: int = None) -> Dict:
+        """
+        Änderungen am Bestand seit Version since (None = kompletter Bestand)
         
-        # Speichere Links der letzten Suche
-        self.last_scraping_links = new_links
+        Returns:
+            Dict mit 'version', 'snapshot' und entweder 'added'/'updated'/'removed' oder - wenn
+            since nicht mehr im Änderungsprotokoll liegt - 'links' (kompletter Bestand)
+        """
+        snapshot = self.snapshot()
+        if since is not None:
+            # Das Protokoll kann dem Snapshot voraus sein - hier auf einen laufenden Schub warten
+            with self._state_guard:
+                changes = self.changes.changes_since(since)
+            if changes is not None:
+                return {'snapshot': False, **changes}
+        return {'snapshot': True, 'version': snapshot.version, 'links': records_to_dicts(snapshot.links)}
+    
+    def get_link_columns(self, snapshot: LinkSnapshot = None) -> LinkColumns:
+        """Gibt die Spaltenform des Bestands zurück (wird nur nach Änderungen neu aufgebaut)"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        cached = self._columns
+        if cached is not None and cached[0] is snapshot.links:
+            return cached[1]
+        columns = LinkColumns.from_links(snapshot.links)
+        # Nur übernehmen, wenn inzwischen kein neuerer Stand veröffentlicht wurde
+        if self._snapshot.links is snapshot.links:
+            self._columns = (snapshot.links, columns)
+        return columns
+    
+    def get_link_dicts(self, snapshot: LinkSnapshot = None) -> LinkDicts:
+        """
+        Gibt die Einträge des Bestands im Format von links.json zurück, id(LinkRecord) -> Dict
+        (wird nur nach Änderungen neu aufgebaut; die Dicts werden geteilt und nicht verändert)
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        cached = self._link_dicts
+        if cached is not None and cached[0] is snapshot.links:
+            return cached[1]
+        links = snapshot.links
+        # Einträge werden zwischen Snapshots geteilt: nur neue oder geänderte umwandeln. Die
+        # IDs im alten Cache sind eindeutig, solange dessen Links-Tupel noch gehalten wird
+        previous = cached[1] if cached is not None else {}
+        missing = [link for link in links if id(link) not in previous]
+        converted = dict(zip(map(id, missing), records_to_dicts(missing)))
+        rows = LinkDicts(links)
+        for link in links:
+            key = id(link)
+            data = previous.get(key)
+            rows[key] = data if data is not None else converted[key]
+        # Nur übernehmen, wenn inzwischen kein neuerer Stand veröffentlicht wurde
+        if self._snapshot.links is links:
+            self._link_dicts = (links, rows)
+        return rows
+    
+    def get_stats(self, interval: str = 'day', makler_names: List[str] = None, since: str = None, until: str = None, top: int = 10,
+                  snapshot: LinkSnapshot = None) -> Dict:
+        """
+        Kennzahlen über den Bestand: Links je Makler, je Periode, je Makler und Periode sowie Top-Such-URLs
         
-        logger.info(f"Insgesamt {len(new_links)} neue Links gefunden und hinzugefügt")
-        return new_links
+        Args siehe analytics.compute_stats; snapshot: Stand (optional, sonst der aktuelle)
+        """
+        return compute_stats(self.get_link_columns(snapshot), interval=interval, makler_names=makler_names, since=since, until=until, top=top)
     
-    def get_all_links(self) -> List[str]:
-        """Gibt alle gesammelten Links als Liste von URLs zurück (für Kompatibilität)"""
-        return [link['url'] if isinstance(link, dict) else link for link in self.links]
+    def _compile_query(self, makler_names: List[str], year: int, month: int, day: int) -> LinkQuery:
+        """Kompiliert die Filter der Abfrage-Endpunkte"""
+        return LinkQuery(makler_names=makler_names, year=year, month=month, day=day)
+    
+    def _candidates(self, snapshot: LinkSnapshot, last_search_only: bool, run_id: Optional[str]) -> List[LinkRecord]:
+        """
+        Einträge, auf die die Filter angewendet werden
+        
+        Für die letzte Suche oder einen Crawl-Lauf werden nur dessen Links über den URL-Index
+        nachgeschlagen (in Fundreihenfolge) statt den ganzen Bestand zu durchsuchen.
+        """
+        if run_id is not None:
+            if run_id == snapshot.last_run_id:
+                return snapshot.select(snapshot.last_search)
+            return snapshot.select(self.runs.links(run_id) or ())
+        if last_search_only:
+            return snapshot.select(snapshot.last_search)
+        return snapshot.links
     
-    def get_all_links_with_dates(self) -> List[Dict[str, str]]:
-        """Gibt alle Links mit Timestamps zurück"""
-        return self.links
+    def get_run_links(self, run_id: str) -> Optional[List[str]]:
+        """Neue Links eines Crawl-Laufs (None, wenn der Lauf unbekannt ist)"""
+        urls = self.runs.links(run_id)
+        return list(urls) if urls is not None else None
     
     def get_links_grouped_by_makler(self) -> Dict[str, List[Dict[str, str]]]:
         """
@@ -539,41 +1402,16 @@ class KleinanzeigenScraper:
         Returns:
             Dict mit Makler-Name als Key und Liste von Links als Value
         """
-        grouped = {}
-        for link in self.links:
-            if isinstance(link, dict):
-                url = link.get('url', '')
-                makler_names = link.get('makler_names', [])
-                if makler_names:
-                    for makler_name in makler_names:
-                        if makler_name not in grouped:
-                            grouped[makler_name] = []
-                        grouped[makler_name].append(link)
-                else:
-                    # Links ohne Makler-Zuordnung in "Sonstige" Gruppe
-                    if 'Sonstige' not in grouped:
-                        grouped['Sonstige'] = []
-                    grouped['Sonstige'].append(link)
-        return grouped
+        snapshot = self.snapshot()
+        return run_query(snapshot.links, LinkQuery(), GroupedProjection(self.get_link_dicts(snapshot), complete=True))
     
     def get_last_scraping_links(self) -> List[str]:
         """Gibt die Links der letzten Suche zurück"""
-        return self.last_scraping_links
+        return list(self.snapshot().last_search)
     
     def get_links_by_date(self, year: int, month: int, day: int = None) -> List[str]:
         """Gibt Links zurück, die im angegebenen Jahr, Monat und optional Tag gescraped wurden"""
-        filtered_links = []
-        for link_entry in self.links:
-            if isinstance(link_entry, dict):
-                scraped_at = link_entry.get('scraped_at', '')
-                try:
-                    dt = datetime.fromisoformat(scraped_at)
-                    if dt.year == year and dt.month == month:
-                        if day is None or dt.day == day:
-                            filtered_links.append(link_entry['url'])
-                except (ValueError, TypeError):
-                    continue
-        return filtered_links
+        return run_query(self.snapshot().links, LinkQuery(year=year, month=month, day=day), FlatProjection())
     
     def get_filtered_links_flat(
         self,
@@ -581,7 +1419,9 @@ class KleinanzeigenScraper:
         year: int = None,
         month: int = None,
         day: int = None,
-        last_search_only: bool = False
+        last_search_only: bool = False,
+        snapshot: LinkSnapshot = None,
+        run_id: str = None
     ) -> List[str]:
         """
         Gibt gefilterte Links als flache Liste von URLs zurück (für CSV-Export)
@@ -592,53 +1432,15 @@ class KleinanzeigenScraper:
             month: Monat zum Filtern (optional)
             day: Tag zum Filtern (optional)
             last_search_only: Nur Links der letzten Suche zurückgeben (optional)
+            snapshot: Stand, auf dem gefiltert wird (optional, sonst der aktuelle)
+            run_id: Nur neue Links dieses Crawl-Laufs zurückgeben (optional, siehe crawl_runs.py)
         
         Returns:
             Liste von URLs
         """
-        self.links = self.load_links()
-        
-        # Wenn letzte Suche, filtere nach last_scraping_links
-        last_scraping_urls = set(self.last_scraping_links) if last_search_only else None
-        
-        filtered_links = []
-        for link in self.links:
-            if isinstance(link, dict):
-                url = link.get('url', '')
-                
-                # Filter: Letzte Suche
-                if last_search_only and url not in last_scraping_urls:
-                    continue
-                
-                # Filter: Datum
-                if year is not None or month is not None or day is not None:
-                    scraped_at = link.get('scraped_at', '')
-                    try:
-                        dt = datetime.fromisoformat(scraped_at)
-                        if year is not None and dt.year != year:
-                            continue
-                        if month is not None and dt.month != month:
-                            continue
-                        if day is not None and dt.day != day:
-                            continue
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Filter: Makler
-                if makler_names:
-                    link_makler_names = link.get('makler_names', [])
-                    if not isinstance(link_makler_names, list):
-                        link_makler_names = [link_makler_names] if link_makler_names else []
-                    # Normalisiere Namen (trim whitespace)
-                    link_makler_normalized = [str(m).strip() for m in link_makler_names]
-                    makler_names_normalized = [str(m).strip() for m in makler_names]
-                    # Link muss mindestens einem der angegebenen Makler gehören
-                    if not any(makler in link_makler_normalized for makler in makler_names_normalized):
-                        continue
-                
-                filtered_links.append(url)
-        
-        return filtered_links
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return run_query(self._candidates(snapshot, last_search_only, run_id), self._compile_query(makler_names, year, month, day), FlatProjection())
     
     def get_filtered_links_with_metadata(
         self,
@@ -646,7 +1448,9 @@ class KleinanzeigenScraper:
         year: int = None,
         month: int = None,
         day: int = None,
-        last_search_only: bool = False
+        last_search_only: bool = False,
+        snapshot: LinkSnapshot = None,
+        run_id: str = None
     ) -> List[Dict[str, str]]:
         """
         Gibt gefilterte Links mit Metadaten zurück (für erweiterten CSV-Export)
@@ -657,62 +1461,36 @@ class KleinanzeigenScraper:
             month: Monat zum Filtern (optional)
             day: Tag zum Filtern (optional)
             last_search_only: Nur Links der letzten Suche zurückgeben (optional)
+            snapshot: Stand, auf dem gefiltert wird (optional, sonst der aktuelle)
+            run_id: Nur neue Links dieses Crawl-Laufs zurückgeben (optional, siehe crawl_runs.py)
         
         Returns:
-            Liste von Dicts mit 'url', 'makler', 'scraped_at'
+            Liste von Dicts mit 'url', 'makler', 'makler_names', 'scraped_at' und optional 'details'
         """
-        self.links = self.load_links()
-        
-        # Wenn letzte Suche, filtere nach last_scraping_links
-        last_scraping_urls = set(self.last_scraping_links) if last_search_only else None
-        
-        filtered_links = []
-        for link in self.links:
-            if isinstance(link, dict):
-                url = link.get('url', '')
-                
-                # Filter: Letzte Suche
-                if last_search_only and url not in last_scraping_urls:
-                    continue
-                
-                # Filter: Datum
-                if year is not None or month is not None or day is not None:
-                    scraped_at = link.get('scraped_at', '')
-                    try:
-                        dt = datetime.fromisoformat(scraped_at)
-                        if year is not None and dt.year != year:
-                            continue
-                        if month is not None and dt.month != month:
-                            continue
-                        if day is not None and dt.day != day:
-                            continue
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Filter: Makler
-                link_makler_names = link.get('makler_names', [])
-                if not isinstance(link_makler_names, list):
-                    link_makler_names = [link_makler_names] if link_makler_names else []
-                
-                if makler_names:
-                    # Normalisiere Namen (trim whitespace)
-                    link_makler_normalized = [str(m).strip() for m in link_makler_names]
-                    makler_names_normalized = [str(m).strip() for m in makler_names]
-                    # Link muss mindestens einem der angegebenen Makler gehören
-                    if not any(makler in link_makler_normalized for makler in makler_names_normalized):
-                        continue
-                
-                # Erstelle Eintrag mit Metadaten
-                makler_str = ', '.join(link_makler_names) if link_makler_names else ''
-                scraped_at_str = link.get('scraped_at', '')
-                
-                filtered_links.append({
-                    'url': url,
-                    'makler': makler_str,
-                    'scraped_at': scraped_at_str
-                })
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return run_query(self._candidates(snapshot, last_search_only, run_id), self._compile_query(makler_names, year, month, day), MetadataProjection())
+    
+    def iter_filtered_links_with_metadata(
+        self,
+        makler_names: List[str] = None,
+        year: int = None,
+        month: int = None,
+        day: int = None,
+        last_search_only: bool = False,
+        snapshot: LinkSnapshot = None,
+        run_id: str = None
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Wie get_filtered_links_with_metadata, aber als Generator (für gestreamte Exporte)
         
-        return filtered_links
+        Gefiltert wird erst beim ersten Abruf; die Datensätze entstehen einzeln, statt vorab
+        eine Liste aller Zeilen aufzubauen.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        query = self._compile_query(makler_names, year, month, day)
+        yield from MetadataProjection.iter_rows(query.filter(self._candidates(snapshot, last_search_only, run_id)))
     
     def get_filtered_links_grouped(
         self, 
@@ -720,7 +1498,9 @@ class KleinanzeigenScraper:
         year: int = None, 
         month: int = None, 
         day: int = None,
-        last_search_only: bool = False
+        last_search_only: bool = False,
+        snapshot: LinkSnapshot = None,
+        run_id: str = None
     ) -> Dict[str, List[Dict[str, str]]]:
         """
         Gibt Links nach Maklern gruppiert zurück, gefiltert nach verschiedenen Kriterien
@@ -731,64 +1511,18 @@ class KleinanzeigenScraper:
             month: Monat zum Filtern (optional)
             day: Tag zum Filtern (optional)
             last_search_only: Nur Links der letzten Suche zurückgeben (optional)
+            snapshot: Stand, auf dem gefiltert wird (optional, sonst der aktuelle)
+            run_id: Nur neue Links dieses Crawl-Laufs zurückgeben (optional, siehe crawl_runs.py)
         
         Returns:
             Dict mit Makler-Name als Key und Liste von Links als Value
         """
-        # Lade Links neu, um sicherzustellen, dass wir die neuesten Daten haben
-        self.links = self.load_links()
-        
-        # Wenn letzte Suche, filtere nach last_scraping_links
-        last_scraping_urls = set(self.last_scraping_links) if last_search_only else None
-        
-        grouped = {}
-        for link in self.links:
-            if isinstance(link, dict):
-                url = link.get('url', '')
-                
-                # Filter: Letzte Suche
-                if last_search_only and url not in last_scraping_urls:
-                    continue
-                
-                # Filter: Datum
-                if year is not None or month is not None or day is not None:
-                    scraped_at = link.get('scraped_at', '')
-                    try:
-                        dt = datetime.fromisoformat(scraped_at)
-                        if year is not None and dt.year != year:
-                            continue
-                        if month is not None and dt.month != month:
-                            continue
-                        if day is not None and dt.day != day:
-                            continue
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Filter: Makler
-                link_makler_names = link.get('makler_names', [])
-                if makler_names:
-                    # Nur Links, die zu mindestens einem der angegebenen Makler gehören
-                    if not any(makler in link_makler_names for makler in makler_names):
-                        continue
-                
-                # Gruppiere nach Makler
-                if link_makler_names:
-                    for makler_name in link_makler_names:
-                        # Wenn makler_names Filter gesetzt ist, nur diese Makler anzeigen
-                        if makler_names and makler_name not in makler_names:
-                            continue
-                        if makler_name not in grouped:
-                            grouped[makler_name] = []
-                        grouped[makler_name].append(link)
-                else:
-                    # Links ohne Makler-Zuordnung in "Sonstige" Gruppe
-                    # Nur anzeigen, wenn kein Makler-Filter gesetzt ist
-                    if not makler_names:
-                        if 'Sonstige' not in grouped:
-                            grouped['Sonstige'] = []
-                        grouped['Sonstige'].append(link)
-        
-        return grouped
+        # Lade Links neu, falls ein anderer Prozess sie geändert hat
+        if snapshot is None:
+            snapshot = self.snapshot()
+        candidates = self._candidates(snapshot, last_search_only, run_id)
+        projection = GroupedProjection(self.get_link_dicts(snapshot), complete=candidates is snapshot.links)
+        return run_query(candidates, self._compile_query(makler_names, year, month, day), projection)
     
     def export_to_csv(self, links: List[str]) -> str:
         """Exportiert Links in CSV-Format (ein Link pro Zeile)"""
@@ -803,7 +1537,7 @@ class KleinanzeigenScraper:
         """Exportiert Links mit Metadaten in CSV-Format"""
         output = StringIO()
         writer = csv.writer(output, lineterminator='\n')
-        writer.writerow(['URL', 'Makler', 'Gefunden am'])  # Header
+        writer.writerow(['URL', 'Makler', 'Gefunden am', 'Titel', 'Preis (€)', 'Wohnfläche (m²)', 'Zimmer', 'Online seit'])  # Header
         for link_data in links_with_metadata:
             url = link_data.get('url', '')
             makler = link_data.get('makler', '')
@@ -817,12 +1551,25 @@ class KleinanzeigenScraper:
                     scraped_at_formatted = scraped_at
             else:
                 scraped_at_formatted = ''
-            writer.writerow([url, makler, scraped_at_formatted])
+            # Detaildaten (nur vorhanden, wenn der Link angereichert wurde)
+            details = link_data.get('details') or {}
+            detail_values = []
+            for field in DETAIL_FIELDS:
+                value = details.get(field)
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                if field == 'posted_at' and value:
+                    try:
+                        value = datetime.fromisoformat(value).strftime('%d.%m.%Y')
+                    except (ValueError, TypeError):
+                        pass
+                detail_values.append('' if value is None else value)
+            writer.writerow([url, makler, scraped_at_formatted] + detail_values)
         return output.getvalue()
     
     def get_total_links_count(self) -> int:
         """Gibt die Gesamtanzahl der gesammelten Links zurück"""
-        return len(self.links)
+        return len(self.snapshot().links)
     
     def delete_links_filtered(self, makler_names: List[str] = None, year: int = None, month: int = None, day: int = None) -> int:
         """
@@ -837,77 +1584,48 @@ class KleinanzeigenScraper:
         Returns:
             Anzahl gelöschter Links
         """
-        from datetime import datetime
+        return self._write(self._delete_links_filtered, makler_names, year, month, day)
+    
+    def _delete_links_filtered(self, makler_names: List[str], year: int, month: int, day: int) -> int:
+        """Löscht Links basierend auf Filtern; läuft auf dem Schreib-Thread"""
+        snapshot = self._snapshot
+        query = self._compile_query(makler_names, year, month, day)
+        links_to_delete, links_to_keep = run_query(snapshot.links, query, PartitionProjection())
+        deleted_count = len(links_to_delete)
         
-        deleted_count = 0
-        links_to_keep = []
+        for link in links_to_delete:
+            # Entferne auch aus Blacklist
+            link_url = link.url
+            self.changes.record(OP_REMOVE, link_url)
+            self.blacklist.discard(link_url)
         
-        for link in self.links:
-            should_delete = True
-            
-            # Prüfe Makler-Filter
-            if makler_names:
-                link_makler = link.get('makler_names', [])
-                if not isinstance(link_makler, list):
-                    link_makler = [link_makler] if link_makler else []
-                # Link muss mindestens einen der angegebenen Makler haben
-                # Normalisiere Namen (trim whitespace, case-insensitive Vergleich)
-                link_makler_normalized = [str(m).strip() for m in link_makler]
-                makler_names_normalized = [str(m).strip() for m in makler_names]
-                if not any(makler in link_makler_normalized for makler in makler_names_normalized):
-                    should_delete = False
-                else:
-                    logger.debug(f"Link wird gelöscht: {link.get('url')[:50]}... (Makler: {link_makler_normalized}, Filter: {makler_names_normalized})")
-            
-            # Prüfe Datums-Filter
-            if should_delete and (year is not None or month is not None or day is not None):
-                scraped_at = link.get('scraped_at')
-                if scraped_at:
-                    try:
-                        if isinstance(scraped_at, str):
-                            dt = datetime.fromisoformat(scraped_at.replace('Z', '+00:00'))
-                        else:
-                            dt = scraped_at
-                        
-                        if year is not None and dt.year != year:
-                            should_delete = False
-                        if should_delete and month is not None and dt.month != month:
-                            should_delete = False
-                        if should_delete and day is not None and dt.day != day:
-                            should_delete = False
-                    except Exception as e:
-                        logger.warning(f"Fehler beim Parsen von scraped_at '{scraped_at}': {e}")
-                        # Bei Fehler: Link behalten
-                        should_delete = False
-                else:
-                    # Kein Datum vorhanden: Link behalten
-                    should_delete = False
-            
-            if should_delete:
-                deleted_count += 1
-                # Entferne auch aus Blacklist
-                link_url = link.get('url') if isinstance(link, dict) else link
-                if link_url in self.blacklist:
-                    self.blacklist.remove(link_url)
-            else:
-                links_to_keep.append(link)
-        
-        self.links = links_to_keep
         if deleted_count > 0:
-            self.save_links()
+            self.save_links(links_to_keep)
             self.save_blacklist()
+            # Unveränderte Suchen würden die gelöschten Links sonst nicht wieder finden
+            search_urls = {link.search_url for link in links_to_delete}
+            self.fingerprints.invalidate(None if None in search_urls else search_urls)
+            self._publish(links_to_keep, snapshot.last_search, snapshot.last_run_id)
             logger.info(f"{deleted_count} Links wurden gelöscht (Filter: Makler={makler_names}, Jahr={year}, Monat={month}, Tag={day})")
         
         return deleted_count
     
     def clear_links(self):
         """Löscht alle gesammelten Links"""
-        self.links = []
-        self.last_scraping_links = []
-        self.save_links()
+        self._write(self._clear_links)
+    
+    def _clear_links(self):
+        self.changes.reset()
+        self.save_links([])
+        self.save_last_scraping_links([])
+        self.fingerprints.invalidate()
+        self._publish((), (), None)
     
     def clear_blacklist(self):
         """Löscht die Blacklist"""
+        self._write(self._clear_blacklist)
+    
+    def _clear_blacklist(self):
         self.blacklist = set()
         self.save_blacklist()
 
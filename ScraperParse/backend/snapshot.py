@@ -0,0 +1,113 @@
+"""
+Binäre Snapshots der JSON-Dateien für schnelles Laden beim Start
+Neben <datei>.json wird <datei>.json.snap geschrieben (msgpack + zstd, falls installiert;
+sonst marshal + zlib). Die JSON-Datei bleibt die maßgebliche Quelle: ein Snapshot wird nur
+verwendet, wenn die beim Schreiben gemerkte Signatur der JSON-Datei noch stimmt.
+"""
+import json
+import marshal
+import os
+import struct
+import zlib
+import logging
+from typing import Any, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from store import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'KSNAP1'
+# Codecs: Serialisierung + Kompression
+CODEC_MSGPACK_ZSTD = 1
+CODEC_MSGPACK_ZLIB = 2
+CODEC_MARSHAL_ZLIB = 3
+
+
+def snapshot_path(path: str) -> str:
+    return path + '.snap'
+
+
+def _default_codec() -> int:
+    if msgpack is not None:
+        return CODEC_MSGPACK_ZSTD if zstandard is not None else CODEC_MSGPACK_ZLIB
+    return CODEC_MARSHAL_ZLIB
+
+
+def encode(data: Any, codec: Optional[int] = None) -> Tuple[int, bytes]:
+    """Serialisiert und komprimiert Daten mit dem angegebenen (oder besten verfügbaren) Codec"""
+    codec = codec or _default_codec()
+    if codec == CODEC_MSGPACK_ZSTD:
+        return codec, zstandard.ZstdCompressor(level=3).compress(msgpack.packb(data, use_bin_type=True))
+    if codec == CODEC_MSGPACK_ZLIB:
+        return codec, zlib.compress(msgpack.packb(data, use_bin_type=True), 1)
+    return CODEC_MARSHAL_ZLIB, zlib.compress(marshal.dumps(data), 1)
+
+
+def decode(codec: int, payload: bytes) -> Any:
+    """Gegenstück zu encode; wirft ValueError, wenn der Codec hier nicht verfügbar ist"""
+    if codec == CODEC_MSGPACK_ZSTD:
+        if msgpack is None or zstandard is None:
+            raise ValueError("msgpack/zstandard nicht installiert")
+        return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(payload), raw=False, strict_map_key=False)
+    if codec == CODEC_MSGPACK_ZLIB:
+        if msgpack is None:
+            raise ValueError("msgpack nicht installiert")
+        return msgpack.unpackb(zlib.decompress(payload), raw=False, strict_map_key=False)
+    if codec == CODEC_MARSHAL_ZLIB:
+        return marshal.loads(zlib.decompress(payload))
+    raise ValueError(f"Unbekannter Snapshot-Codec {codec}")
+
+
+def write_snapshot(path: str, data: Any, source_signature: Optional[tuple]):
+    """
+    Schreibt den Snapshot zu einer JSON-Datei (Fehler werden nur geloggt)
+
+    Args:
+        path: Pfad der JSON-Datei
+        data: Inhalt der JSON-Datei
+        source_signature: Signatur der JSON-Datei, zu der data gehört
+    """
+    if source_signature is None:
+        return
+    try:
+        codec, payload = encode(data)
+        header = json.dumps({'signature': list(source_signature)}).encode('utf-8')
+        atomic_write_bytes(snapshot_path(path), MAGIC + struct.pack('<BI', codec, len(header)) + header + payload)
+    except Exception as e:
+        logger.error(f"Fehler beim Schreiben des Snapshots für {path}: {e}")
+
+
+def load_snapshot(path: str, source_signature: Optional[tuple]) -> Optional[Any]:
+    """
+    Lädt den Snapshot zu einer JSON-Datei, falls er zur aktuellen Signatur der Datei passt
+
+    Returns:
+        Inhalt wie json.load(path) oder None (kein/veralteter/unlesbarer Snapshot)
+    """
+    snap = snapshot_path(path)
+    if source_signature is None or not os.path.exists(snap):
+        return None
+    try:
+        with open(snap, 'rb') as f:
+            blob = f.read()
+        if not blob.startswith(MAGIC):
+            return None
+        offset = len(MAGIC)
+        codec, header_length = struct.unpack_from('<BI', blob, offset)
+        offset += struct.calcsize('<BI')
+        header = json.loads(blob[offset:offset + header_length].decode('utf-8'))
+        if tuple(header.get('signature', [])) != tuple(source_signature):
+            return None
+        return decode(codec, blob[offset + header_length:])
+    except Exception as e:
+        logger.warning(f"Snapshot für {path} nicht verwendbar: {e}")
+        return None
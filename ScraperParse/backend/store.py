@@ -0,0 +1,163 @@
+"""
+Gemeinsamer Zustand für mehrere Backend-Prozesse
+Prozessübergreifende Sperren, atomares Schreiben und Änderungserkennung für die JSON-Dateien
+"""
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """
+    Exklusive Sperre über eine Lock-Datei, gültig über Prozess- und Thread-Grenzen hinweg
+
+    Innerhalb eines Prozesses ist die Sperre reentrant: verschachtelte Aufrufe im selben
+    Thread halten die Dateisperre nur einmal.
+    """
+
+    _thread_locks = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with FileLock._thread_locks_guard:
+            if self.path not in FileLock._thread_locks:
+                FileLock._thread_locks[self.path] = (threading.RLock(), threading.local())
+            self._thread_lock, self._local = FileLock._thread_locks[self.path]
+
+    def _lock_file(self, handle):
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            return
+        # msvcrt.locking gibt nach ca. 10 Sekunden auf - so lange wiederholen, bis es klappt
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.1)
+
+    def _unlock_file(self, handle):
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def acquire(self):
+        """Hält die Sperre für die Dauer des with-Blocks"""
+        with self._thread_lock:
+            depth = getattr(self._local, 'depth', 0)
+            if depth == 0:
+                handle = open(self.path, 'a+')
+                try:
+                    self._lock_file(handle)
+                except Exception:
+                    handle.close()
+                    raise
+                self._local.handle = handle
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+                if self._local.depth == 0:
+                    handle = self._local.handle
+                    self._local.handle = None
+                    try:
+                        self._unlock_file(handle)
+                    finally:
+                        handle.close()
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Gibt eine Signatur (mtime, Größe, Inode) einer Datei zurück
+
+    Returns:
+        Tuple oder None, wenn die Datei nicht existiert
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Liest eine JSON-Datei, gibt bei fehlender Datei den Default-Wert zurück"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# umask des Prozesses (nur lesbar, indem man sie setzt - daher einmal beim Import)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path: str) -> int:
+    """Rechte für die neue Fassung von path: die der bestehenden Datei, sonst 0666 abzüglich umask"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def _atomic_file(path: str, mode: str, **kwargs):
+    """Öffnet eine temporäre Datei neben path, die nach dem with-Block path atomar ersetzt"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp legt die Datei mit 0600 an; andere Nutzer des gemeinsamen Verzeichnisses
+        # müssen sie weiterhin lesen (und ggf. schreiben) können
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """
+    Schreibt JSON atomar (temporäre Datei + os.replace)
+
+    Leser in anderen Prozessen sehen dadurch immer entweder den alten oder den neuen
+    Stand, nie eine halb geschriebene Datei - Lesen braucht deshalb keine Sperre.
+    """
+    with _atomic_file(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Schreibt Binärdaten atomar (temporäre Datei + os.replace)"""
+    with _atomic_file(path, 'wb') as f:
+        f.write(data)
+
+
+def atomic_write_text(path: str, text: str):
+    """Schreibt Text (UTF-8) atomar (temporäre Datei + os.replace), z.B. NDJSON"""
+    with _atomic_file(path, 'w', encoding='utf-8') as f:
+        f.write(text)
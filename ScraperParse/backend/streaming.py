@@ -0,0 +1,114 @@
+"""
+Streaming-Abruf von Suchergebnisseiten
+Parst die Antwort inkrementell, während die Chunks ankommen, und bricht den Download ab,
+sobald die primäre Ergebnisliste (#srchrslt-adtable) geschlossen ist. Footer, Empfehlungen
+und alternative Anzeigen werden dadurch gar nicht erst übertragen.
+"""
+import codecs
+import threading
+import logging
+from html.parser import HTMLParser
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESULT_TABLE_ID = 'srchrslt-adtable'
+
+
+class ResultTableWatcher(HTMLParser):
+    """Erkennt beim inkrementellen Parsen, wann das Element mit der Ergebnislisten-ID endet"""
+
+    def __init__(self, element_id: str = RESULT_TABLE_ID):
+        super().__init__(convert_charrefs=False)
+        self.element_id = element_id
+        self.tag = None
+        self.depth = 0
+        self.finished = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+        if self.tag is None:
+            if dict(attrs).get('id') == self.element_id:
+                self.tag = tag
+                self.depth = 1
+        elif tag == self.tag:
+            # Nur gleichnamige Tags zählen - robust gegen nicht geschlossene Elemente im Inneren
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.finished or self.tag is None or tag != self.tag:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.finished = True
+
+
+class StreamStats:
+    """Thread-sichere Zähler für einen Crawl im Streaming-Modus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.stopped_early = 0
+        self.bytes_read = 0
+        self.bytes_saved = 0
+
+    def add(self, bytes_read: int, bytes_saved: Optional[int], stopped_early: bool):
+        with self._lock:
+            self.pages += 1
+            self.bytes_read += bytes_read
+            if stopped_early:
+                self.stopped_early += 1
+            if bytes_saved:
+                self.bytes_saved += bytes_saved
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'stopped_early': self.stopped_early,
+                'bytes_read': self.bytes_read,
+                'bytes_saved': self.bytes_saved
+            }
+
+
+def fetch_result_page(session, url: str, stats: Optional[StreamStats] = None, timeout: int = 10, chunk_size: int = 16384) -> Tuple[str, int]:
+    """
+    Lädt eine Suchergebnisseite bis zum Ende der primären Ergebnisliste
+
+    Wird die Ergebnisliste nicht gefunden, wird die komplette Seite geladen.
+    Ersparte Bytes lassen sich nur bei bekanntem Content-Length-Header beziffern
+    (gemessen auf der Leitung, also ggf. komprimiert).
+
+    Returns:
+        Tuple aus HTML bis einschließlich der geschlossenen Ergebnisliste und HTTP-Status
+    """
+    response = session.get(url, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        watcher = ResultTableWatcher()
+        parts = []
+        bytes_read = 0
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            bytes_read += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            watcher.feed(text)
+            if watcher.finished:
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+
+        bytes_saved = None
+        content_length = response.headers.get('Content-Length')
+        if watcher.finished and content_length and content_length.isdigit():
+            wire_bytes_read = response.raw.tell() if hasattr(response.raw, 'tell') else bytes_read
+            bytes_saved = max(0, int(content_length) - wire_bytes_read)
+        if stats is not None:
+            stats.add(bytes_read, bytes_saved, watcher.finished)
+        return ''.join(parts), response.status_code
+    finally:
+        # Schließt die Verbindung, falls der Body nicht vollständig gelesen wurde
+        response.close()
@@ -0,0 +1,147 @@
+"""
+Synthetische Bestände für Last- und Speichertests
+Erzeugt links.json, blacklist.json, makler.json und last_search.json in einem Verzeichnis, im
+selben Format wie das Backend sie schreibt:
+- Makler mit je einigen Such-URLs; wie viele Links auf einen Makler entfallen, folgt einer
+  Zipf-Verteilung (--skew 0 = alle gleich groß, 1 = wenige große und viele kleine Makler)
+- Links kommen in Crawl-Läufen (ein Zeitstempel pro Lauf, --runs-per-day über --days Tage),
+  ein Teil ist mehreren Maklern zugeordnet (--shared) oder keinem (--orphans)
+- Die Blacklist enthält alle Links plus bereits gelöschte (--blacklist-extra)
+- Die letzte Suche sind die Links des letzten Laufs
+
+Aufruf: python synthetic_data.py --out /tmp/bestand_100k --links 100000 [--makler 50 --skew 1.0]
+Das Verzeichnis kann direkt als Arbeitsverzeichnis des Backends dienen (siehe loadtest.py).
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from store import atomic_write_json
+
+SEARCH_URLS_PER_MAKLER = 8
+CATEGORIES = ['wohnung-mieten', 'wohnung-kaufen', 'haus-kaufen', 'haus-mieten', 'grundstueck-garten']
+
+
+def makler_weights(count: int, skew: float) -> List[float]:
+    """Anteil jedes Maklers an allen Links (Zipf: Gewicht 1 / Rang^skew)"""
+    weights = [1 / (rank ** skew) for rank in range(1, count + 1)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+def generate_dataset(links: int, makler: int = 50, skew: float = 1.0, days: int = 365,
+                     runs_per_day: int = 2, shared: float = 0.05, orphans: float = 0.02,
+                     blacklist_extra: float = 0.2, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Erzeugt einen Bestand als Datei-Inhalte
+
+    Args:
+        links: Anzahl Links
+        makler: Anzahl Makler
+        skew: Zipf-Exponent der Makler-Größen (0 = gleichverteilt)
+        days: Zeitraum in Tagen (endet heute)
+        runs_per_day: Crawl-Läufe pro Tag (ein Zeitstempel pro Lauf)
+        shared: Anteil Links mit zwei Maklern
+        orphans: Anteil Links ohne Makler (Suche ohne Makler-Zuordnung)
+        blacklist_extra: Zusätzliche, bereits gelöschte Blacklist-Einträge (Anteil von links)
+        seed: Startwert des Zufallsgenerators
+
+    Returns:
+        Dateiname -> Inhalt für links.json, blacklist.json, makler.json und last_search.json
+    """
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=days)
+    run_count = max(1, days * runs_per_day)
+    run_step = timedelta(days=days) / run_count
+    # Ein Zeitstempel pro Lauf, aufsteigend; die Links verteilen sich gleichmäßig auf die Läufe
+    runs = [(start + run_step * run + timedelta(seconds=rng.randint(0, 600), microseconds=rng.randint(0, 999999))).isoformat()
+            for run in range(run_count)]
+
+    names = [f"Makler {i:03d}" for i in range(makler)]
+    search_urls = {
+        name: [f"https://www.kleinanzeigen.de/s-{rng.choice(CATEGORIES)}/{10000 + rng.randint(0, 89999)}/c203l{rng.randint(1000, 19999)}r10"
+               for _ in range(SEARCH_URLS_PER_MAKLER)]
+        for name in names
+    }
+    weights = makler_weights(makler, skew)
+    created_at = start.isoformat()
+    makler_data = {
+        name: {'name': name, 'links': search_urls[name], 'created_at': created_at, 'updated_at': created_at}
+        for name in names
+    }
+
+    link_list = []
+    last_run = runs[-1]
+    last_search = []
+    for i in range(links):
+        ad_id = 2000000000 + i
+        url = f"https://www.kleinanzeigen.de/s-anzeige/wohnung-{ad_id}/{ad_id}-196-{rng.randint(1000, 9999)}"
+        scraped_at = runs[i * run_count // links]
+        roll = rng.random()
+        if roll < orphans:
+            assigned = []
+            search_url = f"https://www.kleinanzeigen.de/s-{rng.choice(CATEGORIES)}/{10000 + rng.randint(0, 89999)}/c203"
+        else:
+            assigned = rng.choices(names, weights)
+            if roll < orphans + shared:
+                second = rng.choices(names, weights)[0]
+                if second != assigned[0]:
+                    assigned.append(second)
+            search_url = rng.choice(search_urls[assigned[0]])
+        link_list.append({'url': url, 'scraped_at': scraped_at, 'search_url': search_url, 'makler_names': assigned})
+        if scraped_at == last_run:
+            last_search.append(url)
+
+    blacklist = [link['url'] for link in link_list]
+    blacklist += [f"https://www.kleinanzeigen.de/s-anzeige/geloescht-{1000000000 + i}/{1000000000 + i}-196-{rng.randint(1000, 9999)}"
+                  for i in range(int(links * blacklist_extra))]
+    return {
+        'links.json': {'links': link_list},
+        'blacklist.json': {'blacklist': blacklist},
+        'makler.json': {'makler': makler_data},
+        'last_search.json': {'links': last_search},
+    }
+
+
+def write_dataset(directory: str, **kwargs) -> Dict[str, int]:
+    """
+    Schreibt einen Bestand (Argumente wie generate_dataset) nach directory
+
+    Returns:
+        Dateiname -> Anzahl Einträge
+    """
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for filename, content in generate_dataset(**kwargs).items():
+        atomic_write_json(os.path.join(directory, filename), content)
+        counts[filename] = len(next(iter(content.values())))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', required=True, help='Zielverzeichnis')
+    parser.add_argument('--links', type=int, default=100000)
+    parser.add_argument('--makler', type=int, default=50)
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf-Exponent der Makler-Größen (0 = gleichverteilt)')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--runs-per-day', type=int, default=2)
+    parser.add_argument('--shared', type=float, default=0.05, help='Anteil Links mit zwei Maklern')
+    parser.add_argument('--orphans', type=float, default=0.02, help='Anteil Links ohne Makler')
+    parser.add_argument('--blacklist-extra', type=float, default=0.2, help='Zusätzliche gelöschte Blacklist-Einträge (Anteil)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = write_dataset(args.out, links=args.links, makler=args.makler, skew=args.skew, days=args.days,
+                           runs_per_day=args.runs_per_day, shared=args.shared, orphans=args.orphans,
+                           blacklist_extra=args.blacklist_extra, seed=args.seed)
+    for filename, count in counts.items():
+        size_mb = os.path.getsize(os.path.join(args.out, filename)) / 1e6
+        print(f"{filename:<18} {count:>9} Einträge {size_mb:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,30 +12,54 @@ import time
 logger = logging.getLogger(__name__)
 
 
-def get_location_id(plz_or_ort):
+def fetch_location_suggestions(query):
+    """
+    Fragt die Orts-Vorschläge von Kleinanzeigen ab (Netzwerkzugriff, Fehler werden weitergereicht)
+    
+    Args:
+        query: PLZ, Ortsname oder Anfang davon
+    
+    Returns:
+        Liste von (Location-ID, Anzeigename) in der Reihenfolge der API
+    """
+    url = f"https://www.kleinanzeigen.de/s-ort-empfehlungen.json?query={quote(query)}"
+    with urllib.request.urlopen(url, timeout=10) as response:
+        data = json.loads(response.read().decode())
+    # "_0" ist kein Ort; die übrigen Schlüssel sind "_" + Location-ID
+    return [(key[1:], name) for key, name in data.items() if key != "_0"]
+
+
+def get_location_id(plz_or_ort, index=None):
     """
     Ruft die Location-ID für eine PLZ oder einen Ort von Kleinanzeigen ab
     
     Args:
         plz_or_ort: PLZ (5-stellig) oder Ortsname
+        index: Lokaler LocationIndex; bekannte Orte werden ohne Anfrage aufgelöst, neue dort gespeichert
     
     Returns:
         Location-ID als String oder None
     """
-    url = f"https://www.kleinanzeigen.de/s-ort-empfehlungen.json?query={plz_or_ort}"
+    if index is not None:
+        location_id = index.resolve(plz_or_ort)
+        if location_id:
+            return location_id
     try:
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read().decode())
-            # Nimm die erste nicht-0 ID (oder passe Logik an, wenn multiple)
-            for key in data:
-                if key != "_0":
-                    location_id = key[1:]  # Entferne "_" und nimm ID
-                    logger.info(f"Location-ID für {plz_or_ort}: {location_id}")
-                    return location_id
-            return None  # Wenn keine gefunden
+        suggestions = fetch_location_suggestions(plz_or_ort)
     except Exception as e:
         logger.error(f"Fehler bei {plz_or_ort}: {e}")
         return None
+    if not suggestions:
+        return None  # Wenn keine gefunden
+    # Nimm die erste ID (oder passe Logik an, wenn multiple)
+    location_id = suggestions[0][0]
+    logger.info(f"Location-ID für {plz_or_ort}: {location_id}")
+    if index is not None:
+        try:
+            index.add(suggestions, query=plz_or_ort)
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Orte für {plz_or_ort}: {e}")
+    return location_id
 
 
 def extract_id_from_url(url):
@@ -44,7 +68,7 @@ def extract_id_from_url(url):
     return match.group(1) if match else None
 
 
-def find_kleinanzeigen_url_with_id(plz, filters, reference_url_with_id=None):
+def find_kleinanzeigen_url_with_id(plz, filters, reference_url_with_id=None, index=None):
     """
     Findet die korrekte Kleinanzeigen URL mit ID für eine PLZ
     
@@ -52,13 +76,14 @@ def find_kleinanzeigen_url_with_id(plz, filters, reference_url_with_id=None):
         plz: 5-stellige PLZ oder Ortsname
         filters: Dict mit Filter-Parametern (kategorie, anbieter, anzeige, preis, suchbegriff)
         reference_url_with_id: Wird ignoriert, da wir die ID direkt holen
+        index: Lokaler LocationIndex (siehe get_location_id)
     
     Returns:
         URL mit korrekter ID oder None bei Fehler
     """
     try:
         # Hole Location-ID über die JSON-API
-        location_id = get_location_id(plz)
+        location_id = get_location_id(plz, index)
         if not location_id:
             logger.warning(f"Konnte Location-ID für {plz} nicht abrufen")
             return None
@@ -95,7 +120,7 @@ def find_kleinanzeigen_url_with_id(plz, filters, reference_url_with_id=None):
         return None
 
 
-def find_urls_for_plzs(plz_list, filters, reference_url=None):
+def find_urls_for_plzs(plz_list, filters, reference_url=None, index=None):
     """
     Findet URLs mit IDs für eine Liste von PLZs
     
@@ -103,6 +128,7 @@ def find_urls_for_plzs(plz_list, filters, reference_url=None):
         plz_list: Liste von PLZs (Strings)
         filters: Dict mit Filter-Parametern
         reference_url: Wird ignoriert, da wir die ID direkt holen
+        index: Lokaler LocationIndex; nur für unbekannte Orte wird die API gefragt
     
     Returns:
         Dict mit PLZ als Key und URL als Value
@@ -113,11 +139,13 @@ def find_urls_for_plzs(plz_list, filters, reference_url=None):
         clean_plz = plz.strip()
         # Akzeptiere sowohl PLZs (5-stellig) als auch Ortsnamen
         if (len(clean_plz) == 5 and clean_plz.isdigit()) or clean_plz:
-            url = find_kleinanzeigen_url_with_id(clean_plz, filters, reference_url)
+            known = index is not None and index.resolve(clean_plz) is not None
+            url = find_kleinanzeigen_url_with_id(clean_plz, filters, reference_url, index)
             if url:
                 results[clean_plz] = url
-            # Kurze Pause zwischen Anfragen (optimiert für Performance)
-            time.sleep(0.2)
+            # Kurze Pause zwischen Anfragen (optimiert für Performance); lokal aufgelöste Orte brauchen keine
+            if not known:
+                time.sleep(0.2)
         else:
             logger.warning(f"Ungültige PLZ/Ortsname übersprungen: {clean_plz}")
     
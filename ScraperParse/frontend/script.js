@@ -29,6 +29,8 @@ const exportMaklerSelect = document.getElementById('exportMaklerSelect');
 // URL Generator Elements
 const baseURLInput = document.getElementById('baseURLInput');
 const plzListInput = document.getElementById('plzListInput');
+const locationSuggestInput = document.getElementById('locationSuggestInput');
+const locationSuggestions = document.getElementById('locationSuggestions');
 const generateURLsBtn = document.getElementById('generateURLsBtn');
 const generatedURLsContainer = document.getElementById('generatedURLsContainer');
 const generatedURLsOutput = document.getElementById('generatedURLsOutput');
@@ -113,21 +115,13 @@ async function loadLinks(filters = null) {
         console.log('Rufe displayLinksGrouped auf mit:', Object.keys(data.grouped || {}));
         console.log('Gefilterte Anzahl:', data.filtered_count);
         console.log('Gesamtanzahl:', data.total_count);
-        displayLinksGrouped(data.grouped || {});
-        if (totalLinksSpan) totalLinksSpan.textContent = data.total_count || 0;
-        if (linksCountSpan) linksCountSpan.textContent = data.filtered_count || data.total_count || 0;
-        
-        // Update Status Anchor
-        const statusLinksCount = document.getElementById('statusLinksCount');
-        if (statusLinksCount) {
-            statusLinksCount.textContent = data.filtered_count || data.total_count || 0;
-        }
-        
-        // Update filtered count
-        const filteredLinks = document.getElementById('filteredLinks');
-        if (filteredLinks) {
-            filteredLinks.textContent = data.filtered_count || data.total_count || 0;
-        }
+        // Angezeigten Stand merken, damit Live-Updates (/events) ihn fortschreiben können
+        displayedGrouped = data.grouped || {};
+        displayedFilters = filters;
+        displayedTotal = data.total_count || 0;
+        displayedCount = data.filtered_count || data.total_count || 0;
+        displayLinksGrouped(displayedGrouped);
+        updateLinkCounts();
         
         // Update last action
         const lastAction = document.getElementById('lastAction');
@@ -137,18 +131,6 @@ async function loadLinks(filters = null) {
             lastAction.querySelector('.Panel-context-value').textContent = `Links geladen (${timeStr})`;
         }
         
-        // Update Results Badge
-        const resultsBadge = document.getElementById('resultsBadge');
-        if (resultsBadge) {
-            const count = data.filtered_count || data.total_count || 0;
-            if (count > 0) {
-                resultsBadge.textContent = count;
-                resultsBadge.style.display = 'inline-block';
-            } else {
-                resultsBadge.style.display = 'none';
-            }
-        }
-        
         return data;
     } catch (error) {
         console.error('Fehler beim Laden der Links:', error);
@@ -159,6 +141,137 @@ async function loadLinks(filters = null) {
 // loadLinks global verfügbar machen
 window.loadLinks = loadLinks;
 
+// Aktualisiert alle Zähler-Anzeigen aus dem angezeigten Stand
+function updateLinkCounts() {
+    if (totalLinksSpan) totalLinksSpan.textContent = displayedTotal;
+    if (linksCountSpan) linksCountSpan.textContent = displayedCount;
+    
+    // Update Status Anchor
+    const statusLinksCount = document.getElementById('statusLinksCount');
+    if (statusLinksCount) {
+        statusLinksCount.textContent = displayedCount;
+    }
+    
+    // Update filtered count
+    const filteredLinks = document.getElementById('filteredLinks');
+    if (filteredLinks) {
+        filteredLinks.textContent = displayedCount;
+    }
+    
+    // Update Results Badge
+    const resultsBadge = document.getElementById('resultsBadge');
+    if (resultsBadge) {
+        if (displayedCount > 0) {
+            resultsBadge.textContent = displayedCount;
+            resultsBadge.style.display = 'inline-block';
+        } else {
+            resultsBadge.style.display = 'none';
+        }
+    }
+}
+
+// Live-Updates über Server-Sent Events (/events): neue Links erscheinen, sobald das Backend
+// sie übernommen hat - ohne die Liste nach der Suche komplett neu zu laden
+let displayedGrouped = {};
+let displayedFilters = null;
+let displayedTotal = 0;
+let displayedCount = 0;
+let liveSource = null;
+let liveWasConnected = false;
+let liveRenderScheduled = false;
+// Beendete Läufe -> Anzahl bestehender Links mit neu zugeordnetem Makler
+const finishedRuns = new Map();
+
+// Prüft, ob ein neuer Link zu den Filtern der aktuellen Anzeige passt
+function liveLinkMatchesFilters(link, filters) {
+    if (!filters) return true;
+    if (filters.makler_names && !link.makler_names.some(name => filters.makler_names.includes(name))) {
+        return false;
+    }
+    const [year, month, day] = (link.scraped_at || '').slice(0, 10).split('-').map(Number);
+    if (filters.year && filters.year !== year) return false;
+    if (filters.month && filters.month !== month) return false;
+    if (filters.day && filters.day !== day) return false;
+    // Neue Links gehören immer zur letzten Suche - last_search_only passt daher
+    return true;
+}
+
+// Übernimmt neue Links in die angezeigten Gruppen (Rendern max. einmal pro Frame)
+function addLiveLinks(links) {
+    links.forEach(link => {
+        displayedTotal += 1;
+        if (!liveLinkMatchesFilters(link, displayedFilters)) return;
+        displayedCount += 1;
+        const groups = link.makler_names.length > 0 ? link.makler_names : ['Sonstige'];
+        groups.forEach(maklerName => {
+            if (displayedFilters && displayedFilters.makler_names && !displayedFilters.makler_names.includes(maklerName)) return;
+            if (!displayedGrouped[maklerName]) displayedGrouped[maklerName] = [];
+            displayedGrouped[maklerName].push(link);
+        });
+    });
+    if (newLinksSpan) {
+        newLinksSpan.textContent = (parseInt(newLinksSpan.textContent) || 0) + links.length;
+    }
+    if (liveRenderScheduled) return;
+    liveRenderScheduled = true;
+    requestAnimationFrame(() => {
+        liveRenderScheduled = false;
+        displayLinksGrouped(displayedGrouped);
+        updateLinkCounts();
+    });
+}
+
+function connectLiveEvents() {
+    if (typeof EventSource === 'undefined' || liveSource) return;
+    liveSource = new EventSource(`${window.API_BASE_URL}/events`);
+    liveSource.addEventListener('open', () => {
+        // Nach einem Verbindungsabbruch können Ereignisse fehlen - einmal komplett nachladen
+        if (liveWasConnected) {
+            loadLinks(displayedFilters);
+        }
+        liveWasConnected = true;
+    });
+    liveSource.addEventListener('crawl_started', () => {
+        if (newLinksSpan) newLinksSpan.textContent = 0;
+    });
+    liveSource.addEventListener('links', event => {
+        addLiveLinks(JSON.parse(event.data).links);
+    });
+    liveSource.addEventListener('progress', event => {
+        const progress = JSON.parse(event.data);
+        showStatus(`Suche läuft: ${progress.done}/${progress.total} Such-URLs abgeschlossen, ${progress.new_links} neue Links`, 'info');
+    });
+    liveSource.addEventListener('makler_finished', event => {
+        // Links dieses Maklers sind bereits übernommen und können exportiert werden
+        const finished = JSON.parse(event.data);
+        showStatus(`Makler ${finished.makler} fertig: ${finished.links_found} Links übernommen (exportierbar)`, 'success');
+    });
+    liveSource.addEventListener('crawl_finished', event => {
+        const finished = JSON.parse(event.data);
+        finishedRuns.set(finished.run_id, finished.reassigned || 0);
+    });
+    liveSource.addEventListener('resync', () => {
+        loadLinks(displayedFilters);
+    });
+}
+
+// Wartet, bis für alle Läufe das Ende über /events gemeldet wurde (false nach Timeout)
+function waitForLiveRuns(runIds, timeoutMs) {
+    const started = Date.now();
+    return new Promise(resolve => {
+        const check = () => {
+            if (runIds.every(runId => finishedRuns.has(runId))) {
+                resolve(true);
+            } else if (Date.now() - started >= timeoutMs) {
+                resolve(false);
+            } else {
+                setTimeout(check, 100);
+            }
+        };
+        check();
+    });
+}
+
 // Zeigt Links nach Maklern gruppiert an
 function displayLinksGrouped(grouped) {
     console.log('displayLinksGrouped aufgerufen mit:', Object.keys(grouped || {}));
@@ -252,8 +365,17 @@ async function startSearchMakler() {
             }, 500);
         }
         
-        // Lade alle Links neu
-        await loadLinks();
+        // Neue Links kamen bereits live über /events - nur ohne Live-Verbindung (oder wenn
+        // der Lauf in einem anderen Worker-Prozess stattfand) komplett neu laden
+        const runIds = data.run_ids || [];
+        const receivedLive = runIds.length > 0 && await waitForLiveRuns(runIds, 2000);
+        // Neu zugeordnete Makler bestehender Links kommen nicht live - dann ebenfalls neu laden
+        const reassigned = receivedLive && runIds.some(runId => finishedRuns.get(runId) > 0);
+        if (!receivedLive || reassigned) {
+            await loadLinks();
+        } else if (newLinksSpan) {
+            newLinksSpan.textContent = data.new_links.length;
+        }
         
     } catch (error) {
         console.error('Fehler bei der Suche:', error);
@@ -777,10 +899,57 @@ if (exportFilteredBtn && exportFilterYear && exportFilterMonth) {
     });
 }
 
+// Orts-Vorschläge für den URL-Generator (lokaler Index im Backend, nur bei unbekannten Orten Kleinanzeigen)
+if (locationSuggestInput && locationSuggestions && plzListInput) {
+    let suggestTimer = null;
+    let currentSuggestions = [];
+    
+    locationSuggestInput.addEventListener('input', function() {
+        const query = locationSuggestInput.value.trim();
+        // Ausgewählter Vorschlag: PLZ (oder Ortsname) in die Liste übernehmen
+        const selected = currentSuggestions.find(s => s.name === query);
+        if (selected) {
+            const entry = selected.plz || selected.name;
+            const existing = plzListInput.value.split(/[,\n;]/).map(p => p.trim()).filter(p => p);
+            if (!existing.includes(entry)) {
+                plzListInput.value = existing.concat(entry).join('\n');
+            }
+            locationSuggestInput.value = '';
+            locationSuggestions.innerHTML = '';
+            currentSuggestions = [];
+            return;
+        }
+        clearTimeout(suggestTimer);
+        if (!query) {
+            locationSuggestions.innerHTML = '';
+            return;
+        }
+        suggestTimer = setTimeout(async () => {
+            try {
+                const response = await fetch(`${window.API_BASE_URL}/locations/suggest?q=${encodeURIComponent(query)}&limit=10`);
+                if (!response.ok) return;
+                const data = await response.json();
+                // Veraltete Antwort (inzwischen weitergetippt) ignorieren
+                if (locationSuggestInput.value.trim() !== query) return;
+                currentSuggestions = data.suggestions || [];
+                locationSuggestions.innerHTML = '';
+                currentSuggestions.forEach(s => {
+                    const option = document.createElement('option');
+                    option.value = s.name;
+                    locationSuggestions.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Fehler bei Orts-Vorschlägen:', error);
+            }
+        }, 150);
+    });
+}
+
 // URL Generator Event-Listener
 if (generateURLsBtn && plzListInput) {
     generateURLsBtn.addEventListener('click', async function() {
-        const plzList = plzListInput.value.split(/[,\n;]/).map(p => p.trim()).filter(p => p && /^\d{5}$/.test(p));
+        // 5-stellige PLZ oder Ortsname (Zahlen mit anderer Länge sind Tippfehler)
+        const plzList = plzListInput.value.split(/[,\n;]/).map(p => p.trim()).filter(p => p && (/^\d{5}$/.test(p) || /\D/.test(p)));
         const filters = {
             kategorie: document.getElementById('filterKategorie')?.value || 'immobilien',
             anbieter: document.getElementById('filterAnbieter')?.value || 'privat',
@@ -790,7 +959,7 @@ if (generateURLsBtn && plzListInput) {
         };
         
         if (plzList.length === 0) {
-            showStatus('Bitte geben Sie mindestens eine gültige 5-stellige PLZ ein.', 'error');
+            showStatus('Bitte geben Sie mindestens eine gültige 5-stellige PLZ oder einen Ort ein.', 'error');
             return;
         }
         
@@ -1188,6 +1357,9 @@ if (typeof window.applyFilters === 'undefined') {
 
 // Beim Laden der Seite: Links laden (ohne Filter) - nur wenn Results-View aktiv ist
 document.addEventListener('DOMContentLoaded', function() {
+    // Live-Updates abonnieren
+    connectLiveEvents();
+    
     // Initial load nur wenn Results-View aktiv ist
     const resultsView = document.getElementById('view-results');
     if (resultsView && resultsView.classList.contains('View-active')) {